@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Script untuk benchmark insert record Inspection ke SQLite:
+commit per record vs group commit (InspectionWriter), durable dan non-durable
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from flask import Flask
+
+from src.models.product import Inspection, db
+from src.services.inspection_writer import InspectionWriter
+
+def inspection_values(thread_index, index):
+    return dict(
+        product_id=None,
+        camera_id=thread_index + 1,
+        captured_image_path=f"src/static/images/2026/01/01/ab/{thread_index:04d}{index:028d}.jpg",
+        detected_part_number='ABC-1234',
+        is_ok=index % 10 != 0,
+        inspection_mode='auto',
+        confidence_score=95.0,
+        detection_area='{"x": 10, "y": 10, "width": 200, "height": 40}',
+        ocr_stage='fast',
+        ocr_time_ms=12.5
+    )
+
+def create_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+def run_threads(app, threads, count, insert):
+    """Jalankan `threads` producer yang masing-masing menyimpan `count` record"""
+    def producer(thread_index):
+        for index in range(count):
+            # One app context (and session) per inspection, like a request
+            with app.app_context():
+                insert(thread_index, index)
+
+    workers = [threading.Thread(target=producer, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+def run_per_row(app, threads, count):
+    def insert(thread_index, index):
+        db.session.add(Inspection(**inspection_values(thread_index, index)))
+        db.session.commit()
+    return run_threads(app, threads, count, insert), None
+
+def run_group(app, threads, count, batch_size, delay_ms, durable):
+    writer = InspectionWriter(batch_size=batch_size, max_delay_ms=delay_ms, durable=durable)
+
+    def insert(thread_index, index):
+        writer.write(inspection_values(thread_index, index))
+
+    start = time.perf_counter()
+    run_threads(app, threads, count, insert)
+    # Non-durable writes count once the writer has committed them
+    writer.flush()
+    return time.perf_counter() - start, writer
+
+def summarize(name, rows, elapsed, writer=None):
+    """Cetak ringkasan throughput"""
+    line = f"{name:28s} rows={rows:6d} inserts/s={rows / elapsed:9.1f} latency={elapsed / rows * 1000:7.3f}ms/row"
+    if writer is not None:
+        stats = writer.get_stats()
+        line += f" batches={stats['batches']:5d} avg_batch={stats['average_batch']:6.1f}"
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=500, help='record per thread producer')
+    parser.add_argument('--threads', type=int, default=4, help='jumlah thread producer (kamera/worker)')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--delay-ms', type=float, default=10)
+    args = parser.parse_args()
+
+    total = args.rows * args.threads
+    print(f"Benchmark insert Inspection: {args.threads} thread x {args.rows} record, "
+          f"batch={args.batch_size}, delay={args.delay_ms}ms")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ('per-row commit', 'group commit durable', 'group commit non-durable'):
+            path = os.path.join(directory, f"{name.replace(' ', '_')}.db")
+            app = create_app(path)
+            if name == 'per-row commit':
+                elapsed, writer = run_per_row(app, args.threads, args.rows)
+            else:
+                elapsed, writer = run_group(app, args.threads, args.rows, args.batch_size, args.delay_ms,
+                                            name.endswith(' durable'))
+            with app.app_context():
+                rows = Inspection.query.count()
+            assert rows == total, f"{name}: expected {total} rows, found {rows}"
+            summarize(name, rows, elapsed, writer)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Script untuk menjalankan broker kamera sebagai proses terpisah. Broker
+memiliki semua device kamera; worker server (CAMERA_BROKER=host:port)
+mengambil frame dari broker lewat client handle.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+from src.services.camera_broker import DEFAULT_BROKER_ADDRESS, parse_broker_address, serve_camera_broker
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+def main():
+    default_address = os.environ.get('CAMERA_BROKER', f"{DEFAULT_BROKER_ADDRESS[0]}:{DEFAULT_BROKER_ADDRESS[1]}")
+    if default_address == 'local':
+        default_address = f"{DEFAULT_BROKER_ADDRESS[0]}:{DEFAULT_BROKER_ADDRESS[1]}"
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--address', default=default_address, help='host:port tempat broker mendengarkan')
+    args = parser.parse_args()
+
+    try:
+        address = parse_broker_address(args.address)
+        logger.info(f"Camera broker listening on {address[0]}:{address[1]}")
+        serve_camera_broker(address)
+    except KeyboardInterrupt:
+        logger.info("Camera broker stopped")
+    except Exception as e:
+        logger.error(f"Failed to start camera broker: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
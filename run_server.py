@@ -6,7 +6,6 @@ Script untuk menjalankan server Flask dengan logging yang lebih baik
 import os
 import sys
 import logging
-from src.main import app
 
 # Setup logging
 logging.basicConfig(
@@ -17,6 +16,11 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 def main():
+    # Imported here, not at module level: spawned OCR batch workers re-import
+    # this script as __mp_main__ and must not build the app, touch the
+    # database, or start its service threads
+    from src.main import app, start_background_services
+    
     try:
         logger.info("Starting Part Number OCR System...")
         logger.info(f"Python version: {sys.version}")
@@ -24,10 +28,13 @@ def main():
         
         # Initialize database
         with app.app_context():
-            from src.models.product import db
+            from src.models.product import db, upgrade_schema
             db.create_all()
+            upgrade_schema()
             logger.info("Database initialized successfully")
         
+        start_background_services()
+        
         logger.info("Server starting on http://0.0.0.0:5000")
         app.run(host='0.0.0.0', port=5000, debug=True)
         
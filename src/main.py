@@ -3,19 +3,27 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, send_from_directory, request, jsonify, abort
 from flask_cors import CORS
 from src.models.user import db
+from src.models.product import upgrade_schema
 from src.routes.user import user_bp
 from src.routes.camera import camera_bp
 from src.routes.inspection import inspection_bp
 from src.routes.product import product_bp
 from src.routes.item_check import item_check_bp
 from src.routes.health import health_bp
+from src.routes.images import images_bp
 from src.routes.frontend import frontend_bp
+from src.services.image_retention import image_retention
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+# Largest accepted request body (uploaded images), default 16 MB
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
+# A tray of up to INSPECTION_BATCH_MAX_IMAGES base64 JPEGs needs a larger
+# body than a single image, default 256 MB
+app.config['BATCH_MAX_CONTENT_LENGTH'] = int(os.environ.get('INSPECTION_BATCH_MAX_CONTENT_LENGTH', 256 * 1024 * 1024))
 
 # Enable CORS for all routes
 CORS(app)
@@ -26,6 +34,7 @@ app.register_blueprint(inspection_bp, url_prefix='/api')
 app.register_blueprint(product_bp, url_prefix='/api')
 app.register_blueprint(item_check_bp, url_prefix='/api')
 app.register_blueprint(health_bp, url_prefix='/api')
+app.register_blueprint(images_bp, url_prefix='/api')
 app.register_blueprint(frontend_bp)
 
 # uncomment if you need to use database
@@ -34,6 +43,42 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 with app.app_context():
     db.create_all()
+    upgrade_schema()
+
+@app.before_request
+def limit_content_length():
+    # Reject oversized uploads from the Content-Length header, before a view
+    # starts buffering the body
+    max_length = app.config.get('MAX_CONTENT_LENGTH')
+    if request.endpoint == 'inspection.batch_inspection':
+        max_length = app.config.get('BATCH_MAX_CONTENT_LENGTH')
+        # Also applies while the body is read (chunked uploads)
+        request.max_content_length = max_length
+    if max_length and request.content_length is not None and request.content_length > max_length:
+        abort(413)
+
+@app.errorhandler(400)
+def bad_request(e):
+    return jsonify({
+        'success': False,
+        'error': e.description
+    }), 400
+
+@app.errorhandler(413)
+def request_entity_too_large(e):
+    return jsonify({
+        'success': False,
+        'error': f"Request body exceeds the {request.max_content_length} byte limit"
+    }), 413
+
+def start_background_services():
+    """Thread latar belakang milik proses server, dipanggil dari entry point server
+
+    Tidak dijalankan saat import, sehingga script, test client, dan worker
+    OCR batch yang meng-import app tidak ikut mem-pack arsip gambar.
+    """
+    # Packs old days in the background when IMAGE_RETENTION_DAYS > 0
+    image_retention.start()
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -53,4 +98,5 @@ def serve(path):
 
 
 if __name__ == '__main__':
+    start_background_services()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -1,11 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import inspect, text
 from src.models.user import db
 
 class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     part_number = db.Column(db.String(100), unique=True, nullable=False)
     description = db.Column(db.Text)
+    ocr_engine = db.Column(db.String(20))  # OCR engine for this product, NULL = default
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -17,6 +19,7 @@ class Product(db.Model):
             'id': self.id,
             'part_number': self.part_number,
             'description': self.description,
+            'ocr_engine': self.ocr_engine,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -24,16 +27,24 @@ class Product(db.Model):
 class Inspection(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=True)
+    camera_id = db.Column(db.Integer, db.ForeignKey('camera.id'), nullable=True)
     captured_image_path = db.Column(db.String(255))
     detected_part_number = db.Column(db.String(100))
     is_ok = db.Column(db.Boolean, default=False)
     inspection_mode = db.Column(db.String(20), nullable=False)  # 'auto' or 'manual'
     confidence_score = db.Column(db.Float)  # OCR confidence score
     detection_area = db.Column(db.Text)  # JSON string for detection area coordinates
+    ocr_stage = db.Column(db.String(20))  # 'fast', 'full', 'mosaic', 'cache' or 'manual'
+    ocr_time_ms = db.Column(db.Float)  # Time spent in OCR for this inspection
     inspected_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     product = db.relationship('Product', backref=db.backref('inspections', lazy=True))
 
+    # Latest OK inspection per camera (ROI hint lookup on every auto inspection)
+    __table_args__ = (
+        db.Index('ix_inspection_camera_ok_inspected_at', 'camera_id', 'is_ok', 'inspected_at'),
+    )
+
     def __repr__(self):
         return f'<Inspection {self.id} - {self.detected_part_number}>'
 
@@ -41,25 +52,49 @@ class Inspection(db.Model):
         return {
             'id': self.id,
             'product_id': self.product_id,
+            'camera_id': self.camera_id,
             'captured_image_path': self.captured_image_path,
+            # An absolute archive path must not produce '//' (Flask redirects it)
+            'image_url': f"/api/images/{self.captured_image_path.lstrip('/')}" if self.captured_image_path else None,
             'detected_part_number': self.detected_part_number,
             'is_ok': self.is_ok,
             'inspection_mode': self.inspection_mode,
             'confidence_score': self.confidence_score,
             'detection_area': self.detection_area,
+            'ocr_stage': self.ocr_stage,
+            'ocr_time_ms': self.ocr_time_ms,
             'inspected_at': self.inspected_at.isoformat() if self.inspected_at else None,
             'product': self.product.to_dict() if self.product else None
         }
 
+    def to_event_dict(self):
+        # Compact form for the live event stream; no product join
+        return {
+            'id': self.id,
+            'product_id': self.product_id,
+            'camera_id': self.camera_id,
+            'detected_part_number': self.detected_part_number,
+            'is_ok': self.is_ok,
+            'inspection_mode': self.inspection_mode,
+            'confidence_score': self.confidence_score,
+            'ocr_stage': self.ocr_stage,
+            'captured_image_path': self.captured_image_path,
+            'inspected_at': self.inspected_at.isoformat() if self.inspected_at else None
+        }
+
 class Camera(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
     index = db.Column(db.Integer, nullable=False)  # OpenCV camera index
+    source_type = db.Column(db.String(20), default='device')  # device | video | images | synthetic
+    source_path = db.Column(db.String(500))  # video file, image folder, or comma-separated part numbers (synthetic)
+    source_fps = db.Column(db.Float)  # virtual camera frame rate, 0 = paced by the consumer
     resolution_width = db.Column(db.Integer, default=640)
     resolution_height = db.Column(db.Integer, default=480)
     brightness = db.Column(db.Integer, default=50)
     contrast = db.Column(db.Integer, default=50)
     zoom = db.Column(db.Integer, default=100)
+    ocr_engine = db.Column(db.String(20))  # OCR engine for this camera, NULL = default
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -71,11 +106,15 @@ class Camera(db.Model):
             'id': self.id,
             'name': self.name,
             'index': self.index,
+            'source_type': self.source_type or 'device',
+            'source_path': self.source_path,
+            'source_fps': self.source_fps,
             'resolution_width': self.resolution_width,
             'resolution_height': self.resolution_height,
             'brightness': self.brightness,
             'contrast': self.contrast,
             'zoom': self.zoom,
+            'ocr_engine': self.ocr_engine,
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
@@ -101,3 +140,49 @@ class ItemCheck(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class RoiHint(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    camera_id = db.Column(db.Integer, db.ForeignKey('camera.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=True)  # NULL = camera-wide hint
+    x = db.Column(db.Integer, nullable=False)
+    y = db.Column(db.Integer, nullable=False)
+    width = db.Column(db.Integer, nullable=False)
+    height = db.Column(db.Integer, nullable=False)
+    samples = db.Column(db.Integer, default=0)  # Successful inspections learned from
+    hits = db.Column(db.Integer, default=0)
+    misses = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<RoiHint camera={self.camera_id} product={self.product_id}>'
+
+    def to_dict(self):
+        attempts = (self.hits or 0) + (self.misses or 0)
+        return {
+            'id': self.id,
+            'camera_id': self.camera_id,
+            'product_id': self.product_id,
+            'region': {'x': self.x, 'y': self.y, 'width': self.width, 'height': self.height},
+            'samples': self.samples,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / attempts * 100) if attempts > 0 else 0,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+def upgrade_schema():
+    """Tambahkan kolom dan index baru ke tabel yang sudah ada (db.create_all tidak mengubah tabel lama)"""
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=db.session.connection())
+    db.session.commit()
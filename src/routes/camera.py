@@ -1,10 +1,17 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from src.models.product import Camera, db
-from src.services.camera_service import CameraService
+from src.services.camera_broker import get_camera_service
+from src.services.roi_hint_service import RoiHintService
+from src.services.stream_service import StreamService
+from src.services.virtual_camera import SOURCE_TYPES
+from src.services.ocr_engines import OCR_ENGINES
 import json
+import time
 
 camera_bp = Blueprint('camera', __name__)
-camera_service = CameraService()
+camera_service = get_camera_service()
+roi_hint_service = RoiHintService()
+stream_service = StreamService(camera_service)
 
 @camera_bp.route('/cameras', methods=['GET'])
 def get_cameras():
@@ -43,7 +50,17 @@ def create_camera():
         data = request.get_json()
         
         # Validasi input
-        required_fields = ['name', 'index']
+        source_type = data.get('source_type', 'device')
+        if source_type not in SOURCE_TYPES:
+            return jsonify({
+                'success': False,
+                'error': f'Invalid source_type: {source_type}'
+            }), 400
+        
+        # Virtual cameras need a source path instead of a device index
+        required_fields = ['name', 'index'] if source_type == 'device' else ['name']
+        if source_type in ('video', 'images'):
+            required_fields.append('source_path')
         for field in required_fields:
             if field not in data:
                 return jsonify({
@@ -51,6 +68,12 @@ def create_camera():
                     'error': f'Missing required field: {field}'
                 }), 400
         
+        if data.get('ocr_engine') and data['ocr_engine'] not in OCR_ENGINES:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown OCR engine: {data['ocr_engine']}"
+            }), 400
+        
         # Cek apakah nama kamera sudah ada
         existing_camera = Camera.query.filter_by(name=data['name']).first()
         if existing_camera:
@@ -62,12 +85,16 @@ def create_camera():
         # Buat kamera baru
         camera = Camera(
             name=data['name'],
-            index=data['index'],
+            index=data.get('index', 0),
+            source_type=source_type,
+            source_path=data.get('source_path'),
+            source_fps=data.get('source_fps'),
             resolution_width=data.get('resolution_width', 640),
             resolution_height=data.get('resolution_height', 480),
             brightness=data.get('brightness', 50),
             contrast=data.get('contrast', 50),
             zoom=data.get('zoom', 100),
+            ocr_engine=data.get('ocr_engine'),
             is_active=data.get('is_active', True)
         )
         
@@ -93,11 +120,28 @@ def update_camera(camera_id):
         camera = Camera.query.get_or_404(camera_id)
         data = request.get_json()
         
+        if data.get('ocr_engine') and data['ocr_engine'] not in OCR_ENGINES:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown OCR engine: {data['ocr_engine']}"
+            }), 400
+        
         # Update fields
         if 'name' in data:
             camera.name = data['name']
         if 'index' in data:
             camera.index = data['index']
+        if 'source_type' in data:
+            if data['source_type'] not in SOURCE_TYPES:
+                return jsonify({
+                    'success': False,
+                    'error': f"Invalid source_type: {data['source_type']}"
+                }), 400
+            camera.source_type = data['source_type']
+        if 'source_path' in data:
+            camera.source_path = data['source_path']
+        if 'source_fps' in data:
+            camera.source_fps = data['source_fps']
         if 'resolution_width' in data:
             camera.resolution_width = data['resolution_width']
         if 'resolution_height' in data:
@@ -108,6 +152,8 @@ def update_camera(camera_id):
             camera.contrast = data['contrast']
         if 'zoom' in data:
             camera.zoom = data['zoom']
+        if 'ocr_engine' in data:
+            camera.ocr_engine = data['ocr_engine'] or None
         if 'is_active' in data:
             camera.is_active = data['is_active']
         
@@ -176,15 +222,78 @@ def capture_frame(camera_id):
         camera = Camera.query.get_or_404(camera_id)
         
         # Capture frame
-        frame = camera_service.capture_frame(camera_id)
+        frame, timestamp, sequence = camera_service.get_frame(camera_id)
         
         # Convert to base64 for frontend
-        frame_base64 = camera_service.frame_to_base64(frame)
+        frame_base64 = camera_service.frame_to_base64(frame, camera_id, sequence)
         
         return jsonify({
             'success': True,
             'image': frame_base64,
-            'camera_name': camera.name
+            'camera_name': camera.name,
+            'timestamp': timestamp
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@camera_bp.route('/cameras/capture', methods=['POST'])
+def capture_multiple_frames():
+    """Mengambil frame dari beberapa kamera sekaligus"""
+    try:
+        data = request.get_json() or {}
+        camera_ids = data.get('camera_ids')
+        if not camera_ids:
+            return jsonify({
+                'success': False,
+                'error': 'camera_ids is required'
+            }), 400
+        
+        cameras = {camera.id: camera for camera in Camera.query.filter(Camera.id.in_(camera_ids)).all()}
+        
+        # With synchronized=true only frames grabbed after this request
+        # arrived are accepted, so all stations show the same moment
+        newer_than = data.get('newer_than')
+        if data.get('synchronized', False):
+            newer_than = time.time()
+        
+        for camera in cameras.values():
+            camera_service.ensure_camera(camera.to_dict())
+        
+        captured = camera_service.capture_frames(list(cameras.keys()), newer_than=newer_than, timeout=data.get('timeout'))
+        
+        frames = []
+        for camera_id in camera_ids:
+            camera = cameras.get(camera_id)
+            if camera is None:
+                frames.append({'camera_id': camera_id, 'success': False, 'error': 'Camera not found'})
+                continue
+            
+            result = captured[camera_id]
+            if 'error' in result:
+                frames.append({'camera_id': camera_id, 'camera_name': camera.name, 'success': False, 'error': result['error']})
+                continue
+            
+            frame_data = {
+                'camera_id': camera_id,
+                'camera_name': camera.name,
+                'success': True,
+                'timestamp': result['timestamp'],
+                'sequence': result['sequence']
+            }
+            if data.get('include_images', True):
+                frame_data['image'] = camera_service.frame_to_base64(result['frame'], camera_id, result['sequence'])
+            frames.append(frame_data)
+        
+        timestamps = [frame['timestamp'] for frame in frames if frame['success']]
+        
+        return jsonify({
+            'success': any(frame['success'] for frame in frames),
+            'frames': frames,
+            'timestamp_spread_ms': (max(timestamps) - min(timestamps)) * 1000 if timestamps else None
         })
         
     except Exception as e:
@@ -200,19 +309,21 @@ def get_camera_preview(camera_id):
         camera = Camera.query.get_or_404(camera_id)
         
         # Initialize camera if not already initialized
-        if camera_id not in camera_service.cameras:
-            camera_service.initialize_camera(camera.to_dict())
+        camera_service.ensure_camera(camera.to_dict())
         
-        # Capture frame
-        frame = camera_service.capture_frame(camera_id)
+        # Latest frame from the grab thread; clients polling for a live feed
+        # pass the previous timestamp to wait for a new frame
+        newer_than = request.args.get('newer_than', type=float)
+        frame, timestamp, sequence = camera_service.get_frame(camera_id, newer_than=newer_than)
         
         # Convert to base64
-        frame_base64 = camera_service.frame_to_base64(frame)
+        frame_base64 = camera_service.frame_to_base64(frame, camera_id, sequence)
         
         return jsonify({
             'success': True,
             'image': frame_base64,
-            'timestamp': camera_service.cameras[camera_id].get(cv2.CAP_PROP_POS_MSEC) if camera_id in camera_service.cameras else 0
+            'timestamp': timestamp,
+            'sequence': sequence
         })
         
     except Exception as e:
@@ -221,6 +332,48 @@ def get_camera_preview(camera_id):
             'error': str(e)
         }), 500
 
+@camera_bp.route('/cameras/<int:camera_id>/stream', methods=['GET'])
+def stream_camera(camera_id):
+    """Live feed MJPEG (multipart/x-mixed-replace) dari kamera"""
+    try:
+        camera = Camera.query.get_or_404(camera_id)
+        
+        camera_service.ensure_camera(camera.to_dict())
+        
+        # All viewers with the same settings share one encoder, so each
+        # extra tab only costs the socket write
+        return Response(
+            stream_service.stream(
+                camera_id,
+                fps=request.args.get('fps', type=float),
+                width=request.args.get('width', type=int),
+                quality=request.args.get('quality', type=int)
+            ),
+            mimetype=f'multipart/x-mixed-replace; boundary={stream_service.boundary}',
+            headers={'Cache-Control': 'no-cache, no-store', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@camera_bp.route('/cameras/streams', methods=['GET'])
+def get_stream_stats():
+    """Statistik stream MJPEG yang aktif"""
+    try:
+        return jsonify({
+            'success': True,
+            'streams': stream_service.get_stats(),
+            'frame_cache': camera_service.frame_cache.stats()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @camera_bp.route('/cameras/<int:camera_id>/release', methods=['POST'])
 def release_camera(camera_id):
     """Release kamera"""
@@ -238,3 +391,37 @@ def release_camera(camera_id):
             'error': str(e)
         }), 500
 
+@camera_bp.route('/cameras/<int:camera_id>/roi-hints', methods=['GET'])
+def get_roi_hints(camera_id):
+    """Mendapatkan hint ROI label yang dipelajari beserta hit rate"""
+    try:
+        Camera.query.get_or_404(camera_id)
+        
+        return jsonify({
+            'success': True,
+            'roi_hints': roi_hint_service.get_stats(camera_id)
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@camera_bp.route('/cameras/<int:camera_id>/roi-hints', methods=['DELETE'])
+def reset_roi_hints(camera_id):
+    """Reset hint ROI label untuk kamera"""
+    try:
+        roi_hint_service.reset(camera_id)
+        
+        return jsonify({
+            'success': True,
+            'message': 'ROI hints reset successfully'
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
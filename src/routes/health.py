@@ -1,5 +1,8 @@
 from flask import Blueprint, jsonify
 from src.models.product import db
+from src.services.image_archive import image_archive
+from src.services.image_retention import image_retention
+from src.services.inspection_writer import inspection_writer
 import cv2
 import pytesseract
 from datetime import datetime
@@ -48,6 +51,9 @@ def health_check():
                 'tesseract': str(tesseract_version),
                 'camera': 'available' if camera_available else 'not available'
             },
+            'image_archive': image_archive.get_stats(),
+            'image_retention': image_retention.get_stats(),
+            'inspection_writer': inspection_writer.get_stats(),
             'version': '1.0.0'
         })
         
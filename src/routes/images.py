@@ -0,0 +1,55 @@
+from flask import Blueprint, request, jsonify, Response
+from src.services.image_retention import image_retention
+
+images_bp = Blueprint('images', __name__)
+
+IMAGE_MIMETYPES = {
+    'jpg': 'image/jpeg',
+    'webp': 'image/webp',
+    'png': 'image/png'
+}
+
+@images_bp.route('/images/retention', methods=['GET'])
+def get_retention_stats():
+    """Status retensi gambar (tier resolusi penuh dan pack per hari)"""
+    try:
+        return jsonify({
+            'success': True,
+            'retention': image_retention.get_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@images_bp.route('/images/retention/run', methods=['POST'])
+def run_retention():
+    """Jalankan retensi sekarang: pack semua hari yang lebih lama dari IMAGE_RETENTION_DAYS"""
+    try:
+        result = image_retention.run_once()
+        return jsonify({
+            'success': True,
+            'packed_days': result['days'],
+            'packed_files': result['files'],
+            'retention': image_retention.get_stats()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@images_bp.route('/images/<path:path>', methods=['GET'])
+def get_image(path):
+    """Ambil gambar inspeksi dari captured_image_path, baik file lepas maupun di pack
+
+    ?thumbnail=1 mengembalikan thumbnail (atau gambar penuh jika tidak ada).
+    """
+    try:
+        thumbnail = request.args.get('thumbnail', 'false').lower() in ('1', 'true', 'yes')
+        image = image_retention.read_image(path, thumbnail=thumbnail)
+        if image is None:
+            return jsonify({'success': False, 'error': 'Image not found'}), 404
+
+        data, extension = image
+        response = Response(data, mimetype=IMAGE_MIMETYPES[extension])
+        # Archive paths are content hashes, so an image never changes
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
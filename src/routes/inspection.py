@@ -1,122 +1,106 @@
-from flask import Blueprint, request, jsonify
-from src.models.product import Product, Inspection, Camera, db
-from src.services.camera_service import CameraService
+from flask import Blueprint, request, jsonify, current_app, Response, url_for
+from werkzeug.exceptions import BadRequest, HTTPException, RequestEntityTooLarge
+from src.models.product import Inspection, Camera, db
+from src.services.camera_broker import get_camera_service
 from src.services.ocr_service import OCRService
 from src.services.item_check_service import ItemCheckService
-import cv2
+from src.services.roi_hint_service import RoiHintService
+from src.services.change_gate import FrameChangeGate
+from src.services.inspection_pipeline import InspectionPipeline
+from src.services.inspection_scheduler import InspectionScheduler, TRIGGER_MODES
+from src.services.inspection_events import inspection_events
+from src.services.inspection_jobs import InspectionJobService, JOB_MODES
 import numpy as np
-import base64
 import os
 import json
-from datetime import datetime
+from sqlalchemy import func
 
 inspection_bp = Blueprint('inspection', __name__)
-camera_service = CameraService()
+camera_service = get_camera_service()
 ocr_service = OCRService()
 item_check_service = ItemCheckService()
+roi_hint_service = RoiHintService()
+change_gate = FrameChangeGate()
+inspection_pipeline = InspectionPipeline(camera_service, ocr_service, item_check_service, roi_hint_service, change_gate)
+inspection_scheduler = InspectionScheduler(inspection_pipeline)
+inspection_jobs = InspectionJobService(inspection_pipeline)
+
+IMAGE_MIMETYPES = ('image/jpeg', 'image/png')
+
+def _request_options():
+    """Body request sebagai dict opsi inspeksi: JSON, multipart/form-data, atau raw image/jpeg|png
+
+    Gambar biner disimpan sebagai bytes di 'image_bytes' dan di-decode langsung
+    dari buffer tersebut. Pada multipart, opsi lain dikirim sebagai field form;
+    pada raw body, lewat query string. Opsi yang tidak valid melempar
+    BadRequest; view meneruskan HTTPException (400, atau 413 untuk body
+    chunked yang terlalu besar) ke error handler aplikasi.
+    """
+    if request.mimetype in IMAGE_MIMETYPES:
+        options = request.args.to_dict()
+        options['image_bytes'] = request.get_data(cache=False)
+        limit = request.max_content_length
+        if request.content_length is None and limit is not None and len(options['image_bytes']) >= limit:
+            # A chunked body is cut off at the limit instead of failing
+            raise RequestEntityTooLarge()
+    elif request.mimetype == 'multipart/form-data':
+        options = request.form.to_dict()
+        image_file = request.files.get('image')
+        if image_file is not None:
+            options['image_bytes'] = image_file.read()
+    else:
+        return request.get_json()
+    
+    # Form fields and query parameters arrive as strings
+    try:
+        for key in ('camera_id', 'product_id', 'x', 'y', 'width', 'height'):
+            if options.get(key):
+                options[key] = int(options[key])
+        if options.get('detection_area'):
+            options['detection_area'] = json.loads(options['detection_area'])
+    except ValueError as e:
+        raise BadRequest(f"Invalid request option: {e}")
+    for key in ('async', 'gate', 'use_roi_hint', 'durable'):
+        if key in options:
+            options[key] = options[key].lower() in ('1', 'true', 'yes')
+    return options
+
+def _wants_async(data):
+    return bool(data.get('async') or request.args.get('async', type=int))
+
+def _submit_job(mode, data):
+    """Antrekan inspeksi ke worker pool, 202 dengan job id atau 429 jika antrean penuh"""
+    job = inspection_jobs.submit(current_app._get_current_object(), mode, data)
+    if job is None:
+        response = jsonify({
+            'success': False,
+            'error': 'Inspection queue is full, retry later'
+        })
+        response.headers['Retry-After'] = '1'
+        return response, 429
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('inspection.get_inspection_job', job_id=job.id)
+    }), 202
 
 @inspection_bp.route('/inspect/manual', methods=['POST'])
 def manual_inspection():
     """Inspeksi manual dengan upload gambar atau capture dari kamera"""
     try:
-        data = request.get_json()
+        data = _request_options()
         
-        # Get image data
-        if 'image_base64' in data:
-            # Decode base64 image
-            image_data = data['image_base64']
-            if image_data.startswith('data:image'):
-                image_data = image_data.split(',')[1]
-            
-            image_bytes = base64.b64decode(image_data)
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-        elif 'camera_id' in data:
-            # Capture from camera
-            camera_id = data['camera_id']
-            image = camera_service.capture_frame(camera_id)
-            
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'No image data or camera_id provided'
-            }), 400
+        if _wants_async(data):
+            return _submit_job('manual', data)
         
-        # Get detection area if provided (for manual area selection)
-        detection_area = data.get('detection_area')
-        region = None
-        if detection_area:
-            region = {
-                'x': int(detection_area['x']),
-                'y': int(detection_area['y']),
-                'width': int(detection_area['width']),
-                'height': int(detection_area['height'])
-            }
-        
-        # Use manual part number if provided, otherwise perform OCR
-        if 'detected_part_number' in data and data['detected_part_number']:
-            # Manual part number input
-            part_number = data['detected_part_number']
-            ocr_result = {
-                'part_number': part_number,
-                'raw_text': part_number,
-                'confidence': 100.0,
-                'details': []
-            }
-        else:
-            # Perform OCR
-            ocr_result = ocr_service.extract_text_from_image(image, region)
-            part_number = ocr_result['part_number']
-        
-        # Validate part number
-        is_valid, validation_message = ocr_service.validate_part_number(part_number)
-        
-        # Check if part number exists in database
-        product = None
-        if part_number:
-            product = Product.query.filter_by(part_number=part_number).first()
-        
-        # Execute item checks
-        item_check_results = item_check_service.execute_item_checks(image, part_number)
-        
-        # Overall inspection result
-        inspection_passed = is_valid and product is not None and item_check_results['overall_pass']
-        
-        # Save image
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        image_filename = f"manual_inspection_{timestamp}.jpg"
-        image_path = os.path.join('src', 'static', 'images', image_filename)
-        os.makedirs(os.path.dirname(image_path), exist_ok=True)
-        cv2.imwrite(image_path, image)
-        
-        # Create inspection record
-        inspection = Inspection(
-            product_id=product.id if product else None,
-            captured_image_path=image_path,
-            detected_part_number=part_number,
-            is_ok=inspection_passed,
-            inspection_mode='manual',
-            confidence_score=ocr_result['confidence'],
-            detection_area=json.dumps(detection_area) if detection_area else None
-        )
-        
-        db.session.add(inspection)
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'inspection': inspection.to_dict(),
-            'ocr_result': ocr_result,
-            'validation': {
-                'is_valid': is_valid,
-                'message': validation_message
-            },
-            'product_exists': product is not None,
-            'product': product.to_dict() if product else None,
-            'item_check_results': item_check_results
-        })
+        result = inspection_pipeline.run_manual(data)
+        if not result['success']:
+            return jsonify(result), 400
+        return jsonify(result)
         
+    except HTTPException:
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -137,76 +121,128 @@ def auto_inspection():
                 'error': 'Camera ID is required'
             }), 400
         
-        # Capture image from camera
-        image = camera_service.capture_frame(camera_id)
+        if _wants_async(data):
+            return _submit_job('auto', data)
         
-        # Detect text regions automatically
-        results = ocr_service.detect_and_extract_multiple_regions(image)
+        result = inspection_pipeline.run_auto(camera_id, data)
+        if not result['success']:
+            return jsonify(result), 400
+        return jsonify(result)
         
-        if not results:
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/inspect/batch', methods=['POST'])
+def batch_inspection():
+    """Inspeksi banyak gambar (satu tray) dalam satu request dan satu transaksi"""
+    try:
+        data = _request_options()
+        
+        # JSON: 'images' is a list of base64 strings or objects with
+        # image_base64 plus per-image detection_area / detected_part_number;
+        # multipart: every file in the 'images' field
+        if request.mimetype == 'multipart/form-data':
+            items = [{'image_bytes': image_file.read()} for image_file in request.files.getlist('images')]
+        else:
+            images = data.get('images', [])
+            if not isinstance(images, list):
+                return jsonify({
+                    'success': False,
+                    'error': "'images' must be a list"
+                }), 400
+            # Entries of any other type are reported as per-item errors
+            items = [
+                {'image_base64': item} if isinstance(item, str) else item
+                for item in images
+            ]
+        options = {key: value for key, value in data.items() if key != 'images'}
+        
+        max_images = int(os.environ.get('INSPECTION_BATCH_MAX_IMAGES', 100))
+        if len(items) > max_images:
             return jsonify({
                 'success': False,
-                'error': 'No text regions detected'
+                'error': f'Too many images in one batch (maximum {max_images})'
             }), 400
         
-        # Use the best result (highest confidence)
-        best_result = results[0]
-        ocr_result = best_result['ocr_result']
-        detection_area = best_result['region']
-        part_number = ocr_result['part_number']
-        
-        # Validate part number
-        is_valid, validation_message = ocr_service.validate_part_number(part_number)
+        result = inspection_pipeline.run_batch(items, options)
+        if not result['success']:
+            return jsonify(result), 400
+        return jsonify(result)
         
-        # Check if part number exists in database
-        product = None
-        if part_number:
-            product = Product.query.filter_by(part_number=part_number).first()
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/inspect/jobs', methods=['POST'])
+def submit_inspection_job():
+    """Antrekan inspeksi async (mode manual atau auto), body sama dengan endpoint sinkron"""
+    try:
+        data = request.get_json()
+        mode = data.get('mode', 'manual')
+        if mode not in JOB_MODES:
+            return jsonify({
+                'success': False,
+                'error': f'Unknown inspection mode: {mode}'
+            }), 400
+        if mode == 'auto' and not data.get('camera_id'):
+            return jsonify({
+                'success': False,
+                'error': 'Camera ID is required'
+            }), 400
         
-        # Execute item checks
-        item_check_results = item_check_service.execute_item_checks(image, part_number)
-        
-        # Overall inspection result
-        inspection_passed = is_valid and product is not None and item_check_results['overall_pass']
-        
-        # Save image
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        image_filename = f"auto_inspection_{timestamp}.jpg"
-        image_path = os.path.join('src', 'static', 'images', image_filename)
-        os.makedirs(os.path.dirname(image_path), exist_ok=True)
-        cv2.imwrite(image_path, image)
-        
-        # Create inspection record
-        inspection = Inspection(
-            product_id=product.id if product else None,
-            captured_image_path=image_path,
-            detected_part_number=part_number,
-            is_ok=inspection_passed,
-            inspection_mode='auto',
-            confidence_score=ocr_result['confidence'],
-            detection_area=json.dumps(detection_area)
-        )
+        return _submit_job(mode, data)
         
-        db.session.add(inspection)
-        db.session.commit()
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/inspect/jobs', methods=['GET'])
+def get_inspection_job_stats():
+    """Statistik worker pool inspeksi async"""
+    try:
+        return jsonify({
+            'success': True,
+            'jobs': inspection_jobs.get_stats()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/inspect/jobs/<job_id>', methods=['GET'])
+def get_inspection_job(job_id):
+    """Status dan hasil job inspeksi; ?wait=detik untuk long-poll hingga job selesai"""
+    try:
+        wait = min(request.args.get('wait', 0, type=float), 30)
+        job = inspection_jobs.get_job(job_id, wait)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': 'Job not found'
+            }), 404
         
         return jsonify({
             'success': True,
-            'inspection': inspection.to_dict(),
-            'ocr_result': ocr_result,
-            'detection_area': detection_area,
-            'all_results': results,
-            'validation': {
-                'is_valid': is_valid,
-                'message': validation_message
-            },
-            'product_exists': product is not None,
-            'product': product.to_dict() if product else None,
-            'item_check_results': item_check_results
+            'job': job.to_dict()
         })
         
     except Exception as e:
-        db.session.rollback()
         return jsonify({
             'success': False,
             'error': str(e)
@@ -216,22 +252,17 @@ def auto_inspection():
 def inspect_specific_area():
     """Inspeksi area spesifik yang ditentukan dengan koordinat"""
     try:
-        data = request.get_json()
+        data = _request_options()
         
         # Get image
-        if 'image_base64' in data:
-            image_data = data['image_base64']
-            if image_data.startswith('data:image'):
-                image_data = image_data.split(',')[1]
-            
-            image_bytes = base64.b64decode(image_data)
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-        elif 'camera_id' in data:
-            camera_id = data['camera_id']
-            image = camera_service.capture_frame(camera_id)
-        else:
+        try:
+            image = inspection_pipeline.load_image(data)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        if image is None:
             return jsonify({
                 'success': False,
                 'error': 'No image source provided'
@@ -250,7 +281,8 @@ def inspect_specific_area():
             }), 400
         
         # Perform OCR on specific area
-        ocr_result = ocr_service.extract_text_from_coordinates(image, x, y, width, height)
+        ocr_engine = inspection_pipeline.resolve_ocr_engine(data, data.get('camera_id'), data.get('product_id'))
+        ocr_result = ocr_service.extract_text_from_coordinates(image, x, y, width, height, engine=ocr_engine)
         
         # Validate part number
         is_valid, validation_message = ocr_service.validate_part_number(ocr_result['part_number'])
@@ -276,6 +308,8 @@ def inspect_specific_area():
             'item_check_results': item_check_results
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         return jsonify({
             'success': False,
@@ -339,6 +373,15 @@ def get_inspection_stats():
         auto_inspections = query.filter_by(inspection_mode='auto').count()
         manual_inspections = query.filter_by(inspection_mode='manual').count()
         
+        # Which OCR cascade stage answered, and how long it took on average
+        stage_rows = query.with_entities(
+            Inspection.ocr_stage, func.count(Inspection.id), func.avg(Inspection.ocr_time_ms)
+        ).filter(Inspection.ocr_stage.isnot(None)).group_by(Inspection.ocr_stage).all()
+        ocr_stages = {
+            stage: {'count': count, 'avg_ocr_time_ms': avg_time or 0}
+            for stage, count, avg_time in stage_rows
+        }
+        
         # Get current running part number (most recent inspection)
         latest_inspection = Inspection.query.order_by(Inspection.inspected_at.desc()).first()
         current_part_number = latest_inspection.detected_part_number if latest_inspection else None
@@ -353,7 +396,8 @@ def get_inspection_stats():
                 'manual_count': manual_inspections,
                 'ok_percentage': (ok_inspections / total_inspections * 100) if total_inspections > 0 else 0,
                 'ng_percentage': (ng_inspections / total_inspections * 100) if total_inspections > 0 else 0,
-                'current_part_number': current_part_number
+                'current_part_number': current_part_number,
+                'ocr_stages': ocr_stages
             }
         })
         
@@ -363,6 +407,96 @@ def get_inspection_stats():
             'error': str(e)
         }), 500
 
+@inspection_bp.route('/inspections/events', methods=['GET'])
+def stream_inspection_events():
+    """Stream Server-Sent Events berisi inspeksi baru dan counter OK/NG incremental"""
+    try:
+        camera_id = request.args.get('camera_id', type=int)
+        mode = request.args.get('mode')  # 'auto' or 'manual'
+        from_date = request.args.get('from_date')
+        
+        # EventSource sends Last-Event-ID on reconnect; the query parameter
+        # lets a fresh page resume from a cursor it stored itself
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Last-Event-ID must be an inspection id'
+            }), 400
+        
+        # Taken before the snapshot so nothing committed in between is missed
+        position = inspection_events.position()
+        
+        query = Inspection.query
+        if camera_id is not None:
+            query = query.filter_by(camera_id=camera_id)
+        if mode:
+            query = query.filter_by(inspection_mode=mode)
+        if from_date:
+            query = query.filter(Inspection.inspected_at >= from_date)
+        
+        # One grouped query per connection; later counters are incremental
+        ok_count = ng_count = counted_up_to = 0
+        for is_ok, count, max_id in query.with_entities(
+            Inspection.is_ok, func.count(Inspection.id), func.max(Inspection.id)
+        ).group_by(Inspection.is_ok).all():
+            if is_ok:
+                ok_count = count
+            else:
+                ng_count = count
+            counted_up_to = max(counted_up_to, max_id or 0)
+        total = ok_count + ng_count
+        latest_inspection = query.order_by(Inspection.id.desc()).first()
+        stats = {
+            'total_inspections': total,
+            'ok_count': ok_count,
+            'ng_count': ng_count,
+            'ok_percentage': (ok_count / total * 100) if total > 0 else 0,
+            'ng_percentage': (ng_count / total * 100) if total > 0 else 0,
+            'current_part_number': latest_inspection.detected_part_number if latest_inspection else None
+        }
+        
+        backfill = []
+        if last_event_id is not None:
+            resume_position = inspection_events.find_position(last_event_id)
+            if resume_position is not None:
+                position = resume_position
+            else:
+                # Cursor is older than the in-memory history (or the server
+                # restarted): replay the newest missed inspections from the database
+                missed = query.filter(Inspection.id > last_event_id).order_by(Inspection.id.desc()).limit(
+                    int(os.environ.get('SSE_BACKFILL_LIMIT', 500))
+                ).all()
+                backfill = [inspection.to_event_dict() for inspection in reversed(missed)]
+        
+        return Response(
+            inspection_events.stream(position, stats, camera_id, mode or None, backfill, counted_up_to),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/inspections/events/stats', methods=['GET'])
+def get_inspection_event_stats():
+    """Statistik stream SSE inspeksi (jumlah subscriber, event dipublikasikan)"""
+    try:
+        return jsonify({
+            'success': True,
+            'events': inspection_events.get_stats()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @inspection_bp.route('/inspect/test-item-checks', methods=['POST'])
 def test_item_checks():
     """Test endpoint untuk menguji item checks"""
@@ -382,9 +516,231 @@ def test_item_checks():
             'item_check_results': results
         })
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@inspection_bp.route('/inspect/gate', methods=['GET'])
+def get_gate_stats():
+    """Statistik gate perubahan frame (inspeksi yang dilewati) per kamera"""
+    try:
+        return jsonify({
+            'success': True,
+            'gate': change_gate.get_stats(request.args.get('camera_id', type=int))
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/inspect/gate', methods=['DELETE'])
+def reset_gate():
+    """Reset gate perubahan frame (satu kamera atau semua)"""
+    try:
+        change_gate.reset(request.args.get('camera_id', type=int))
+        return jsonify({
+            'success': True,
+            'message': 'Change gate reset successfully'
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/inspect/scheduler', methods=['GET'])
+def get_scheduler_status():
+    """Status inspeksi kontinu server-side semua kamera"""
+    try:
+        return jsonify({
+            'success': True,
+            'config': inspection_scheduler.get_config(),
+            'cameras': inspection_scheduler.get_status()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/inspect/scheduler/start', methods=['POST'])
+def start_scheduler_all():
+    """Mulai inspeksi kontinu untuk semua kamera aktif"""
+    try:
+        data = request.get_json(silent=True) or {}
+        app = current_app._get_current_object()
+        started = []
+        errors = {}
+        for camera in Camera.query.filter_by(is_active=True).all():
+            try:
+                started.append(inspection_scheduler.start(
+                    app, camera.id, data.get('trigger', 'interval'), data.get('interval_ms'), data.get('options')
+                ))
+            except Exception as e:
+                errors[camera.id] = str(e)
+        return jsonify({
+            'success': True,
+            'cameras': started,
+            'errors': errors
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/inspect/scheduler/stop', methods=['POST'])
+def stop_scheduler_all():
+    """Hentikan inspeksi kontinu semua kamera"""
+    try:
+        return jsonify({
+            'success': True,
+            'cameras': inspection_scheduler.stop_all()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/inspect/scheduler/<int:camera_id>', methods=['GET'])
+def get_camera_scheduler_status(camera_id):
+    """Status inspeksi kontinu satu kamera"""
+    try:
+        status = inspection_scheduler.get_status(camera_id)
+        return jsonify({
+            'success': True,
+            'running': bool(status),
+            'status': status[0] if status else None
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/inspect/scheduler/<int:camera_id>/start', methods=['POST'])
+def start_camera_scheduler(camera_id):
+    """Mulai inspeksi kontinu server-side untuk satu kamera"""
+    try:
+        data = request.get_json(silent=True) or {}
+        camera = db.session.get(Camera, camera_id)
+        if camera is None:
+            return jsonify({
+                'success': False,
+                'error': 'Camera not found'
+            }), 404
+        
+        trigger = data.get('trigger', 'interval')
+        if trigger not in TRIGGER_MODES:
+            return jsonify({
+                'success': False,
+                'error': f'Unknown trigger mode: {trigger}'
+            }), 400
+        
+        status = inspection_scheduler.start(
+            current_app._get_current_object(), camera_id, trigger, data.get('interval_ms'), data.get('options')
+        )
+        return jsonify({
+            'success': True,
+            'status': status
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/inspect/scheduler/<int:camera_id>/stop', methods=['POST'])
+def stop_camera_scheduler(camera_id):
+    """Hentikan inspeksi kontinu server-side untuk satu kamera"""
+    try:
+        status = inspection_scheduler.stop(camera_id)
+        if status is None:
+            return jsonify({
+                'success': False,
+                'error': 'Continuous inspection is not running for this camera'
+            }), 404
+        return jsonify({
+            'success': True,
+            'status': status
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/ocr/stats', methods=['GET'])
+def get_ocr_stats():
+    """Mendapatkan statistik OCR per stage cascade sejak server berjalan"""
+    try:
+        return jsonify({
+            'success': True,
+            'stages': ocr_service.get_stage_stats(),
+            'cache': ocr_service.get_cache_stats()
+        })
+        
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@inspection_bp.route('/ocr/engines', methods=['GET'])
+def get_ocr_engines():
+    """Mendapatkan daftar engine OCR yang tersedia"""
+    try:
+        return jsonify({
+            'success': True,
+            'default_engine': ocr_service.default_engine,
+            'engines': ocr_service.get_engines_info()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/ocr/cache', methods=['GET'])
+def get_ocr_cache_stats():
+    """Mendapatkan statistik cache hasil OCR"""
+    try:
+        return jsonify({
+            'success': True,
+            'cache': ocr_service.get_cache_stats()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@inspection_bp.route('/ocr/cache', methods=['DELETE'])
+def clear_ocr_cache():
+    """Mengosongkan cache hasil OCR"""
+    try:
+        ocr_service.clear_cache()
+        
+        return jsonify({
+            'success': True,
+            'message': 'OCR cache cleared successfully'
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from src.models.product import Product, db
+from src.services.part_number_index import part_number_index
+from src.services.ocr_engines import OCR_ENGINES
 
 product_bp = Blueprint('product', __name__)
 
@@ -52,6 +54,12 @@ def create_product():
                 'error': 'Part number is required'
             }), 400
         
+        if data.get('ocr_engine') and data['ocr_engine'] not in OCR_ENGINES:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown OCR engine: {data['ocr_engine']}"
+            }), 400
+        
         # Cek apakah part number sudah ada
         existing_product = Product.query.filter_by(part_number=data['part_number']).first()
         if existing_product:
@@ -63,12 +71,17 @@ def create_product():
         # Buat produk baru
         product = Product(
             part_number=data['part_number'],
-            description=data.get('description', '')
+            description=data.get('description', ''),
+            ocr_engine=data.get('ocr_engine')
         )
         
         db.session.add(product)
         db.session.commit()
         
+        # Keep the catalog index in sync without a full rebuild
+        part_number_index.add(product.part_number)
+        part_number_index.refresh_signature()
+        
         return jsonify({
             'success': True,
             'product': product.to_dict()
@@ -103,6 +116,13 @@ def update_product(product_id):
     try:
         product = Product.query.get_or_404(product_id)
         data = request.get_json()
+        old_part_number = product.part_number
+        
+        if data.get('ocr_engine') and data['ocr_engine'] not in OCR_ENGINES:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown OCR engine: {data['ocr_engine']}"
+            }), 400
         
         # Update fields
         if 'part_number' in data:
@@ -117,9 +137,15 @@ def update_product(product_id):
         
         if 'description' in data:
             product.description = data['description']
+        if 'ocr_engine' in data:
+            product.ocr_engine = data['ocr_engine'] or None
         
         db.session.commit()
         
+        if product.part_number != old_part_number:
+            part_number_index.rename(old_part_number, product.part_number)
+        part_number_index.refresh_signature()
+        
         return jsonify({
             'success': True,
             'product': product.to_dict()
@@ -137,10 +163,14 @@ def delete_product(product_id):
     """Hapus produk"""
     try:
         product = Product.query.get_or_404(product_id)
+        part_number = product.part_number
         
         db.session.delete(product)
         db.session.commit()
         
+        part_number_index.remove(part_number)
+        part_number_index.refresh_signature()
+        
         return jsonify({
             'success': True,
             'message': 'Product deleted successfully'
@@ -197,10 +227,19 @@ def validate_part_number():
         # Cek apakah part number ada di database
         product = Product.query.filter_by(part_number=part_number).first()
         
+        # Suggest the closest catalog part number when there is no exact match
+        closest_match = None
+        if product is None:
+            part_number_index.ensure_loaded()
+            match, distance = part_number_index.lookup(part_number)
+            if match is not None:
+                closest_match = {'part_number': match, 'distance': distance}
+        
         return jsonify({
             'success': True,
             'exists': product is not None,
-            'product': product.to_dict() if product else None
+            'product': product.to_dict() if product else None,
+            'closest_match': closest_match
         })
         
     except Exception as e:
@@ -0,0 +1,382 @@
+import os
+import ipaddress
+import logging
+import secrets
+import stat
+import threading
+import time
+import weakref
+from collections import deque
+from multiprocessing.managers import BaseManager
+
+from src.services.camera_service import CameraService
+from src.services.shared_frame_ring import SharedFrameRing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BROKER_ADDRESS = ('127.0.0.1', 50010)
+
+
+class CameraBroker:
+    """Objek di proses broker yang memiliki semua device kamera
+
+    Semua method menerima dan mengembalikan data yang bisa di-pickle sehingga
+    dapat dipanggil dari proses worker lewat proxy BaseManager. Frame dibagikan
+    lewat ring shared memory per kamera; worker meminjam slot dengan
+    lease_frame dan mengembalikannya dengan release_frames.
+    """
+
+    def __init__(self, camera_service=None, lease_ttl=None):
+        if camera_service is None:
+            buffer_size = int(os.environ.get('CAMERA_FRAME_BUFFER', 4))
+            ring_slots = int(os.environ.get('CAMERA_RING_SLOTS', buffer_size + 8))
+            camera_service = CameraService(ring_slots=ring_slots)
+        self.camera_service = camera_service
+        # Leases neither returned nor renewed within this time (the worker
+        # died) are reclaimed
+        self.lease_ttl = lease_ttl if lease_ttl is not None else float(os.environ.get('CAMERA_LEASE_TTL', 30))
+        self._leases = {}
+        self._lease_counter = 0
+        self._lease_lock = threading.Lock()
+
+    def get_available_cameras(self):
+        return self.camera_service.get_available_cameras()
+
+    def initialize_camera(self, camera_config):
+        return self.camera_service.initialize_camera(camera_config)
+
+    def ensure_camera(self, camera_config):
+        return self.camera_service.ensure_camera(camera_config)
+
+    def get_frame(self, camera_id, newer_than=None, timeout=None):
+        return self.camera_service.get_frame(camera_id, newer_than, timeout)
+
+    def capture_frames(self, camera_ids, newer_than=None, timeout=None):
+        return self.camera_service.capture_frames(camera_ids, newer_than, timeout)
+
+    def lease_frame(self, camera_id, newer_than=None, timeout=None, released=()):
+        """Pinjamkan frame terbaru lewat shared memory; `released` berisi lease_id yang sudah selesai dipakai"""
+        self.release_frames(released)
+        lease = self.camera_service.lease_frame(camera_id, newer_than, timeout)
+        self._register_lease(camera_id, lease)
+        return lease
+
+    def get_recent_frames(self, camera_id):
+        return self.camera_service.get_recent_frames(camera_id)
+
+    def lease_recent_frames(self, camera_id, released=()):
+        """Pinjamkan semua frame di ring buffer kamera (untuk gate perubahan frame), masing-masing dengan lease sendiri"""
+        self.release_frames(released)
+        leases = self.camera_service.lease_recent_frames(camera_id)
+        for lease in leases:
+            self._register_lease(camera_id, lease)
+        return leases
+
+    def _register_lease(self, camera_id, lease):
+        if 'slot' not in lease:
+            return
+        with self._lease_lock:
+            self._lease_counter += 1
+            lease['lease_id'] = self._lease_counter
+            self._leases[self._lease_counter] = (
+                camera_id, lease['ring'], lease['slot'], time.monotonic() + self.lease_ttl
+            )
+
+    def release_frames(self, lease_ids):
+        """Kembalikan slot yang dipinjam, sekaligus reclaim lease yang kedaluwarsa"""
+        now = time.monotonic()
+        with self._lease_lock:
+            leases = [self._leases.pop(lease_id) for lease_id in lease_ids if lease_id in self._leases]
+            expired = [lease_id for lease_id, lease in self._leases.items() if lease[3] < now]
+            leases.extend(self._leases.pop(lease_id) for lease_id in expired)
+        if expired:
+            logger.warning(f"Reclaimed {len(expired)} expired frame leases")
+        for camera_id, ring_name, slot, _ in leases:
+            self.camera_service.release_slot(camera_id, ring_name, slot)
+
+    def renew_leases(self, lease_ids):
+        """Perpanjang lease yang masih dipakai worker (frame masih direferensikan)"""
+        deadline = time.monotonic() + self.lease_ttl
+        with self._lease_lock:
+            for lease_id in lease_ids:
+                lease = self._leases.get(lease_id)
+                if lease is not None:
+                    self._leases[lease_id] = lease[:3] + (deadline,)
+
+    def lease_stats(self):
+        with self._lease_lock:
+            return {'active_leases': len(self._leases), 'lease_ttl': self.lease_ttl}
+
+    def get_grabber_stats(self, camera_id):
+        return self.camera_service.get_grabber_stats(camera_id)
+
+    def camera_ids(self):
+        return list(self.camera_service.cameras.keys())
+
+    def release_camera(self, camera_id):
+        return self.camera_service.release_camera(camera_id)
+
+    def release_all_cameras(self):
+        return self.camera_service.release_all_cameras()
+
+
+class CameraBrokerServerManager(BaseManager):
+    pass
+
+
+class CameraBrokerClientManager(BaseManager):
+    pass
+
+
+CameraBrokerClientManager.register('get_broker')
+
+
+class CameraBrokerClient(CameraService):
+    """Handle kamera untuk proses worker yang meneruskan akses device ke proses broker
+
+    Pengolahan gambar (deteksi area teks, crop, encode) tetap berjalan di
+    worker; hanya pembukaan device dan pengambilan frame yang lewat broker.
+    Dengan transport 'shm' frame dibaca langsung dari shared memory broker
+    (broker dan worker harus di host yang sama); 'pickle' mengirim pixel
+    lewat koneksi.
+    """
+
+    def __init__(self, address, authkey, frame_transport=None):
+        super().__init__()
+        self.address = address
+        self.authkey = authkey
+        self.frame_transport = frame_transport or os.environ.get('CAMERA_FRAME_TRANSPORT', 'shm')
+        self._broker = None
+        self._connect_lock = threading.Lock()
+        self._rings = {}
+        self._ring_lock = threading.Lock()
+        # Filled by frame finalizers, which may run inside any thread's GC, so
+        # only lock-free deque operations are used on it
+        self._released_leases = deque()
+        # Leases whose frame is still referenced here (queued for inspection
+        # or archiving); renewed so the broker never reclaims a slot while a
+        # view of it is alive. Finalizers only do atomic dict.pop on it
+        self._live_leases = {}
+        self.lease_ttl = float(os.environ.get('CAMERA_LEASE_TTL', 30))
+        self._renew_thread = None
+
+    def _get_broker(self):
+        """Proxy ke broker, koneksi dibuat saat pertama dipakai"""
+        with self._connect_lock:
+            if self._broker is None:
+                manager = CameraBrokerClientManager(address=self.address, authkey=self.authkey)
+                manager.connect()
+                self._broker = manager.get_broker()
+            return self._broker
+
+    def _call(self, method, *args):
+        """Panggil method broker, sambung ulang sekali jika broker di-restart"""
+        try:
+            return getattr(self._get_broker(), method)(*args)
+        except (ConnectionError, EOFError) as e:
+            logger.warning(f"Camera broker connection lost, reconnecting: {e}")
+            with self._connect_lock:
+                self._broker = None
+            try:
+                return getattr(self._get_broker(), method)(*args)
+            except (ConnectionError, EOFError) as e:
+                raise Exception(f"Camera broker unavailable at {self.address[0]}:{self.address[1]}: {e}")
+
+    def get_available_cameras(self):
+        return self._call('get_available_cameras')
+
+    def initialize_camera(self, camera_config):
+        return self._call('initialize_camera', camera_config)
+
+    def ensure_camera(self, camera_config):
+        return self._call('ensure_camera', camera_config)
+
+    def get_frame(self, camera_id, newer_than=None, timeout=None):
+        if self.frame_transport != 'shm':
+            return self._call('get_frame', camera_id, newer_than, timeout)
+
+        lease = self._call('lease_frame', camera_id, newer_than, timeout, self._take_released_leases())
+        return self._leased_frame(camera_id, lease), lease['timestamp'], lease['sequence']
+
+    def get_recent_frames(self, camera_id):
+        # The whole ring buffer, so the change gate sees every frame of its
+        # stability window and not just the newest one
+        if self.frame_transport != 'shm':
+            return self._call('get_recent_frames', camera_id)
+        leases = self._call('lease_recent_frames', camera_id, self._take_released_leases())
+        return [(lease['sequence'], lease['timestamp'], self._leased_frame(camera_id, lease)) for lease in leases]
+
+    def _leased_frame(self, camera_id, lease):
+        """Frame dari lease broker: view shared memory, atau pixel yang dikirim langsung"""
+        if 'frame' in lease:
+            return lease['frame']
+
+        frame = self._get_ring(camera_id, lease['ring']).frame_view(lease['slot'], lease['shape'])
+        # The slot goes back to the broker once the frame and every crop or
+        # view derived from it have been garbage collected; the release rides
+        # along with the next lease request
+        self._live_leases[lease['lease_id']] = True
+        weakref.finalize(frame, self._lease_released, lease['lease_id'])
+        self._start_renewal()
+        return frame
+
+    def _lease_released(self, lease_id):
+        self._live_leases.pop(lease_id, None)
+        self._released_leases.append(lease_id)
+
+    def _start_renewal(self):
+        with self._connect_lock:
+            if self._renew_thread is not None:
+                return
+            self._renew_thread = threading.Thread(target=self._renew_loop, name='camera-lease-renewal', daemon=True)
+            self._renew_thread.start()
+
+    def _renew_loop(self):
+        """Perpanjang lease frame yang masih hidup di proses ini sebelum TTL broker habis"""
+        while True:
+            time.sleep(self.lease_ttl / 3)
+            while True:
+                try:
+                    live = list(self._live_leases)
+                    break
+                except RuntimeError:
+                    # A finalizer changed the dict while it was being copied
+                    continue
+            if not live:
+                continue
+            try:
+                self._call('renew_leases', live)
+            except Exception as e:
+                logger.warning(f"Failed to renew camera frame leases: {e}")
+
+    def _take_released_leases(self):
+        released = []
+        while True:
+            try:
+                released.append(self._released_leases.popleft())
+            except IndexError:
+                return released
+
+    def _get_ring(self, camera_id, ring_name):
+        """Attach ke ring shared memory kamera (ring baru saat kamera diinisialisasi ulang)"""
+        with self._ring_lock:
+            ring = self._rings.get(camera_id)
+            if ring is None or ring.name != ring_name:
+                if ring is not None:
+                    ring.close()
+                ring = SharedFrameRing.attach(ring_name)
+                self._rings[camera_id] = ring
+            return ring
+
+    def capture_frames(self, camera_ids, newer_than=None, timeout=None):
+        if self.frame_transport == 'shm':
+            # Leases are cheap, so reuse the shared-deadline loop locally
+            return super().capture_frames(camera_ids, newer_than, timeout)
+        return self._call('capture_frames', camera_ids, newer_than, timeout)
+
+    def get_grabber_stats(self, camera_id):
+        return self._call('get_grabber_stats', camera_id)
+
+    def camera_ids(self):
+        return self._call('camera_ids')
+
+    def release_camera(self, camera_id):
+        self._call('release_frames', self._take_released_leases())
+        self._call('release_camera', camera_id)
+        self.frame_cache.invalidate(camera_id)
+
+    def release_all_cameras(self):
+        self._call('release_all_cameras')
+
+    def __del__(self):
+        # The devices belong to the broker; a worker exiting must not close them
+        pass
+
+
+def parse_broker_address(value):
+    """Parse 'host:port' menjadi tuple address BaseManager"""
+    host, _, port = value.rpartition(':')
+    return (host or DEFAULT_BROKER_ADDRESS[0], int(port))
+
+
+def get_broker_authkey_path():
+    return os.environ.get('CAMERA_BROKER_AUTHKEY_FILE', os.path.join(os.path.expanduser('~'), '.part_number_ocr_broker_key'))
+
+
+def get_broker_authkey(create=False):
+    """Authkey broker dari CAMERA_BROKER_AUTHKEY, atau dari file key (mode 0600)
+
+    BaseManager meng-unpickle data dari setiap client yang lolos autentikasi,
+    jadi tidak ada key default. Broker (create=True) membuat file key acak
+    jika belum ada; worker di host yang sama membaca file yang sama.
+    """
+    authkey = os.environ.get('CAMERA_BROKER_AUTHKEY')
+    if authkey:
+        return authkey.encode('utf-8')
+
+    path = get_broker_authkey_path()
+    if create and not os.path.exists(path):
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                f.write(secrets.token_hex(32))
+            logger.info(f"Generated camera broker authkey in {path}")
+        except FileExistsError:
+            # Another broker created it first
+            pass
+    if not os.path.exists(path):
+        raise Exception(f"Camera broker authkey not found: set CAMERA_BROKER_AUTHKEY or start the broker to create {path}")
+    if os.stat(path).st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+        raise Exception(f"Camera broker authkey file {path} must not be accessible by group or others (chmod 600)")
+    with open(path) as f:
+        authkey = f.read().strip()
+    if not authkey:
+        raise Exception(f"Camera broker authkey file {path} is empty")
+    return authkey.encode('utf-8')
+
+
+def is_loopback_address(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def serve_camera_broker(address=DEFAULT_BROKER_ADDRESS, authkey=None):
+    """Jalankan proses broker kamera (blocking)"""
+    if authkey is None and not os.environ.get('CAMERA_BROKER_AUTHKEY') and not is_loopback_address(address[0]):
+        # The generated key file only reaches workers on this host
+        raise Exception(f"Refusing to listen on non-loopback address {address[0]} without CAMERA_BROKER_AUTHKEY")
+    authkey = authkey or get_broker_authkey(create=True)
+    broker = CameraBroker()
+    CameraBrokerServerManager.register('get_broker', callable=lambda: broker)
+    manager = CameraBrokerServerManager(address=address, authkey=authkey)
+    server = manager.get_server()
+    try:
+        server.serve_forever()
+    finally:
+        broker.release_all_cameras()
+
+
+_camera_service = None
+_camera_service_lock = threading.Lock()
+
+
+def get_camera_service():
+    """Handle kamera bersama untuk semua blueprint di proses ini
+
+    CAMERA_BROKER tidak diset (atau 'local'): satu CameraService in-process
+    yang memiliki device. CAMERA_BROKER=host:port: client ke proses broker
+    (run_camera_broker.py) sehingga semua worker server berbagi device.
+    """
+    global _camera_service
+    with _camera_service_lock:
+        if _camera_service is None:
+            broker = os.environ.get('CAMERA_BROKER', 'local')
+            if broker == 'local':
+                _camera_service = CameraService()
+            else:
+                _camera_service = CameraBrokerClient(parse_broker_address(broker), get_broker_authkey())
+        return _camera_service
@@ -5,12 +5,44 @@ import io
 from PIL import Image
 import threading
 import time
+import os
+from src.services.frame_cache import EncodedFrameCache
+from src.services.frame_grabber import FrameGrabber
+from src.services.virtual_camera import open_capture
 
 class CameraService:
-    def __init__(self):
+    def __init__(self, ring_slots=0):
+        # camera_id -> FrameGrabber (owns the cv2.VideoCapture)
         self.cameras = {}
         self.active_streams = {}
-        self.lock = threading.Lock()
+        # The registry lock only guards adding/removing cameras; opening and
+        # closing a device is serialized per camera, and frame reads take no
+        # service lock at all, so a slow camera never blocks the others
+        self.registry_lock = threading.Lock()
+        self.camera_locks = {}
+        
+        # Frames kept per camera by the background grab thread, and how long
+        # a request waits for a frame before giving up
+        self.frame_buffer_size = int(os.environ.get('CAMERA_FRAME_BUFFER', 4))
+        self.frame_timeout = float(os.environ.get('CAMERA_FRAME_TIMEOUT', 2.0))
+        # Oldest frame still served; a camera that stopped delivering fails
+        # instead of repeating its last image
+        self.max_frame_age = float(os.environ.get('CAMERA_MAX_FRAME_AGE', 5.0))
+        # Shared-memory frame slots per camera (0 = frames stay in process memory)
+        self.ring_slots = ring_slots
+        # Encoded JPEG/base64 of the newest frame per camera, shared by the
+        # capture, preview and stream endpoints
+        self.frame_cache = EncodedFrameCache(max_bytes=int(os.environ.get('FRAME_CACHE_MAX_BYTES', 32 * 1024 * 1024)))
+        
+        # Text region detection runs on a pyramid level no larger than this,
+        # boxes are scaled back so OCR still crops from the original pixels
+        self.detection_max_side = int(os.environ.get('TEXT_DETECTION_MAX_SIDE', 960))
+        # Region size filters relative to the frame (tuned on 640x480:
+        # 20 < w < 500 and 10 < h < 100 pixels)
+        self.region_min_width_ratio = 20 / 640
+        self.region_max_width_ratio = 500 / 640
+        self.region_min_height_ratio = 10 / 480
+        self.region_max_height_ratio = 100 / 480
 
     def get_available_cameras(self):
         """Mendeteksi kamera yang tersedia di sistem"""
@@ -32,40 +64,154 @@ class CameraService:
     def initialize_camera(self, camera_config):
         """Inisialisasi kamera dengan konfigurasi tertentu"""
         camera_id = camera_config['id']
-        camera_index = camera_config['index']
         
-        with self.lock:
+        with self._camera_lock(camera_id):
+            self._close_camera(camera_id)
+            return self._open_camera(camera_config)
+
+    def ensure_camera(self, camera_config):
+        """Inisialisasi kamera hanya jika belum berjalan"""
+        camera_id = camera_config['id']
+        if camera_id in self.cameras:
+            return False
+        with self._camera_lock(camera_id):
+            # Another request may have opened it while we waited for the lock
             if camera_id in self.cameras:
-                self.cameras[camera_id].release()
-            
-            cap = cv2.VideoCapture(camera_index)
-            if not cap.isOpened():
-                raise Exception(f"Cannot open camera with index {camera_index}")
-            
-            # Set camera properties
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, camera_config.get('resolution_width', 640))
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, camera_config.get('resolution_height', 480))
-            cap.set(cv2.CAP_PROP_BRIGHTNESS, camera_config.get('brightness', 50) / 100.0)
-            cap.set(cv2.CAP_PROP_CONTRAST, camera_config.get('contrast', 50) / 100.0)
-            
-            self.cameras[camera_id] = cap
-            return True
-
-    def capture_frame(self, camera_id):
-        """Mengambil satu frame dari kamera"""
-        with self.lock:
-            if camera_id not in self.cameras:
-                raise Exception(f"Camera {camera_id} not initialized")
-            
-            cap = self.cameras[camera_id]
-            ret, frame = cap.read()
-            if not ret:
-                raise Exception(f"Failed to capture frame from camera {camera_id}")
-            
-            return frame
-
-    def frame_to_base64(self, frame):
+                return False
+            return self._open_camera(camera_config)
+
+    def _open_camera(self, camera_config):
+        """Buka device dan mulai thread capture (dipanggil dengan lock kamera)"""
+        camera_id = camera_config['id']
+        
+        # Physical device or a virtual camera (video file, image folder, synthetic labels)
+        cap = open_capture(camera_config)
+        if not cap.isOpened():
+            cap.release()
+            source_type = camera_config.get('source_type') or 'device'
+            if source_type == 'device':
+                raise Exception(f"Cannot open camera with index {camera_config['index']}")
+            raise Exception(f"Cannot open {source_type} camera source {camera_config.get('source_path')}")
+        
+        # Compressed formats let USB cameras deliver full resolution at full
+        # frame rate; FOURCC has to be set before the resolution
+        fourcc = camera_config.get('fourcc', 'MJPG')
+        if fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        # The grab thread drains the device continuously, so the driver
+        # queue only needs to hold the frame being delivered
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, camera_config.get('buffer_size', 1))
+        
+        # Set camera properties
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, camera_config.get('resolution_width', 640))
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, camera_config.get('resolution_height', 480))
+        cap.set(cv2.CAP_PROP_BRIGHTNESS, camera_config.get('brightness', 50) / 100.0)
+        cap.set(cv2.CAP_PROP_CONTRAST, camera_config.get('contrast', 50) / 100.0)
+        
+        grabber = FrameGrabber(camera_id, cap, buffer_size=self.frame_buffer_size, ring_slots=self.ring_slots,
+                               max_frame_age=self.max_frame_age)
+        grabber.start()
+        with self.registry_lock:
+            self.cameras[camera_id] = grabber
+        return True
+
+    def _camera_lock(self, camera_id):
+        """Lock open/close untuk satu kamera"""
+        with self.registry_lock:
+            return self.camera_locks.setdefault(camera_id, threading.Lock())
+
+    def _close_camera(self, camera_id):
+        """Lepas kamera dari registry dan hentikan thread capture-nya (dipanggil dengan lock kamera)"""
+        with self.registry_lock:
+            grabber = self.cameras.pop(camera_id, None)
+        if grabber is not None:
+            grabber.stop()
+        self.frame_cache.invalidate(camera_id)
+
+    def get_frame(self, camera_id, newer_than=None, timeout=None):
+        """Frame terbaru dari ring buffer sebagai (frame, timestamp, sequence)
+
+        Jika newer_than (epoch detik) diberikan, tunggu frame yang diambil
+        setelah waktu tersebut. Frame bersifat read-only karena dibagi ke
+        semua pemanggil; gunakan frame.copy() sebelum menggambar di atasnya.
+        """
+        grabber = self.cameras.get(camera_id)
+        if grabber is None:
+            raise Exception(f"Camera {camera_id} not initialized")
+        
+        timeout = self.frame_timeout if timeout is None else timeout
+        sequence, timestamp, frame = grabber.wait_for_frame(newer_than, timeout)
+        return frame, timestamp, sequence
+
+    def get_recent_frames(self, camera_id):
+        """Semua frame di ring buffer kamera sebagai list (sequence, timestamp, frame), paling lama dulu"""
+        grabber = self.cameras.get(camera_id)
+        if grabber is None:
+            raise Exception(f"Camera {camera_id} not initialized")
+        return grabber.frames()
+
+    def lease_frame(self, camera_id, newer_than=None, timeout=None):
+        """Pinjamkan frame terbaru lewat slot shared memory (lihat FrameGrabber.lease_frame)"""
+        grabber = self.cameras.get(camera_id)
+        if grabber is None:
+            raise Exception(f"Camera {camera_id} not initialized")
+        return grabber.lease_frame(newer_than, self.frame_timeout if timeout is None else timeout)
+
+    def lease_recent_frames(self, camera_id):
+        """Pinjamkan semua frame di ring buffer kamera lewat shared memory (lihat FrameGrabber.lease_frames)"""
+        grabber = self.cameras.get(camera_id)
+        if grabber is None:
+            raise Exception(f"Camera {camera_id} not initialized")
+        return grabber.lease_frames()
+
+    def release_slot(self, camera_id, ring_name, slot):
+        """Lepas slot shared memory yang dipinjam lewat lease_frame"""
+        grabber = self.cameras.get(camera_id)
+        if grabber is not None:
+            grabber.release_slot(ring_name, slot)
+
+    def capture_frame(self, camera_id, newer_than=None, timeout=None):
+        """Mengambil frame terbaru dari kamera"""
+        frame, _, _ = self.get_frame(camera_id, newer_than, timeout)
+        return frame
+
+    def capture_frames(self, camera_ids, newer_than=None, timeout=None):
+        """Mengambil frame dari beberapa kamera sekaligus
+
+        Mengembalikan dict camera_id -> {'frame', 'timestamp', 'sequence'} atau
+        {'error'} untuk kamera yang gagal.
+        """
+        # Every grab thread runs independently, so waiting on the cameras one
+        # after another against a shared deadline takes as long as the slowest
+        # camera, not the sum of all of them
+        timeout = self.frame_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        results = {}
+        for camera_id in camera_ids:
+            try:
+                remaining = max(0.0, deadline - time.monotonic())
+                frame, timestamp, sequence = self.get_frame(camera_id, newer_than, remaining)
+                results[camera_id] = {'frame': frame, 'timestamp': timestamp, 'sequence': sequence}
+            except Exception as e:
+                results[camera_id] = {'error': str(e)}
+        return results
+
+    def get_grabber_stats(self, camera_id):
+        """Statistik thread capture kamera"""
+        grabber = self.cameras.get(camera_id)
+        if grabber is None:
+            raise Exception(f"Camera {camera_id} not initialized")
+        return grabber.stats()
+
+    def encode_frame(self, camera_id, sequence, frame, quality=95, width=None):
+        """JPEG bytes frame kamera, di-cache per sequence frame"""
+        return self.frame_cache.get_jpeg(camera_id, sequence, frame, quality, width)
+
+    def frame_to_base64(self, frame, camera_id=None, sequence=None):
         """Konversi frame OpenCV ke base64 string untuk frontend"""
+        if camera_id is not None and sequence is not None:
+            return self.frame_cache.get_data_url(camera_id, sequence, frame)
+        
         _, buffer = cv2.imencode('.jpg', frame)
         img_base64 = base64.b64encode(buffer).decode('utf-8')
         return f"data:image/jpeg;base64,{img_base64}"
@@ -100,6 +246,14 @@ class CameraService:
         else:
             gray = image.copy()
         
+        # Downscale to a pyramid level for detection
+        frame_height, frame_width = gray.shape
+        while max(gray.shape) > self.detection_max_side:
+            gray = cv2.pyrDown(gray)
+        level_height, level_width = gray.shape
+        scale_x = frame_width / level_width
+        scale_y = frame_height / level_height
+        
         # Apply morphological operations to detect text regions
         kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
         grad = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, kernel)
@@ -111,20 +265,30 @@ class CameraService:
         kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1))
         connected = cv2.morphologyEx(bw, cv2.MORPH_CLOSE, kernel)
         
-        # Find contours
-        contours, _ = cv2.findContours(connected.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+        # Find contours (only the bounding box is used, so corner points suffice)
+        contours, _ = cv2.findContours(connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        min_width = level_width * self.region_min_width_ratio
+        max_width = level_width * self.region_max_width_ratio
+        min_height = level_height * self.region_min_height_ratio
+        max_height = level_height * self.region_max_height_ratio
         
         text_regions = []
         for contour in contours:
             x, y, w, h = cv2.boundingRect(contour)
-            # Filter based on size (adjust these values based on your needs)
-            if w > 20 and h > 10 and w < 500 and h < 100:
+            # Filter based on size relative to the frame
+            if min_width < w < max_width and min_height < h < max_height:
+                # Scale the box back to full-resolution coordinates
+                x0 = int(x * scale_x)
+                y0 = int(y * scale_y)
+                x1 = min(frame_width, int(np.ceil((x + w) * scale_x)))
+                y1 = min(frame_height, int(np.ceil((y + h) * scale_y)))
                 text_regions.append({
-                    'x': int(x),
-                    'y': int(y),
-                    'width': int(w),
-                    'height': int(h),
-                    'area': w * h
+                    'x': x0,
+                    'y': y0,
+                    'width': x1 - x0,
+                    'height': y1 - y0,
+                    'area': (x1 - x0) * (y1 - y0)
                 })
         
         # Sort by area (largest first)
@@ -138,17 +302,17 @@ class CameraService:
 
     def release_camera(self, camera_id):
         """Release kamera"""
-        with self.lock:
-            if camera_id in self.cameras:
-                self.cameras[camera_id].release()
-                del self.cameras[camera_id]
+        with self._camera_lock(camera_id):
+            self._close_camera(camera_id)
 
     def release_all_cameras(self):
         """Release semua kamera"""
-        with self.lock:
-            for camera_id in list(self.cameras.keys()):
-                self.cameras[camera_id].release()
+        with self.registry_lock:
+            grabbers = list(self.cameras.values())
             self.cameras.clear()
+        for grabber in grabbers:
+            grabber.stop()
+            self.frame_cache.invalidate(grabber.camera_id)
 
     def __del__(self):
         """Destructor untuk memastikan semua kamera di-release"""
@@ -0,0 +1,143 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+
+class _CameraGateState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.previous = None
+        self.reference = None
+        self.last_timestamp = None
+        self.stable_since = None
+        self.moved_since_trigger = False
+        self.last_motion = 0.0
+        self.last_change = None
+        self.evaluated = 0
+        self.triggered = 0
+        self.skipped_unchanged = 0
+        self.skipped_settling = 0
+
+
+class FrameChangeGate:
+    """Gate perubahan frame per kamera untuk inspeksi otomatis kontinu
+
+    Setiap frame diperkecil ke signature grayscale kecil. Persentase pixel
+    signature yang berubah antar frame berurutan mengukur gerakan (perubahan
+    exposure global di bawah pixel_threshold diabaikan); inspeksi penuh hanya
+    dipicu jika scene sudah diam selama stability window dan berbeda dari
+    scene yang terakhir diinspeksi (atau ada gerakan signifikan sejak itu,
+    sehingga part identik yang datang berurutan tetap diinspeksi).
+    """
+
+    def __init__(self, motion_threshold=None, change_threshold=None, stability_ms=None,
+                 pixel_threshold=None, signature_width=96):
+        # A signature pixel counts as changed when it moves by more than
+        # pixel_threshold grey levels; thresholds are % of changed pixels
+        self.pixel_threshold = pixel_threshold if pixel_threshold is not None else int(os.environ.get('GATE_PIXEL_THRESHOLD', 12))
+        self.motion_threshold = motion_threshold if motion_threshold is not None else float(os.environ.get('GATE_MOTION_THRESHOLD', 0.5))
+        self.change_threshold = change_threshold if change_threshold is not None else float(os.environ.get('GATE_CHANGE_THRESHOLD', 0.5))
+        self.stability_ms = stability_ms if stability_ms is not None else float(os.environ.get('GATE_STABILITY_MS', 300))
+        self.signature_width = signature_width
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def signature(self, frame):
+        """Grayscale kecil ter-blur sebagai signature frame yang murah dibandingkan"""
+        height, width = frame.shape[:2]
+        size = (self.signature_width, max(1, int(height * self.signature_width / width)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if len(small.shape) == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (3, 3), 0).astype(np.int16)
+
+    def difference(self, a, b):
+        """Persentase pixel signature yang berubah lebih dari pixel_threshold"""
+        return float(np.count_nonzero(np.abs(a - b) > self.pixel_threshold) * 100.0 / a.size)
+
+    def _state(self, camera_id):
+        with self._lock:
+            return self._states.setdefault(camera_id, _CameraGateState())
+
+    def evaluate(self, camera_id, frames):
+        """Evaluasi frame baru kamera, kembalikan (trigger, reason)
+
+        `frames` berisi (sequence, timestamp, frame) urut dari yang paling lama,
+        misalnya isi ring buffer kamera; frame yang sudah pernah dilihat
+        dilewati. reason: 'changed', 'unchanged', atau 'settling'.
+        """
+        state = self._state(camera_id)
+        with state.lock:
+            if not frames:
+                # Camera just (re)opened and has not delivered a frame yet
+                state.evaluated += 1
+                state.skipped_settling += 1
+                return False, 'settling'
+            for _, timestamp, frame in frames:
+                if state.last_timestamp is not None and timestamp <= state.last_timestamp:
+                    continue
+                signature = self.signature(frame)
+                if state.previous is not None:
+                    state.last_motion = self.difference(signature, state.previous)
+                    if state.last_motion > self.motion_threshold:
+                        state.stable_since = timestamp
+                    if state.last_motion > self.change_threshold:
+                        state.moved_since_trigger = True
+                if state.stable_since is None:
+                    state.stable_since = timestamp
+                state.previous = signature
+                state.last_timestamp = timestamp
+
+            state.evaluated += 1
+            if state.previous is None:
+                state.skipped_settling += 1
+                return False, 'settling'
+
+            if state.reference is not None:
+                state.last_change = self.difference(state.previous, state.reference)
+                if state.last_change <= self.change_threshold and not state.moved_since_trigger:
+                    state.skipped_unchanged += 1
+                    return False, 'unchanged'
+
+            if (state.last_timestamp - state.stable_since) * 1000 < self.stability_ms:
+                state.skipped_settling += 1
+                return False, 'settling'
+
+            # New part has arrived and settled: this scene becomes the reference
+            state.reference = state.previous
+            state.moved_since_trigger = False
+            state.triggered += 1
+            return True, 'changed'
+
+    def reset(self, camera_id=None):
+        """Reset state gate (satu kamera atau semua)"""
+        with self._lock:
+            if camera_id is None:
+                self._states.clear()
+            else:
+                self._states.pop(camera_id, None)
+
+    def get_stats(self, camera_id=None):
+        """Counter gate per kamera"""
+        with self._lock:
+            camera_ids = [camera_id] if camera_id is not None else list(self._states.keys())
+            stats = []
+            for cid in camera_ids:
+                state = self._states.get(cid)
+                if state is None:
+                    continue
+                skipped = state.skipped_unchanged + state.skipped_settling
+                stats.append({
+                    'camera_id': cid,
+                    'evaluated': state.evaluated,
+                    'triggered': state.triggered,
+                    'skipped': skipped,
+                    'skipped_unchanged': state.skipped_unchanged,
+                    'skipped_settling': state.skipped_settling,
+                    'skip_rate': (skipped / state.evaluated * 100) if state.evaluated > 0 else 0,
+                    'last_motion': state.last_motion,
+                    'last_change': state.last_change
+                })
+            return stats
@@ -0,0 +1,154 @@
+import base64
+import threading
+from collections import OrderedDict
+
+import cv2
+
+
+class _PendingEncode:
+    """Encode yang sedang berjalan; request lain untuk key yang sama menunggu hasilnya"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class EncodedFrameCache:
+    """Cache representasi ter-encode (JPEG, data URL base64) per frame kamera
+
+    Key adalah (camera_id, sequence frame, jenis, quality, lebar). Hanya frame
+    terbaru per kamera yang disimpan: begitu frame dengan sequence lebih baru
+    diminta, entry frame lama dibuang. Encode bersifat single-flight, jadi
+    request bersamaan untuk frame yang sama hanya meng-encode sekali.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._latest_sequence = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._evictions = 0
+
+    def get_jpeg(self, camera_id, sequence, frame, quality=95, width=None):
+        """JPEG bytes dari frame, di-downscale ke lebar maksimum jika diberikan"""
+        return self._get(
+            (camera_id, sequence, 'jpeg', quality, width),
+            lambda: self._encode_jpeg(frame, quality, width)
+        )
+
+    def get_data_url(self, camera_id, sequence, frame, quality=95, width=None):
+        """Data URL base64 untuk frontend, dibangun dari JPEG yang di-cache"""
+        return self._get(
+            (camera_id, sequence, 'data_url', quality, width),
+            lambda: self.jpeg_to_data_url(self.get_jpeg(camera_id, sequence, frame, quality, width))
+        )
+
+    @staticmethod
+    def jpeg_to_data_url(jpeg):
+        return f"data:image/jpeg;base64,{base64.b64encode(jpeg).decode('utf-8')}"
+
+    @staticmethod
+    def _encode_jpeg(frame, quality, width):
+        height, frame_width = frame.shape[:2]
+        if width and frame_width > width:
+            frame = cv2.resize(frame, (width, int(height * width / frame_width)), interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise Exception("Failed to encode frame")
+        return buffer.tobytes()
+
+    def _get(self, key, encode):
+        camera_id, sequence = key[0], key[1]
+        owner = False
+
+        with self._lock:
+            latest = self._latest_sequence.get(camera_id)
+            if latest is not None and sequence < latest:
+                # A newer frame already replaced this one; encode without caching
+                self._misses += 1
+                pending = None
+            else:
+                if latest is None or sequence > latest:
+                    self._invalidate_camera(camera_id)
+                    self._latest_sequence[camera_id] = sequence
+
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+
+                pending = self._pending.get(key)
+                if pending is not None:
+                    self._waits += 1
+                else:
+                    pending = _PendingEncode()
+                    self._pending[key] = pending
+                    self._misses += 1
+                    owner = True
+
+        if pending is None:
+            return encode()
+
+        if not owner:
+            # Another request is encoding this frame: wait for its result
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            pending.value = encode()
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+                if pending.error is None and self._latest_sequence.get(camera_id) == sequence:
+                    self._store(key, pending.value)
+            pending.done.set()
+        return pending.value
+
+    def _invalidate_camera(self, camera_id):
+        """Buang semua entry kamera (dipanggil dengan lock)"""
+        for key in [key for key in self._entries if key[0] == camera_id]:
+            self._bytes -= len(self._entries.pop(key))
+
+    def _store(self, key, value):
+        """Simpan entry dan evict LRU jika melebihi batas (dipanggil dengan lock)"""
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = value
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._evictions += 1
+
+    def invalidate(self, camera_id):
+        """Buang cache kamera, misalnya saat kamera di-release"""
+        with self._lock:
+            self._invalidate_camera(camera_id)
+            self._latest_sequence.pop(camera_id, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._waits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'single_flight_waits': self._waits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': ((self._hits + self._waits) / lookups * 100) if lookups > 0 else 0
+            }
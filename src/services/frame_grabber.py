@@ -0,0 +1,266 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from src.services.shared_frame_ring import SharedFrameRing
+
+
+class FrameGrabber:
+    """Thread capture per kamera yang terus mengambil frame ke ring buffer bertimestamp
+
+    Request tidak pernah membaca device secara langsung: capture_frame cukup
+    mengambil frame terbaru (atau menunggu frame yang lebih baru dari timestamp
+    tertentu) dari buffer ini.
+    """
+
+    def __init__(self, camera_id, capture, buffer_size=4, max_failures=50, ring_slots=0, max_frame_age=5.0):
+        self.camera_id = camera_id
+        self.capture = capture
+        self.max_failures = max_failures
+        # Frames older than this (seconds) are never handed out, so a camera
+        # that stopped delivering fails instead of repeating its last image
+        # (0 = no limit)
+        self.max_frame_age = max_frame_age
+        # With ring_slots > 0 frames are written into a shared-memory ring so
+        # other processes can read them without copying; every buffered frame
+        # holds one reference on its slot
+        self.ring_slots = ring_slots
+        self.ring = None
+        self._slots = {}
+        self._frame_shape = None
+        self._ring_dropped = 0
+        self._frames = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._sequence = 0
+        self._failures = 0
+        self._running = False
+        self._thread = None
+        self._stop_lock = threading.Lock()
+        self._exited = False
+        self._release_on_exit = False
+        self.error = None
+        self.started_at = None
+
+    def start(self):
+        """Mulai thread capture"""
+        self._running = True
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name=f'camera-grabber-{self.camera_id}', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._grab_loop()
+        finally:
+            with self._stop_lock:
+                self._exited = True
+                release = self._release_on_exit
+            if release:
+                self._release()
+
+    def _grab_loop(self):
+        while self._running:
+            slot = view = None
+            if self.ring is not None:
+                slot, view = self.ring.begin_write(self._frame_shape)
+                if slot is None:
+                    self._ring_dropped += 1
+
+            # Decode straight into the shared-memory slot when one is free
+            ret, frame = self.capture.read(view) if view is not None else self.capture.read()
+            timestamp = time.time()
+
+            if not ret:
+                if slot is not None:
+                    self.ring.release(slot)
+                self._failures += 1
+                if self._failures >= self.max_failures:
+                    with self._condition:
+                        self.error = f"Failed to capture frame from camera {self.camera_id}"
+                        self._condition.notify_all()
+                time.sleep(0.01)
+                continue
+
+            if self.ring_slots:
+                slot, frame = self._publish_to_ring(slot, view, frame, timestamp)
+
+            # Frames are shared by every reader, so they must not be modified in place
+            frame.flags.writeable = False
+            with self._condition:
+                self._failures = 0
+                self.error = None
+                self._sequence += 1
+                if len(self._frames) == self._frames.maxlen:
+                    evicted = self._slots.pop(self._frames[0][0], None)
+                    if evicted is not None:
+                        self.ring.release(evicted)
+                if slot is not None:
+                    self._slots[self._sequence] = slot
+                self._frames.append((self._sequence, timestamp, frame))
+                self._condition.notify_all()
+
+    def _publish_to_ring(self, slot, view, frame, timestamp):
+        """Tulis frame ke slot ring (copy hanya jika driver tidak decode langsung ke slot)"""
+        if self.ring is None:
+            # Slots are sized from the first frame the device delivers
+            self.ring = SharedFrameRing.create(self.ring_slots, frame.nbytes)
+        self._frame_shape = frame.shape
+        if slot is not None and view.shape != frame.shape:
+            self.ring.release(slot)
+            slot = None
+        if slot is None:
+            slot, view = self.ring.begin_write(frame.shape)
+            if slot is None:
+                # Ring full or frame larger than a slot: keep a private copy only
+                self._ring_dropped += 1
+                return None, frame
+
+        if not np.may_share_memory(frame, view):
+            np.copyto(view, frame)
+        # The sequence is assigned under the condition, so publish the one
+        # this frame is about to get (only this thread increments it)
+        self.ring.commit(slot, frame.shape, self._sequence + 1, timestamp)
+        return slot, view[...]
+
+    def latest(self):
+        """Frame terbaru sebagai (sequence, timestamp, frame), atau None jika belum ada"""
+        with self._condition:
+            return self._frames[-1] if self._frames else None
+
+    def _is_fresh(self, timestamp):
+        return not self.max_frame_age or time.time() - timestamp <= self.max_frame_age
+
+    def wait_for_frame(self, newer_than=None, timeout=2.0):
+        """Tunggu frame dengan timestamp > newer_than (atau frame pertama jika None)
+
+        Gagal jika device sedang error atau frame terbaru lebih tua dari
+        max_frame_age dan tidak ada frame baru hingga timeout.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if not self._running:
+                    raise Exception(f"Camera {self.camera_id} is not running")
+                if self.error:
+                    raise Exception(self.error)
+
+                if self._frames:
+                    sequence, timestamp, frame = self._frames[-1]
+                    # Also when the newest frame is stale or already seen: a
+                    # consumer-paced source only reads on, and stays stuck
+                    # on a stale frame forever, once it is consumed
+                    self._frame_consumed()
+                    if self._is_fresh(timestamp) and (newer_than is None or timestamp > newer_than):
+                        return sequence, timestamp, frame
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    if self._frames and not self._is_fresh(self._frames[-1][1]):
+                        age = time.time() - self._frames[-1][1]
+                        raise Exception(f"No new frame from camera {self.camera_id} for {age:.1f}s")
+                    raise Exception(f"Timed out waiting for a frame from camera {self.camera_id}")
+                self._condition.wait(remaining)
+
+    def lease_frame(self, newer_than=None, timeout=2.0):
+        """Seperti wait_for_frame, tetapi frame dipinjamkan lewat slot shared memory
+
+        Mengembalikan dict berisi nama ring, slot, sequence, timestamp, dan shape
+        dengan satu reference tambahan pada slot (lepas dengan release_slot).
+        Frame yang tidak ada di ring dikirim langsung di field 'frame'.
+        """
+        sequence, timestamp, frame = self.wait_for_frame(newer_than, timeout)
+        with self._condition:
+            slot = self._slots.get(sequence)
+            if slot is not None and self.ring.add_ref(slot, sequence):
+                return {
+                    'ring': self.ring.name,
+                    'slot': slot,
+                    'sequence': sequence,
+                    'timestamp': timestamp,
+                    'shape': frame.shape
+                }
+        return {'sequence': sequence, 'timestamp': timestamp, 'frame': frame}
+
+    def lease_frames(self):
+        """Seperti frames(), tetapi setiap frame dipinjamkan lewat slot shared memory (lihat lease_frame)"""
+        leases = []
+        for sequence, timestamp, frame in self.frames():
+            with self._condition:
+                slot = self._slots.get(sequence)
+                if slot is not None and self.ring.add_ref(slot, sequence):
+                    leases.append({
+                        'ring': self.ring.name,
+                        'slot': slot,
+                        'sequence': sequence,
+                        'timestamp': timestamp,
+                        'shape': frame.shape
+                    })
+                    continue
+            leases.append({'sequence': sequence, 'timestamp': timestamp, 'frame': frame})
+        return leases
+
+    def release_slot(self, ring_name, slot):
+        """Lepas reference dari lease_frame (diabaikan jika ring sudah diganti)"""
+        if self.ring is not None and self.ring.name == ring_name:
+            self.ring.release(slot)
+
+    def frames(self):
+        """Salinan frame di ring buffer yang belum kedaluwarsa (urut dari yang paling lama)"""
+        with self._condition:
+            if self.error:
+                raise Exception(self.error)
+            if self._frames:
+                self._frame_consumed()
+            return [entry for entry in self._frames if self._is_fresh(entry[1])]
+
+    def _frame_consumed(self):
+        """Beri tahu kamera virtual yang dipacu konsumen (fps 0) bahwa frame terbaru sudah diambil"""
+        notify = getattr(self.capture, 'frame_consumed', None)
+        if notify is not None:
+            notify()
+
+    def stop(self):
+        """Hentikan thread capture dan release device"""
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        # A consumer-paced virtual camera may be waiting inside read()
+        self._frame_consumed()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+            with self._stop_lock:
+                if not self._exited:
+                    # Still blocked inside read(): releasing the device or the
+                    # ring now would pull them out from under it, so the
+                    # thread releases both once read() returns
+                    self._release_on_exit = True
+                    return
+        self._release()
+
+    def _release(self):
+        self.capture.release()
+        if self.ring is not None:
+            with self._condition:
+                self._frames.clear()
+                self._slots.clear()
+            self.ring.close()
+
+    def stats(self):
+        """Statistik grabber"""
+        with self._condition:
+            latest = self._frames[-1] if self._frames else None
+            elapsed = time.time() - self.started_at if self.started_at else 0
+            return {
+                'camera_id': self.camera_id,
+                'running': self._running,
+                'frames_captured': self._sequence,
+                'buffered_frames': len(self._frames),
+                'latest_sequence': latest[0] if latest else None,
+                'latest_timestamp': latest[1] if latest else None,
+                'capture_fps': self._sequence / elapsed if elapsed > 0 else 0,
+                'ring': self.ring.stats() if self.ring is not None else None,
+                'ring_dropped': self._ring_dropped,
+                'error': self.error
+            }
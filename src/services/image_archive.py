@@ -0,0 +1,191 @@
+import os
+import atexit
+import hashlib
+import logging
+import queue
+import threading
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = {
+    'jpeg': '.jpg',
+    'webp': '.webp',
+    'png': '.png'
+}
+
+
+class ImageArchive:
+    """Arsip gambar inspeksi content-addressed yang ditulis thread background
+
+    Path gambar ditentukan dari hash pixel frame di direktori per tanggal
+    (root/YYYY/MM/DD/ab/abcdef....jpg), sehingga bisa langsung disimpan di
+    Inspection.captured_image_path sebelum file selesai ditulis, dan frame
+    identik di hari yang sama hanya ditulis sekali. Encode dan tulis berjalan
+    di thread writer dengan antrean terbatas; jika antrean penuh, gambar
+    ditulis langsung di thread pemanggil agar tidak ada gambar yang hilang.
+    """
+
+    def __init__(self, root=None, image_format=None, quality=None, queue_size=None, workers=None,
+                 thumbnail_width=None):
+        self.root = root or os.environ.get('IMAGE_ARCHIVE_DIR', os.path.join('src', 'static', 'images'))
+        self.image_format = (image_format or os.environ.get('IMAGE_ARCHIVE_FORMAT', 'jpeg')).lower()
+        if self.image_format not in IMAGE_FORMATS:
+            raise Exception(f"Unsupported image archive format: {self.image_format}")
+        # Quality 0-100 for JPEG/WebP; PNG maps it onto compression level 0-9
+        self.quality = int(quality if quality is not None else os.environ.get('IMAGE_ARCHIVE_QUALITY', 90))
+        self.queue_size = queue_size or int(os.environ.get('IMAGE_ARCHIVE_QUEUE', 64))
+        self.workers = workers or int(os.environ.get('IMAGE_ARCHIVE_WORKERS', 1))
+        # Small JPEG preview written next to every image, 0 disables it
+        self.thumbnail_width = int(thumbnail_width if thumbnail_width is not None else os.environ.get('IMAGE_THUMBNAIL_WIDTH', 160))
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._threads = []
+        self.stored = 0
+        self.written = 0
+        self.deduplicated = 0
+        self.inline_writes = 0
+        self.errors = 0
+        self.bytes_written = 0
+
+    def _encode_params(self):
+        if self.image_format == 'jpeg':
+            return [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        if self.image_format == 'webp':
+            return [cv2.IMWRITE_WEBP_QUALITY, max(1, self.quality)]
+        return [cv2.IMWRITE_PNG_COMPRESSION, min(9, max(0, (100 - self.quality) // 10))]
+
+    def content_hash(self, image):
+        """Hash BLAKE2b atas shape dan pixel frame"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str((image.shape, image.dtype.str)).encode('utf-8'))
+        digest.update(memoryview(np.ascontiguousarray(image)).cast('B'))
+        return digest.hexdigest()
+
+    def path_for(self, content_hash, date=None):
+        """Path arsip untuk hash: root/YYYY/MM/DD/<2 karakter pertama hash>/<hash>.<ext>"""
+        date = date or datetime.now()
+        return os.path.join(
+            self.root, date.strftime('%Y'), date.strftime('%m'), date.strftime('%d'),
+            content_hash[:2], content_hash + IMAGE_FORMATS[self.image_format]
+        )
+
+    def relative_path(self, path):
+        """Path relatif terhadap root arsip ('YYYY/MM/DD/ab/<hash>.<ext>'), None jika di luar root"""
+        relative = os.path.relpath(os.path.normpath(path), os.path.normpath(self.root))
+        if relative.startswith(os.pardir):
+            return None
+        return relative.replace(os.sep, '/')
+
+    def thumbnail_path(self, path):
+        """Path thumbnail untuk path arsip: root/thumbs/YYYY/MM/DD/ab/<hash>.jpg"""
+        relative = self.relative_path(path)
+        return os.path.join(self.root, 'thumbs', os.path.splitext(relative)[0] + '.jpg')
+
+    def _start_workers(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"image-archive-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def store(self, image):
+        """Jadwalkan penyimpanan frame, kembalikan path final-nya
+
+        Frame tidak boleh diubah pemanggil setelah diserahkan (frame dari
+        kamera sudah read-only).
+        """
+        path = self.path_for(self.content_hash(image))
+        with self._lock:
+            self.stored += 1
+            if path in self._pending or os.path.exists(path):
+                self.deduplicated += 1
+                return path
+            self._pending.add(path)
+
+        self._start_workers()
+        try:
+            self._queue.put_nowait((path, image))
+        except queue.Full:
+            # Never drop an inspection image: fall back to writing inline
+            with self._lock:
+                self.inline_writes += 1
+            self._write(path, image)
+        return path
+
+    def _write_file(self, path, encoded):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Readers never see a partially written file
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(encoded.tobytes())
+        os.replace(temp_path, path)
+
+    def _write(self, path, image):
+        try:
+            ok, encoded = cv2.imencode(IMAGE_FORMATS[self.image_format], image, self._encode_params())
+            if not ok:
+                raise Exception(f"Cannot encode image as {self.image_format}")
+            self._write_file(path, encoded)
+            with self._lock:
+                self.written += 1
+                self.bytes_written += len(encoded)
+
+            if self.thumbnail_width > 0:
+                height, width = image.shape[:2]
+                scale = min(1.0, self.thumbnail_width / width)
+                thumbnail = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                                       interpolation=cv2.INTER_AREA)
+                ok, encoded = cv2.imencode('.jpg', thumbnail, [cv2.IMWRITE_JPEG_QUALITY, 70])
+                if ok:
+                    self._write_file(self.thumbnail_path(path), encoded)
+        except Exception as e:
+            logger.error(f"Failed to archive image {path}: {e}")
+            with self._lock:
+                self.errors += 1
+        finally:
+            with self._lock:
+                self._pending.discard(path)
+
+    def _worker(self):
+        while True:
+            path, image = self._queue.get()
+            try:
+                self._write(path, image)
+            finally:
+                del image
+                self._queue.task_done()
+
+    def flush(self):
+        """Tunggu semua gambar di antrean selesai ditulis"""
+        if self._threads:
+            self._queue.join()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'root': self.root,
+                'format': self.image_format,
+                'quality': self.quality,
+                'thumbnail_width': self.thumbnail_width,
+                'queue_size': self.queue_size,
+                'queued': self._queue.qsize(),
+                'pending': len(self._pending),
+                'stored': self.stored,
+                'written': self.written,
+                'deduplicated': self.deduplicated,
+                'inline_writes': self.inline_writes,
+                'errors': self.errors,
+                'bytes_written': self.bytes_written
+            }
+
+
+image_archive = ImageArchive()
+# Images still queued when the server stops are written before exit
+atexit.register(image_archive.flush)
@@ -0,0 +1,293 @@
+import os
+import re
+import logging
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from src.services.image_archive import image_archive
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Archive-relative image path: YYYY/MM/DD/ab/<hash>.<ext>
+ARCHIVE_PATH_PATTERN = re.compile(r'^(\d{4})/(\d{2})/(\d{2})/([0-9a-f]{2})/([0-9a-f]{32})\.(jpg|webp|png)$')
+# Already-compressed formats are stored as-is, PNG is deflated again
+STORED_EXTENSIONS = ('.jpg', '.webp')
+# Loose images from before the dated archive layout (e.g. manual_inspection_*.jpg)
+LEGACY_EXTENSIONS = {'.jpg': 'jpg', '.jpeg': 'jpg', '.png': 'png', '.webp': 'webp'}
+
+
+class ImageRetention:
+    """Retensi bertingkat arsip gambar inspeksi
+
+    Tier panas: gambar resolusi penuh dan thumbnail sebagai file lepas di
+    root/YYYY/MM/DD/. Setelah full_days hari, semua file satu hari dipindah
+    ke satu file zip per hari (root/packs/YYYY/MM/YYYY-MM-DD.zip, member
+    'full/ab/<hash>.<ext>' dan 'thumbs/ab/<hash>.jpg'). Central directory zip
+    berfungsi sebagai index offset, sehingga satu gambar dibaca langsung tanpa
+    membongkar pack. Path di Inspection.captured_image_path tidak berubah;
+    read_image mencari file di tier mana pun.
+    """
+
+    def __init__(self, archive, full_days=None, interval=None, open_packs=8):
+        self.archive = archive
+        self.full_days = full_days if full_days is not None else int(os.environ.get('IMAGE_RETENTION_DAYS', 30))
+        self.interval = interval or float(os.environ.get('IMAGE_RETENTION_INTERVAL', 3600))
+        self.open_packs = open_packs
+        self._packs = OrderedDict()
+        self._packs_lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._thread = None
+        self.last_run = None
+        self.days_packed = 0
+        self.files_packed = 0
+        self.bytes_packed = 0
+        self.errors = 0
+
+    def pack_path(self, day):
+        return os.path.join(self.archive.root, 'packs', f"{day:%Y}", f"{day:%m}", f"{day:%Y-%m-%d}.zip")
+
+    def _day_directories(self):
+        """Direktori hari (date, path) yang berisi file lepas resolusi penuh"""
+        root = self.archive.root
+        if not os.path.isdir(root):
+            return []
+        days = []
+        for year in sorted(os.listdir(root)):
+            if not re.fullmatch(r'\d{4}', year):
+                continue
+            for month in sorted(os.listdir(os.path.join(root, year))):
+                if not re.fullmatch(r'\d{2}', month):
+                    continue
+                for day in sorted(os.listdir(os.path.join(root, year, month))):
+                    if not re.fullmatch(r'\d{2}', day):
+                        continue
+                    try:
+                        days.append((date(int(year), int(month), int(day)), os.path.join(root, year, month, day)))
+                    except ValueError:
+                        continue
+        return days
+
+    def _collect_files(self, directory, prefix):
+        """File gambar di bawah direktori hari sebagai (nama member, path)"""
+        files = []
+        if not os.path.isdir(directory):
+            return files
+        for shard in sorted(os.listdir(directory)):
+            shard_path = os.path.join(directory, shard)
+            if not os.path.isdir(shard_path):
+                continue
+            for filename in sorted(os.listdir(shard_path)):
+                if filename.endswith('.tmp'):
+                    continue
+                files.append((f"{prefix}/{shard}/{filename}", os.path.join(shard_path, filename)))
+        return files
+
+    def pack_day(self, day, directory):
+        """Pindahkan semua file lepas satu hari (resolusi penuh dan thumbnail) ke pack zip hari itu"""
+        relative_day = os.path.relpath(directory, self.archive.root)
+        thumbs_directory = os.path.join(self.archive.root, 'thumbs', relative_day)
+        files = self._collect_files(directory, 'full') + self._collect_files(thumbs_directory, 'thumbs')
+        if not files:
+            return 0
+
+        pack_path = self.pack_path(day)
+        os.makedirs(os.path.dirname(pack_path), exist_ok=True)
+        # Build the pack next to its final path and swap it in atomically;
+        # a pack that already exists (late files for that day) is extended
+        temp_path = pack_path + '.tmp'
+        packed_bytes = 0
+        with zipfile.ZipFile(temp_path, 'w') as pack:
+            existing = set()
+            if os.path.exists(pack_path):
+                with zipfile.ZipFile(pack_path) as old_pack:
+                    for info in old_pack.infolist():
+                        pack.writestr(info, old_pack.read(info.filename))
+                        existing.add(info.filename)
+            for name, path in files:
+                if name in existing:
+                    continue
+                compression = zipfile.ZIP_STORED if name.endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+                pack.write(path, name, compress_type=compression)
+                packed_bytes += os.path.getsize(path)
+        with open(temp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(temp_path, pack_path)
+
+        # Loose files go only after the pack is in place, so a reader always
+        # finds the image in one of the tiers
+        for _, path in files:
+            os.remove(path)
+        for path in (directory, thumbs_directory):
+            self._remove_empty_directories(path)
+
+        self.days_packed += 1
+        self.files_packed += len(files)
+        self.bytes_packed += packed_bytes
+        logger.info(f"Packed {len(files)} images of {day} into {pack_path}")
+        return len(files)
+
+    def _remove_empty_directories(self, directory):
+        """Hapus direktori kosong dari direktori hari ke atas hingga root"""
+        root = os.path.normpath(self.archive.root)
+        directory = os.path.normpath(directory)
+        for current, _, _ in sorted(os.walk(directory), key=lambda entry: len(entry[0]), reverse=True):
+            if not os.listdir(current):
+                os.rmdir(current)
+        parent = os.path.dirname(directory)
+        while parent != root and os.path.isdir(parent) and not os.listdir(parent):
+            os.rmdir(parent)
+            parent = os.path.dirname(parent)
+
+    def run_once(self, today=None):
+        """Pack semua hari yang lebih lama dari full_days, kembalikan ringkasan"""
+        if self.full_days <= 0:
+            return {'days': [], 'files': 0}
+        cutoff = (today or date.today()) - timedelta(days=self.full_days)
+        packed_days = []
+        packed_files = 0
+        with self._run_lock:
+            # Pending writes land in today's directory; finish them first
+            self.archive.flush()
+            with self._process_lock():
+                for day, directory in self._day_directories():
+                    if day >= cutoff:
+                        continue
+                    try:
+                        count = self.pack_day(day, directory)
+                    except Exception as e:
+                        self.errors += 1
+                        logger.error(f"Failed to pack images of {day}: {e}")
+                        continue
+                    if count:
+                        packed_days.append(day.isoformat())
+                        packed_files += count
+            self.last_run = time.time()
+        return {'days': packed_days, 'files': packed_files}
+
+    @contextmanager
+    def _process_lock(self):
+        """Lock file di root/packs agar hanya satu proses worker yang mem-pack sekaligus"""
+        if fcntl is None:
+            yield
+            return
+        lock_directory = os.path.join(self.archive.root, 'packs')
+        os.makedirs(lock_directory, exist_ok=True)
+        with open(os.path.join(lock_directory, '.retention.lock'), 'a') as lock_file:
+            # Another worker packing the same days: wait, then find nothing left
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def start(self):
+        """Jalankan retensi berkala di thread background"""
+        if self._thread is not None or self.full_days <= 0:
+            return
+        self._thread = threading.Thread(target=self._run_periodically, name='image-retention', daemon=True)
+        self._thread.start()
+
+    def _run_periodically(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Image retention run failed: {e}")
+            time.sleep(self.interval)
+
+    def _open_pack(self, pack_path):
+        """ZipFile yang sudah membaca central directory, di-cache per (path, mtime)
+
+        Dipanggil dengan _packs_lock dipegang: pack bisa ditutup (eviction atau
+        pack baru untuk hari yang sama) segera setelah lock dilepas.
+        """
+        mtime = os.path.getmtime(pack_path)
+        cached = self._packs.get(pack_path)
+        if cached is not None and cached[0] == mtime:
+            self._packs.move_to_end(pack_path)
+            return cached[1]
+        if cached is not None:
+            cached[1].close()
+        pack = zipfile.ZipFile(pack_path)
+        self._packs[pack_path] = (mtime, pack)
+        while len(self._packs) > self.open_packs:
+            _, (_, old_pack) = self._packs.popitem(last=False)
+            old_pack.close()
+        return pack
+
+    def _read_legacy(self, relative):
+        """Gambar lepas di luar layout YYYY/MM/DD (mis. manual_inspection_*.jpg), tetap di dalam root"""
+        extension = LEGACY_EXTENSIONS.get(os.path.splitext(relative)[1].lower())
+        if extension is None:
+            return None
+        root = os.path.realpath(self.archive.root)
+        path = os.path.realpath(os.path.join(root, relative))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read(), extension
+
+    def read_image(self, path, thumbnail=False):
+        """Baca gambar arsip dari tier mana pun, kembalikan (bytes, ekstensi) atau None
+
+        `path` adalah Inspection.captured_image_path (atau path relatif
+        terhadap root arsip). Thumbnail yang tidak ada diganti gambar penuh.
+        Dengan IMAGE_ARCHIVE_DIR absolut, path dari URL kehilangan '/' di
+        depannya; path itu dicoba lagi sebagai path absolut.
+        """
+        if not os.path.isabs(path) and os.path.isabs(self.archive.root):
+            absolute = '/' + path
+            if self.archive.relative_path(absolute) is not None:
+                path = absolute
+        relative = self.archive.relative_path(path) if os.path.isabs(path) or path.startswith(self.archive.root) else path
+        if relative is None:
+            return None
+        relative = relative.replace(os.sep, '/')
+        match = ARCHIVE_PATH_PATTERN.match(relative)
+        if match is None:
+            return self._read_legacy(relative)
+        year, month, day, shard, content_hash, extension = match.groups()
+
+        candidates = []
+        if thumbnail:
+            candidates.append((os.path.join(self.archive.root, 'thumbs', year, month, day, shard, content_hash + '.jpg'),
+                               f"thumbs/{shard}/{content_hash}.jpg", 'jpg'))
+        candidates.append((os.path.join(self.archive.root, relative), f"full/{shard}/{content_hash}.{extension}", extension))
+
+        pack_path = self.pack_path(date(int(year), int(month), int(day)))
+        for loose_path, member, member_extension in candidates:
+            if os.path.exists(loose_path):
+                with open(loose_path, 'rb') as f:
+                    return f.read(), member_extension
+        if os.path.exists(pack_path):
+            with self._packs_lock:
+                pack = self._open_pack(pack_path)
+                names = set(pack.NameToInfo)
+                for _, member, member_extension in candidates:
+                    if member in names:
+                        return pack.read(member), member_extension
+        return None
+
+    def get_stats(self):
+        return {
+            'full_days': self.full_days,
+            'interval': self.interval,
+            'last_run': self.last_run,
+            'days_packed': self.days_packed,
+            'files_packed': self.files_packed,
+            'bytes_packed': self.bytes_packed,
+            'errors': self.errors,
+            'open_packs': len(self._packs)
+        }
+
+
+image_retention = ImageRetention(image_archive)
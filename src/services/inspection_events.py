@@ -0,0 +1,143 @@
+import os
+import json
+import threading
+import time
+from collections import deque
+
+
+class InspectionEventBus:
+    """Event bus in-process untuk hasil inspeksi yang baru di-commit
+
+    Setiap inspeksi dipublikasikan sekali ke history berukuran tetap dengan
+    nomor posisi berurutan; setiap koneksi SSE hanya menyimpan posisi
+    terakhirnya dan menunggu di Condition bersama, sehingga banyak monitor
+    tidak menambah query database. Koneksi yang tertinggal lebih dari
+    history_size event ditutup agar browser menyambung ulang dengan
+    Last-Event-ID dan mengejar ketertinggalan dari database.
+    """
+
+    def __init__(self, history_size=None, heartbeat_seconds=None):
+        self.history_size = history_size or int(os.environ.get('INSPECTION_EVENT_HISTORY', 1000))
+        self.heartbeat_seconds = heartbeat_seconds or float(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+        self._history = deque(maxlen=self.history_size)
+        self._position = 0
+        self._subscribers = 0
+        self._published = 0
+        self._condition = threading.Condition()
+
+    def publish(self, inspection):
+        """Publikasikan Inspection yang sudah di-commit ke semua subscriber"""
+        self.publish_event(inspection.to_event_dict())
+
+    def publish_event(self, event):
+        """Publikasikan event inspeksi (Inspection.to_event_dict) yang sudah di-commit"""
+        with self._condition:
+            self._position += 1
+            self._published += 1
+            self._history.append((self._position, event))
+            self._condition.notify_all()
+
+    def position(self):
+        with self._condition:
+            return self._position
+
+    def find_position(self, inspection_id):
+        """Posisi event untuk inspection_id di history, atau None jika sudah tidak ada"""
+        with self._condition:
+            for position, event in reversed(self._history):
+                if event['id'] == inspection_id:
+                    return position
+        return None
+
+    def wait_for_events(self, position, timeout):
+        """Event setelah posisi, menunggu hingga timeout; kembalikan (events, overflow)"""
+        with self._condition:
+            if self._position <= position:
+                self._condition.wait(timeout)
+            if not self._history or self._position <= position:
+                return [], False
+            # Events between position and the oldest retained one were evicted
+            overflow = self._history[0][0] > position + 1
+            return [entry for entry in self._history if entry[0] > position], overflow
+
+    @staticmethod
+    def format_event(event, data, event_id=None):
+        """Satu pesan text/event-stream"""
+        lines = []
+        if event_id is not None:
+            lines.append(f"id: {event_id}")
+        lines.append(f"event: {event}")
+        lines.append(f"data: {json.dumps(data)}")
+        return '\n'.join(lines) + '\n\n'
+
+    @staticmethod
+    def _apply(stats, event):
+        """Tambahkan satu inspeksi ke counter OK/NG"""
+        stats['total_inspections'] += 1
+        if event['is_ok']:
+            stats['ok_count'] += 1
+        else:
+            stats['ng_count'] += 1
+        total = stats['total_inspections']
+        stats['ok_percentage'] = stats['ok_count'] / total * 100
+        stats['ng_percentage'] = stats['ng_count'] / total * 100
+        stats['current_part_number'] = event['detected_part_number']
+
+    def stream(self, position, stats, camera_id=None, mode=None, backfill=(), counted_up_to=0):
+        """Generator text/event-stream: snapshot counter, backfill, lalu event baru
+
+        `stats` adalah snapshot counter dari database yang sudah mencakup
+        semua inspeksi dengan id <= counted_up_to; event setelahnya menambah
+        counter secara incremental tanpa query.
+        """
+        with self._condition:
+            self._subscribers += 1
+        try:
+            yield "retry: 3000\n\n"
+            yield self.format_event('stats', stats)
+
+            sent = set()
+            for event in backfill:
+                sent.add(event['id'])
+                yield self.format_event('inspection', {'inspection': event, 'stats': stats}, event['id'])
+
+            last_heartbeat = time.monotonic()
+            while True:
+                events, overflow = self.wait_for_events(position, self.heartbeat_seconds)
+                if overflow:
+                    # Too far behind: end the stream so the client reconnects
+                    # with Last-Event-ID and catches up from the database
+                    return
+                for position, event in events:
+                    if event['id'] in sent:
+                        continue
+                    if camera_id is not None and event['camera_id'] != camera_id:
+                        continue
+                    if mode is not None and event['inspection_mode'] != mode:
+                        continue
+                    if event['id'] > counted_up_to:
+                        self._apply(stats, event)
+                    yield self.format_event('inspection', {'inspection': event, 'stats': stats}, event['id'])
+                    last_heartbeat = time.monotonic()
+
+                if time.monotonic() - last_heartbeat >= self.heartbeat_seconds:
+                    # Keeps proxies from closing the connection and lets the
+                    # server notice monitors that went away
+                    yield ": keepalive\n\n"
+                    last_heartbeat = time.monotonic()
+        finally:
+            with self._condition:
+                self._subscribers -= 1
+
+    def get_stats(self):
+        with self._condition:
+            return {
+                'subscribers': self._subscribers,
+                'published': self._published,
+                'history': len(self._history),
+                'history_size': self.history_size,
+                'heartbeat_seconds': self.heartbeat_seconds
+            }
+
+
+inspection_events = InspectionEventBus()
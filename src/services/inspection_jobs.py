@@ -0,0 +1,167 @@
+import os
+import logging
+import queue
+import threading
+import time
+import uuid
+
+from src.models.product import db
+
+logger = logging.getLogger(__name__)
+
+JOB_MODES = ('manual', 'auto')
+
+
+class InspectionJob:
+    """Satu job inspeksi async beserta status dan hasilnya"""
+
+    def __init__(self, mode, options):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.options = options
+        self.status = 'queued'  # queued | running | done | failed
+        self.result = None
+        self.status_code = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'mode': self.mode,
+            'status': self.status,
+            'status_code': self.status_code,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'queue_ms': ((self.started_at - self.created_at) * 1000) if self.started_at else None,
+            'run_ms': ((self.finished_at - self.started_at) * 1000) if self.finished_at and self.started_at else None,
+            'result': self.result
+        }
+
+
+class InspectionJobService:
+    """Pool worker terbatas untuk inspeksi async
+
+    Submit langsung mengembalikan job; worker menjalankan InspectionPipeline
+    (decode, OCR, item check, simpan gambar, commit) di luar thread HTTP.
+    Antrean dibatasi queue_size sehingga submit ditolak saat penuh, dan hasil
+    disimpan selama result_ttl detik untuk diambil dengan id atau long-poll.
+    """
+
+    def __init__(self, pipeline, workers=None, queue_size=None, result_ttl=None):
+        self.pipeline = pipeline
+        self.workers = workers or int(os.environ.get('INSPECTION_JOB_WORKERS', 2))
+        self.queue_size = queue_size or int(os.environ.get('INSPECTION_JOB_QUEUE', 16))
+        self.result_ttl = result_ttl or float(os.environ.get('INSPECTION_JOB_TTL', 300))
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._app = None
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _start_workers(self, app):
+        with self._lock:
+            if self._threads:
+                return
+            self._app = app
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"inspection-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, app, mode, options):
+        """Masukkan job ke antrean, kembalikan job atau None jika antrean penuh"""
+        if mode not in JOB_MODES:
+            raise Exception(f"Unknown inspection mode: {mode}")
+        self._start_workers(app)
+        self._expire()
+
+        job = InspectionJob(mode, options)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+                self.rejected += 1
+            return None
+        with self._lock:
+            self.submitted += 1
+        return job
+
+    def get_job(self, job_id, wait=0):
+        """Job berdasarkan id; wait > 0 menunggu hingga selesai (long-poll)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None and wait > 0:
+            job.done.wait(wait)
+        return job
+
+    def run(self, mode, options):
+        """Jalankan pipeline untuk satu job, kembalikan (result, status_code)"""
+        if mode == 'manual':
+            result = self.pipeline.run_manual(options)
+        else:
+            camera_id = options.get('camera_id')
+            if not camera_id:
+                return {'success': False, 'error': 'Camera ID is required'}, 400
+            result = self.pipeline.run_auto(camera_id, options)
+        return result, 200 if result['success'] else 400
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            job.status = 'running'
+            job.started_at = time.time()
+            with self._app.app_context():
+                try:
+                    job.result, job.status_code = self.run(job.mode, job.options)
+                    job.status = 'done'
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning(f"Inspection job {job.id} failed: {e}")
+                    job.result = {'success': False, 'error': str(e)}
+                    job.status_code = 500
+                    job.status = 'failed'
+            # The request payload (e.g. a base64 image) is no longer needed
+            job.options = None
+            job.finished_at = time.time()
+            with self._lock:
+                if job.status == 'done':
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            job.done.set()
+
+    def _expire(self):
+        """Buang hasil job yang sudah selesai lebih lama dari result_ttl"""
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def get_stats(self):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == 'running')
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'queued': self._queue.qsize(),
+                'running': running,
+                'retained': len(self._jobs),
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': self.completed,
+                'failed': self.failed,
+                'result_ttl': self.result_ttl
+            }
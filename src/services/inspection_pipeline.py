@@ -0,0 +1,559 @@
+import os
+import json
+import time
+import base64
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from src.models.product import Product, Camera, RoiHint, db
+from src.services.part_number_index import part_number_index
+from src.services.image_archive import image_archive
+from src.services.inspection_writer import inspection_writer
+
+
+class InspectionPipeline:
+    """Pipeline inspeksi yang dipakai route /inspect/*, job async, dan scheduler kontinu
+
+    Mode otomatis: capture (opsional lewat gate perubahan frame), OCR dengan
+    ROI hint lalu deteksi multi-region, koreksi part number ke katalog, item
+    check, simpan gambar dan record Inspection. Mode manual: gambar upload
+    atau capture, OCR area (atau part number manual), lalu langkah yang sama.
+    Semua method yang menyentuh database harus dipanggil di dalam app context
+    Flask. Hasil dikembalikan sebagai dict respons; success False berarti
+    request tidak valid (HTTP 400).
+    """
+
+    def __init__(self, camera_service, ocr_service, item_check_service, roi_hint_service, change_gate):
+        self.camera_service = camera_service
+        self.ocr_service = ocr_service
+        self.item_check_service = item_check_service
+        self.roi_hint_service = roi_hint_service
+        self.change_gate = change_gate
+        # Threads for decode, item checks and image hashing in a batch;
+        # OpenCV and hashlib release the GIL for all three
+        self.batch_threads = int(os.environ.get('INSPECTION_BATCH_THREADS', os.cpu_count() or 1))
+
+    def resolve_ocr_engine(self, options, camera_id=None, product_id=None):
+        """Pilih engine OCR: dari request, lalu produk, lalu kamera (None = default OCRService)"""
+        if options.get('ocr_engine'):
+            return options['ocr_engine']
+        if product_id:
+            product = db.session.get(Product, product_id)
+            if product is not None and product.ocr_engine:
+                return product.ocr_engine
+        if camera_id:
+            camera = db.session.get(Camera, camera_id)
+            if camera is not None and camera.ocr_engine:
+                return camera.ocr_engine
+        return None
+
+    def ensure_camera(self, camera_id):
+        """Buka kamera (fisik atau virtual) jika belum berjalan"""
+        camera = db.session.get(Camera, camera_id)
+        if camera is None:
+            raise Exception(f"Camera {camera_id} not found")
+        if self.camera_service.ensure_camera(camera.to_dict()):
+            # Freshly opened: the gate must not compare against the old session
+            self.change_gate.reset(camera_id)
+
+    def capture_frame(self, camera_id):
+        """Ambil frame terbaru, membuka kamera jika belum berjalan"""
+        self.ensure_camera(camera_id)
+        return self.camera_service.capture_frame(camera_id)
+
+    def find_product(self, part_number, ocr_result=None):
+        """Cari produk berdasarkan part number, hasil OCR dikoreksi ke part number katalog terdekat"""
+        return self.find_products([(part_number, ocr_result)])[0]
+
+    def find_products(self, lookups):
+        """find_product untuk banyak (part_number, ocr_result) sekaligus dengan query IN
+
+        Kembalikan list (part_number, product, catalog_match) sesuai urutan input.
+        """
+        part_numbers = {part_number for part_number, _ in lookups if part_number}
+        products = {}
+        if part_numbers:
+            products = {
+                product.part_number: product
+                for product in Product.query.filter(Product.part_number.in_(part_numbers)).all()
+            }
+
+        # A misread confusable character (0/O, 8/B, ...) should not turn into
+        # NG; any other edit is only reported as a suggestion and stays NG
+        corrections = {}
+        misses = {part_number for part_number, ocr_result in lookups
+                  if part_number and ocr_result is not None and part_number not in products}
+        if misses:
+            part_number_index.ensure_loaded()
+            for part_number in misses:
+                match, distance = part_number_index.lookup(part_number)
+                if match is not None:
+                    corrections[part_number] = (match, distance)
+            missing = {match for match, _ in corrections.values()} - products.keys()
+            if missing:
+                products.update({
+                    product.part_number: product
+                    for product in Product.query.filter(Product.part_number.in_(missing)).all()
+                })
+
+        results = []
+        for part_number, ocr_result in lookups:
+            product = products.get(part_number) if part_number else None
+            if product is not None or part_number not in corrections or ocr_result is None:
+                results.append((part_number, product, None))
+                continue
+
+            match, distance = corrections[part_number]
+            product = products.get(match)
+            if product is None:
+                results.append((part_number, None, None))
+                continue
+
+            if not part_number_index.is_autocorrect(distance):
+                # Wrong or truncated part: suggest the catalog entry, keep NG
+                results.append((part_number, None, {
+                    'original_part_number': part_number,
+                    'part_number': match,
+                    'distance': distance,
+                    'corrected': False
+                }))
+                continue
+
+            ocr_result['corrected_from'] = part_number
+            ocr_result['part_number'] = match
+            results.append((match, product, {
+                'original_part_number': part_number,
+                'part_number': match,
+                'distance': distance,
+                'corrected': True
+            }))
+        return results
+
+    def decode_image_bytes(self, image_bytes):
+        """Decode JPEG/PNG mentah menjadi frame BGR tanpa copy buffer, None jika tidak valid"""
+        if not image_bytes:
+            return None
+        return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+
+    def decode_image(self, image_data):
+        """Decode gambar base64 (boleh berupa data URL) menjadi frame BGR"""
+        if image_data.startswith('data:image'):
+            image_data = image_data.split(',')[1]
+
+        return self.decode_image_bytes(base64.b64decode(image_data))
+
+    def load_image(self, options):
+        """Gambar dari upload biner, base64, atau capture kamera; None jika tidak ada sumber
+
+        Raise ValueError jika data gambar tidak bisa di-decode.
+        """
+        if options.get('image_bytes') is not None:
+            image = self.decode_image_bytes(options['image_bytes'])
+        elif 'image_base64' in options:
+            image = self.decode_image(options['image_base64'])
+        elif options.get('camera_id'):
+            return self.capture_frame(options['camera_id'])
+        else:
+            return None
+        if image is None:
+            raise ValueError('Image data is not a valid JPEG or PNG image')
+        return image
+
+    def run_manual(self, options):
+        """Inspeksi manual dengan upload gambar atau capture dari kamera"""
+        # Get image data
+        try:
+            image = self.load_image(options)
+        except ValueError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        if image is None:
+            return {
+                'success': False,
+                'error': 'No image data or camera_id provided'
+            }
+
+        # Get detection area if provided (for manual area selection)
+        detection_area = options.get('detection_area')
+        region = None
+        if detection_area:
+            region = {
+                'x': int(detection_area['x']),
+                'y': int(detection_area['y']),
+                'width': int(detection_area['width']),
+                'height': int(detection_area['height'])
+            }
+
+        # Use manual part number if provided, otherwise perform OCR
+        if 'detected_part_number' in options and options['detected_part_number']:
+            # Manual part number input
+            part_number = options['detected_part_number']
+            ocr_result = {
+                'part_number': part_number,
+                'raw_text': part_number,
+                'confidence': 100.0,
+                'details': [],
+                'stage': 'manual'
+            }
+            part_number, product, catalog_match = self.find_product(part_number)
+        else:
+            # Perform OCR
+            ocr_engine = self.resolve_ocr_engine(options, options.get('camera_id'), options.get('product_id'))
+            ocr_result = self.ocr_service.extract_text_from_image(image, region, engine=ocr_engine)
+            part_number, product, catalog_match = self.find_product(ocr_result['part_number'], ocr_result)
+
+        # Validate part number
+        is_valid, validation_message = self.ocr_service.validate_part_number(part_number)
+
+        # Execute item checks
+        item_check_results = self.item_check_service.execute_item_checks(image, part_number)
+
+        # Overall inspection result
+        inspection_passed = is_valid and product is not None and item_check_results['overall_pass']
+
+        # Archive image in the background; the path is known up front
+        image_path = image_archive.store(image)
+
+        # Create inspection record through the group-commit writer
+        inspection = inspection_writer.write(dict(
+            product_id=product.id if product else None,
+            captured_image_path=image_path,
+            detected_part_number=part_number,
+            is_ok=inspection_passed,
+            camera_id=options.get('camera_id'),
+            inspection_mode='manual',
+            confidence_score=ocr_result['confidence'],
+            detection_area=json.dumps(detection_area) if detection_area else None,
+            ocr_stage=ocr_result.get('stage'),
+            ocr_time_ms=ocr_result.get('ocr_time_ms')
+        ), product=product, durable=options.get('durable'))
+
+        return {
+            'success': True,
+            'inspection': inspection,
+            'ocr_result': ocr_result,
+            'validation': {
+                'is_valid': is_valid,
+                'message': validation_message
+            },
+            'product_exists': product is not None,
+            'product': product.to_dict() if product else None,
+            'catalog_match': catalog_match,
+            'item_check_results': item_check_results
+        }
+
+    def _decode_batch_item(self, item):
+        """Decode gambar satu item batch, kembalikan (image, error)"""
+        if not isinstance(item, dict):
+            return None, 'Batch item must be a base64 string or an object with image data'
+        try:
+            if item.get('image_bytes') is not None:
+                image = self.decode_image_bytes(item['image_bytes'])
+            elif item.get('image_base64'):
+                image = self.decode_image(item['image_base64'])
+            else:
+                return None, 'No image data provided'
+        except ValueError as e:
+            return None, str(e)
+        if image is None:
+            return None, 'Image data is not a valid JPEG or PNG image'
+        return image, None
+
+    def _region(self, detection_area):
+        if not detection_area:
+            return None
+        return {
+            'x': int(detection_area['x']),
+            'y': int(detection_area['y']),
+            'width': int(detection_area['width']),
+            'height': int(detection_area['height'])
+        }
+
+    def run_batch(self, items, options):
+        """Inspeksi manual banyak gambar (satu tray) dalam satu transaksi
+
+        Setiap item berisi 'image_bytes' atau 'image_base64', dengan
+        'detection_area' dan 'detected_part_number' opsional; options berlaku
+        untuk semua item. Rule item check diambil sekali, produk dicari dengan
+        query IN, OCR berjalan di pool batch OCRService, dan semua record
+        Inspection diserahkan sekaligus ke writer group commit (durable
+        menunggu sekali). Item yang gagal tidak membatalkan batch.
+        """
+        if not items:
+            return {
+                'success': False,
+                'error': 'No images provided'
+            }
+
+        threads = max(1, min(self.batch_threads, len(items)))
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            decoded = list(executor.map(self._decode_batch_item, items))
+
+        # OCR every image that has no manual part number in one batch call
+        ocr_engine = self.resolve_ocr_engine(options, options.get('camera_id'), options.get('product_id'))
+        ocr_results = [None] * len(items)
+        manual_indexes = set()
+        ocr_indexes = []
+        ocr_items = []
+        for index, (item, (image, error)) in enumerate(zip(items, decoded)):
+            if error is not None:
+                continue
+            part_number = item.get('detected_part_number')
+            if part_number:
+                manual_indexes.add(index)
+                ocr_results[index] = {
+                    'part_number': part_number,
+                    'raw_text': part_number,
+                    'confidence': 100.0,
+                    'details': [],
+                    'stage': 'manual'
+                }
+                continue
+            ocr_indexes.append(index)
+            ocr_items.append({
+                'image': image,
+                'region': self._region(item.get('detection_area') or options.get('detection_area')),
+                'engine': ocr_engine
+            })
+        for index, ocr_result in zip(ocr_indexes, self.ocr_service.extract_text_batch(ocr_items)):
+            if 'error' in ocr_result:
+                # OCR failures (e.g. engine unavailable) only fail their own item
+                decoded[index] = (None, f"OCR failed: {ocr_result['error']}")
+                continue
+            ocr_results[index] = ocr_result
+
+        # One product query for the whole tray; manual part numbers are not corrected
+        valid_indexes = [index for index, (_, error) in enumerate(decoded) if error is None]
+        positions = {index: position for position, index in enumerate(valid_indexes)}
+        lookups = self.find_products([
+            (ocr_results[index]['part_number'], None if index in manual_indexes else ocr_results[index])
+            for index in valid_indexes
+        ])
+
+        # Item checks and image hashing only touch the images
+        item_checks = self.item_check_service.load_item_checks()
+
+        def check_and_save(index):
+            image = decoded[index][0]
+            part_number = lookups[positions[index]][0]
+            item_check_results = self.item_check_service.execute_item_checks(image, part_number, item_checks=item_checks)
+            return item_check_results, image_archive.store(image)
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            checked = list(executor.map(check_and_save, valid_indexes))
+
+        results = []
+        records = []
+        for index, (_, error) in enumerate(decoded):
+            if error is not None:
+                results.append({'index': index, 'success': False, 'error': error})
+                continue
+
+            position = positions[index]
+            part_number, product, catalog_match = lookups[position]
+            item_check_results, image_path = checked[position]
+            ocr_result = ocr_results[index]
+            is_valid, validation_message = self.ocr_service.validate_part_number(part_number)
+            inspection_passed = is_valid and product is not None and item_check_results['overall_pass']
+            detection_area = items[index].get('detection_area') or options.get('detection_area')
+
+            records.append((dict(
+                product_id=product.id if product else None,
+                captured_image_path=image_path,
+                detected_part_number=part_number,
+                is_ok=inspection_passed,
+                camera_id=options.get('camera_id'),
+                inspection_mode='manual',
+                confidence_score=ocr_result['confidence'],
+                detection_area=json.dumps(detection_area) if detection_area else None,
+                ocr_stage=ocr_result.get('stage'),
+                ocr_time_ms=ocr_result.get('ocr_time_ms')
+            ), product))
+            results.append({
+                'index': index,
+                'success': True,
+                'inspection': None,
+                'ocr_result': ocr_result,
+                'validation': {
+                    'is_valid': is_valid,
+                    'message': validation_message
+                },
+                'product_exists': product is not None,
+                'product': product.to_dict() if product else None,
+                'catalog_match': catalog_match,
+                'item_check_results': item_check_results
+            })
+
+        # The whole tray goes through the group-commit writer at once, so it
+        # shares commits with manual/auto inspections instead of holding the
+        # SQLite write lock on the request session; a failed record is
+        # retried alone by the writer and only fails its own item
+        saved = iter(inspection_writer.write_many(records, durable=options.get('durable')))
+        for result in results:
+            if not result['success']:
+                continue
+            inspection, error = next(saved)
+            if error is not None:
+                index = result['index']
+                result.clear()
+                result.update({'index': index, 'success': False, 'error': error})
+                continue
+            result['inspection'] = inspection
+
+        inspected = sum(1 for result in results if result['success'])
+        ok_count = sum(1 for result in results if result['success'] and result['inspection']['is_ok'])
+        return {
+            'success': True,
+            'results': results,
+            'summary': {
+                'total': len(items),
+                'inspected': inspected,
+                'ok_count': ok_count,
+                'ng_count': inspected - ok_count,
+                'error_count': len(items) - inspected,
+                'all_ok': ok_count == len(items)
+            }
+        }
+
+    def run_auto(self, camera_id, options):
+        """Capture lalu inspeksi; dengan options['gate'] frame tanpa part baru dilewati
+
+        Kembalikan dict respons /inspect/auto: success False jika tidak ada
+        area teks, skipped True jika gate melewati frame.
+        """
+        if options.get('gate', False):
+            # Continuous mode: only inspect once a new part has arrived and
+            # settled; skipped frames are counted, not stored
+            self.ensure_camera(camera_id)
+            frames = self.camera_service.get_recent_frames(camera_id)
+            triggered, reason = self.change_gate.evaluate(camera_id, frames)
+            if not triggered:
+                return {
+                    'success': True,
+                    'skipped': True,
+                    'reason': reason,
+                    'gate': self.change_gate.get_stats(camera_id)[0]
+                }
+            image = frames[-1][2]
+        else:
+            # Capture image from camera
+            image = self.capture_frame(camera_id)
+
+        return self.inspect(camera_id, image, options)
+
+    def inspect(self, camera_id, image, options):
+        """Inspeksi otomatis satu frame kamera dan simpan hasilnya"""
+        ocr_start = time.perf_counter()
+        results = []
+
+        # Try the learned label ROI first; full-frame detection only on a miss
+        roi_hint = None
+        if options.get('use_roi_hint', True):
+            roi_hint = self.roi_hint_service.get_hint(camera_id, options.get('product_id'))
+        ocr_engine = self.resolve_ocr_engine(
+            options, camera_id, options.get('product_id') or (roi_hint.product_id if roi_hint else None)
+        )
+        if roi_hint is not None:
+            hint_region = self.roi_hint_service.hint_region(roi_hint, image.shape)
+            if hint_region is not None:
+                hint_ocr_result = self.ocr_service.extract_text_from_image(image, hint_region, engine=ocr_engine)
+                hint_part_number, hint_product, hint_catalog_match = self.find_product(
+                    hint_ocr_result['part_number'], hint_ocr_result
+                )
+                if hint_product is not None:
+                    results = [{
+                        'region': hint_region,
+                        'ocr_result': hint_ocr_result,
+                        'region_index': 0
+                    }]
+                    part_number, product, catalog_match = hint_part_number, hint_product, hint_catalog_match
+        roi_hint_hit = bool(results)
+
+        # Detect text regions automatically
+        if not roi_hint_hit:
+            results = self.ocr_service.detect_and_extract_multiple_regions(
+                image, mode=options.get('multi_region_mode'), engine=ocr_engine
+            )
+        ocr_time_ms = (time.perf_counter() - ocr_start) * 1000
+
+        if not results:
+            # Keep the ROI hint miss counter
+            if roi_hint is not None:
+                self.roi_hint_service.record_result(roi_hint, False)
+                db.session.commit()
+            return {
+                'success': False,
+                'error': 'No text regions detected'
+            }
+
+        # Use the best result (highest confidence)
+        best_result = results[0]
+        ocr_result = best_result['ocr_result']
+        detection_area = best_result['region']
+
+        # Check if part number exists in database
+        if not roi_hint_hit:
+            part_number, product, catalog_match = self.find_product(ocr_result['part_number'], ocr_result)
+
+        # Validate part number
+        is_valid, validation_message = self.ocr_service.validate_part_number(part_number)
+
+        # Execute item checks
+        item_check_results = self.item_check_service.execute_item_checks(image, part_number)
+
+        # Overall inspection result
+        inspection_passed = is_valid and product is not None and item_check_results['overall_pass']
+
+        # Archive image in the background; the path is known up front
+        image_path = image_archive.store(image)
+
+        roi_hint_id = roi_hint.id if roi_hint is not None else None
+        learn_hint = inspection_passed and not roi_hint_hit
+        learn_product_id = product.id if product else None
+
+        def update_roi_hints():
+            # Runs on the writer's session, in the same transaction as the
+            # inspection insert
+            if roi_hint_id is not None:
+                self.roi_hint_service.record_result(db.session.get(RoiHint, roi_hint_id), roi_hint_hit)
+            # Learn the label position from full-frame detections that passed
+            if learn_hint:
+                self.roi_hint_service.learn(camera_id, learn_product_id, detection_area)
+
+        # Create inspection record through the group-commit writer
+        inspection = inspection_writer.write(dict(
+            product_id=product.id if product else None,
+            camera_id=camera_id,
+            captured_image_path=image_path,
+            detected_part_number=part_number,
+            is_ok=inspection_passed,
+            inspection_mode='auto',
+            confidence_score=ocr_result['confidence'],
+            detection_area=json.dumps(detection_area),
+            ocr_stage=ocr_result.get('stage'),
+            ocr_time_ms=ocr_time_ms
+        ), product=product, durable=options.get('durable'), apply=update_roi_hints)
+
+        return {
+            'success': True,
+            'inspection': inspection,
+            'ocr_result': ocr_result,
+            'detection_area': detection_area,
+            'all_results': results,
+            'validation': {
+                'is_valid': is_valid,
+                'message': validation_message
+            },
+            'product_exists': product is not None,
+            'product': product.to_dict() if product else None,
+            'catalog_match': catalog_match,
+            'roi_hint': {
+                'used': roi_hint is not None,
+                'hit': roi_hint_hit
+            },
+            'item_check_results': item_check_results
+        }
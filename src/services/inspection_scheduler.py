@@ -0,0 +1,253 @@
+import os
+import logging
+import threading
+import time
+from collections import deque
+
+from src.models.product import db
+
+logger = logging.getLogger(__name__)
+
+TRIGGER_MODES = ('interval', 'gate')
+
+
+class _CameraJob:
+    """State inspeksi kontinu satu kamera: thread capture, antrean frame, dan counter"""
+
+    def __init__(self, camera_id, trigger, interval_ms, queue_size, options):
+        self.camera_id = camera_id
+        self.trigger = trigger
+        self.interval_ms = interval_ms
+        self.options = options
+        # Drop-oldest: when OCR falls behind, the stalest frame is discarded
+        self.queue = deque(maxlen=queue_size)
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.capture_thread = None
+        self.inspect_thread = None
+        self.started_at = time.time()
+        self.captured = 0
+        self.dropped = 0
+        self.gate_skipped = 0
+        self.inspected = 0
+        self.ok_count = 0
+        self.ng_count = 0
+        self.no_text = 0
+        self.errors = 0
+        self.total_inspection_ms = 0.0
+        self.last_error = None
+        self.last_result = None
+
+    def enqueue(self, sequence, timestamp, frame):
+        with self.condition:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+            self.queue.append((sequence, timestamp, frame))
+            self.captured += 1
+            self.condition.notify()
+
+    def dequeue(self, timeout):
+        """Frame tertua di antrean, atau None jika kosong setelah timeout / job dihentikan"""
+        with self.condition:
+            if not self.queue and not self.stop_event.is_set():
+                self.condition.wait(timeout)
+            if self.stop_event.is_set() or not self.queue:
+                return None
+            return self.queue.popleft()
+
+    def stop(self):
+        self.stop_event.set()
+        with self.condition:
+            self.queue.clear()
+            self.condition.notify_all()
+
+    def status(self):
+        with self.condition:
+            queued = len(self.queue)
+        return {
+            'camera_id': self.camera_id,
+            'running': not self.stop_event.is_set(),
+            'trigger': self.trigger,
+            'interval_ms': self.interval_ms,
+            'options': self.options,
+            'started_at': self.started_at,
+            'queued': queued,
+            'queue_size': self.queue.maxlen,
+            'captured': self.captured,
+            'dropped': self.dropped,
+            'gate_skipped': self.gate_skipped,
+            'inspected': self.inspected,
+            'ok_count': self.ok_count,
+            'ng_count': self.ng_count,
+            'no_text': self.no_text,
+            'errors': self.errors,
+            'avg_inspection_ms': (self.total_inspection_ms / self.inspected) if self.inspected > 0 else 0,
+            'last_error': self.last_error,
+            'last_result': self.last_result
+        }
+
+
+class InspectionScheduler:
+    """Scheduler inspeksi otomatis kontinu di server, per kamera
+
+    Setiap kamera punya thread capture yang mengambil frame baru setiap
+    interval_ms (trigger 'interval') atau saat gate perubahan frame mendeteksi
+    part baru yang sudah diam (trigger 'gate'), lalu memasukkannya ke antrean
+    kecil drop-oldest. Thread inspeksi per kamera menjalankan InspectionPipeline
+    dari antrean; jumlah inspeksi yang berjalan bersamaan di semua kamera
+    dibatasi max_workers.
+    """
+
+    def __init__(self, pipeline, max_workers=None, queue_size=None, default_interval_ms=None):
+        self.pipeline = pipeline
+        self.max_workers = max_workers or int(os.environ.get('INSPECTION_MAX_WORKERS', 2))
+        self.queue_size = queue_size or int(os.environ.get('INSPECTION_QUEUE_SIZE', 2))
+        self.default_interval_ms = default_interval_ms or float(os.environ.get('INSPECTION_INTERVAL_MS', 1000))
+        self.frame_timeout = float(os.environ.get('CAMERA_FRAME_TIMEOUT', 2.0))
+        self._workers = threading.BoundedSemaphore(self.max_workers)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def start(self, app, camera_id, trigger='interval', interval_ms=None, options=None):
+        """Mulai (atau mulai ulang dengan pengaturan baru) inspeksi kontinu satu kamera"""
+        if trigger not in TRIGGER_MODES:
+            raise Exception(f"Unknown trigger mode: {trigger}")
+        interval_ms = float(interval_ms) if interval_ms is not None else self.default_interval_ms
+        if interval_ms < 0:
+            raise Exception("interval_ms must not be negative")
+
+        # Fail early when the camera cannot be opened
+        with app.app_context():
+            self.pipeline.ensure_camera(camera_id)
+
+        self.stop(camera_id)
+        job = _CameraJob(camera_id, trigger, interval_ms, self.queue_size, dict(options or {}))
+        job.capture_thread = threading.Thread(
+            target=self._capture_loop, args=(app, job), name=f"inspect-capture-{camera_id}", daemon=True
+        )
+        job.inspect_thread = threading.Thread(
+            target=self._inspect_loop, args=(app, job), name=f"inspect-worker-{camera_id}", daemon=True
+        )
+        with self._lock:
+            self._jobs[camera_id] = job
+        if trigger == 'gate':
+            self.pipeline.change_gate.reset(camera_id)
+        job.capture_thread.start()
+        job.inspect_thread.start()
+        return job.status()
+
+    def stop(self, camera_id):
+        """Hentikan inspeksi kontinu kamera, kembalikan status terakhir atau None jika tidak berjalan"""
+        with self._lock:
+            job = self._jobs.pop(camera_id, None)
+        if job is None:
+            return None
+        job.stop()
+        for thread in (job.capture_thread, job.inspect_thread):
+            if thread is not threading.current_thread():
+                # An inspection in flight finishes on its own; don't wait for OCR
+                thread.join(timeout=1.0)
+        return job.status()
+
+    def stop_all(self):
+        with self._lock:
+            camera_ids = list(self._jobs.keys())
+        return [self.stop(camera_id) for camera_id in camera_ids]
+
+    def is_running(self, camera_id):
+        with self._lock:
+            return camera_id in self._jobs
+
+    def get_status(self, camera_id=None):
+        """Status job per kamera (satu kamera atau semua)"""
+        with self._lock:
+            jobs = [self._jobs[camera_id]] if camera_id in self._jobs else []
+            if camera_id is None:
+                jobs = list(self._jobs.values())
+        return [job.status() for job in jobs]
+
+    def get_config(self):
+        return {
+            'max_workers': self.max_workers,
+            'queue_size': self.queue_size,
+            'default_interval_ms': self.default_interval_ms,
+            'trigger_modes': list(TRIGGER_MODES)
+        }
+
+    def _capture_loop(self, app, job):
+        """Ambil frame baru sesuai trigger dan masukkan ke antrean job"""
+        camera_service = self.pipeline.camera_service
+        last_timestamp = None
+        next_capture = time.monotonic()
+        while not job.stop_event.is_set():
+            if job.trigger == 'interval':
+                delay = next_capture - time.monotonic()
+                if delay > 0 and job.stop_event.wait(delay):
+                    break
+                next_capture = max(next_capture + job.interval_ms / 1000.0, time.monotonic())
+            try:
+                frame, timestamp, sequence = camera_service.get_frame(
+                    job.camera_id, newer_than=last_timestamp, timeout=self.frame_timeout
+                )
+            except Exception as e:
+                job.last_error = str(e)
+                logger.warning(f"Scheduled capture failed for camera {job.camera_id}: {e}")
+                if job.stop_event.wait(1.0):
+                    break
+                try:
+                    # The camera may have been released or re-initialized
+                    with app.app_context():
+                        self.pipeline.ensure_camera(job.camera_id)
+                except Exception:
+                    pass
+                continue
+            last_timestamp = timestamp
+
+            if job.trigger == 'gate':
+                triggered, _ = self.pipeline.change_gate.evaluate(job.camera_id, [(sequence, timestamp, frame)])
+                if not triggered:
+                    job.gate_skipped += 1
+                    continue
+            job.enqueue(sequence, timestamp, frame)
+
+    def _inspect_loop(self, app, job):
+        """Jalankan pipeline untuk frame di antrean job, dibatasi semaphore worker bersama"""
+        while not job.stop_event.is_set():
+            item = job.dequeue(timeout=0.5)
+            if item is None:
+                continue
+            sequence, timestamp, frame = item
+            with self._workers:
+                if job.stop_event.is_set():
+                    break
+                start = time.perf_counter()
+                with app.app_context():
+                    try:
+                        result = self.pipeline.inspect(job.camera_id, frame, job.options)
+                    except Exception as e:
+                        db.session.rollback()
+                        job.errors += 1
+                        job.last_error = str(e)
+                        logger.warning(f"Scheduled inspection failed for camera {job.camera_id}: {e}")
+                        continue
+                    finally:
+                        del frame
+            job.total_inspection_ms += (time.perf_counter() - start) * 1000
+            job.inspected += 1
+            if not result['success']:
+                job.no_text += 1
+                job.last_result = {'sequence': sequence, 'timestamp': timestamp, 'error': result['error']}
+                continue
+            inspection = result['inspection']
+            if inspection['is_ok']:
+                job.ok_count += 1
+            else:
+                job.ng_count += 1
+            job.last_result = {
+                'sequence': sequence,
+                'timestamp': timestamp,
+                'inspection_id': inspection['id'],
+                'part_number': inspection['detected_part_number'],
+                'is_ok': inspection['is_ok'],
+                'confidence': inspection['confidence_score']
+            }
@@ -0,0 +1,269 @@
+import os
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from flask import current_app
+
+from src.models.product import Inspection, Product, db
+from src.services.inspection_events import inspection_events
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingInspection:
+    """Satu record Inspection yang menunggu commit grup"""
+
+    def __init__(self, values, durable, apply=None):
+        self.values = values
+        self.durable = durable
+        self.apply = apply
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class InspectionWriter:
+    """Group commit untuk insert Inspection
+
+    Semua jalur inspeksi (manual, auto, scheduler, job async) menyerahkan
+    record ke satu thread writer. Writer mengumpulkan hingga batch_size record
+    atau menunggu paling lama max_delay_ms sejak record pertama, lalu menulis
+    semuanya dalam satu transaksi, sehingga satu fsync SQLite dibagi banyak
+    part dan writer tidak saling berebut lock database. Pemanggil durable
+    menunggu hingga batch-nya di-commit dan mendapat record lengkap (dengan
+    id), tanpa menunggu max_delay_ms; pemanggil non-durable langsung kembali.
+    """
+
+    def __init__(self, batch_size=None, max_delay_ms=None, queue_size=None, durable=None):
+        self.batch_size = batch_size or int(os.environ.get('INSPECTION_WRITE_BATCH', 64))
+        self.max_delay_ms = max_delay_ms if max_delay_ms is not None else float(os.environ.get('INSPECTION_WRITE_DELAY_MS', 10))
+        self.queue_size = queue_size or int(os.environ.get('INSPECTION_WRITE_QUEUE', 1024))
+        if durable is None:
+            durable = os.environ.get('INSPECTION_WRITE_DURABLE', 'true').lower() in ('1', 'true', 'yes')
+        self.durable = durable
+        # Longest a durable caller waits for its commit before failing
+        self.write_timeout = float(os.environ.get('INSPECTION_WRITE_TIMEOUT', 30))
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._app = None
+        self.written = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.retried_batches = 0
+        self.errors = 0
+        self.commit_ms = 0.0
+
+    def _start(self, app):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._app = app
+            self._thread = threading.Thread(target=self._worker, name='inspection-writer', daemon=True)
+            self._thread.start()
+
+    def write(self, values, product=None, durable=None, apply=None):
+        """Simpan satu Inspection lewat group commit, kembalikan dict-nya
+
+        `values` adalah kolom Inspection (tanpa relationship). `apply` opsional
+        dipanggil di thread writer, di dalam transaksi yang sama, untuk
+        perubahan lain yang harus ikut tersimpan (mis. hint ROI). Durable
+        menunggu commit dan melempar Exception jika gagal; non-durable
+        mengembalikan record tanpa id dan inspected_at.
+        """
+        durable = self.durable if durable is None else self.parse_durable(durable)
+        self._start(current_app._get_current_object())
+
+        pending = _PendingInspection(values, durable, apply)
+        # Blocks when the writer is far behind instead of dropping records
+        self._queue.put(pending)
+        if durable:
+            if not pending.done.wait(self.write_timeout):
+                raise Exception(f"Timed out after {self.write_timeout}s waiting for the inspection to be saved")
+            if pending.error is not None:
+                raise Exception(f"Failed to save inspection: {pending.error}")
+            return pending.result
+
+        return self._transient(values, product)
+
+    def write_many(self, records, durable=None):
+        """Simpan banyak Inspection sekaligus (mis. satu tray) lewat group commit
+
+        `records` berisi (values, product). Semua record diantrekan berurutan
+        sehingga writer meng-commit-nya dalam batch sebesar mungkin, dan
+        pemanggil durable menunggu sekali untuk semuanya. Kembalikan list
+        (record, error) sesuai urutan; record yang gagal tidak menggagalkan
+        record lain.
+        """
+        durable = self.durable if durable is None else self.parse_durable(durable)
+        self._start(current_app._get_current_object())
+
+        pendings = [_PendingInspection(values, durable) for values, _ in records]
+        for pending in pendings:
+            self._queue.put(pending)
+        if not durable:
+            return [(self._transient(values, product), None) for values, product in records]
+
+        deadline = time.monotonic() + self.write_timeout
+        results = []
+        for pending in pendings:
+            if not pending.done.wait(max(0.0, deadline - time.monotonic())):
+                raise Exception(f"Timed out after {self.write_timeout}s waiting for the inspections to be saved")
+            if pending.error is not None:
+                results.append((None, f"Failed to save inspection: {pending.error}"))
+            else:
+                results.append((pending.result, None))
+        return results
+
+    @staticmethod
+    def _transient(values, product):
+        # Transient object: relationships are not loaded
+        result = Inspection(**values).to_dict()
+        result['product'] = product.to_dict() if product else None
+        return result
+
+    @staticmethod
+    def parse_durable(value):
+        """Opsi durable dari JSON/form: bool, angka, atau string '1'/'true'/'yes'"""
+        if isinstance(value, str):
+            return value.strip().lower() in ('1', 'true', 'yes')
+        return bool(value)
+
+    def _next_batch(self):
+        """Record pertama (blocking), lalu sisanya hingga batch_size atau max_delay_ms
+
+        Jika ada pemanggil durable yang menunggu dan antrean kosong, batch
+        langsung di-commit: record yang datang selama commit berjalan
+        membentuk batch berikutnya, jadi durable tidak menambah latensi tunggu.
+        """
+        batch = [self._queue.get()]
+        waiting = batch[0].durable
+        deadline = time.monotonic() + self.max_delay_ms / 1000
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0 and not waiting:
+                    pending = self._queue.get(timeout=remaining)
+                else:
+                    # Still take whatever is already queued
+                    pending = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(pending)
+            waiting = waiting or pending.durable
+        return batch
+
+    def _worker(self):
+        with self._app.app_context():
+            while True:
+                batch = self._next_batch()
+                try:
+                    self._commit_batch(batch)
+                except Exception as e:
+                    # e.g. rollback failing on a broken connection: fail this
+                    # batch, start over with a fresh session, keep running
+                    logger.error(f"Inspection writer failed on a batch of {len(batch)}: {e}")
+                    self._fail(batch, e)
+                    try:
+                        db.session.remove()
+                    except Exception:
+                        pass
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+
+    def _fail(self, batch, error):
+        """Tandai record batch yang belum selesai sebagai gagal"""
+        for pending in batch:
+            if not pending.done.is_set():
+                pending.error = str(error)
+                pending.done.set()
+                with self._lock:
+                    self.errors += 1
+
+    def _insert(self, batch):
+        """Insert satu batch dalam satu transaksi, kembalikan event-nya"""
+        inspections = [Inspection(**pending.values) for pending in batch]
+        db.session.add_all(inspections)
+        for pending in batch:
+            if pending.apply is not None:
+                pending.apply()
+
+        # Products land in the identity map, so to_dict needs no query per row
+        product_ids = {inspection.product_id for inspection in inspections if inspection.product_id}
+        products = Product.query.filter(Product.id.in_(product_ids)).all() if product_ids else []
+
+        # Ids and defaults are assigned by the flush; serialising before the
+        # commit avoids one refresh query per row afterwards
+        db.session.flush()
+        results = [inspection.to_dict() for inspection in inspections]
+        events = [inspection.to_event_dict() for inspection in inspections]
+        db.session.commit()
+        del products
+
+        for pending, result in zip(batch, results):
+            pending.result = result
+        return events
+
+    def _commit_batch(self, batch):
+        start = time.perf_counter()
+        try:
+            events = self._insert(batch)
+        except Exception as e:
+            db.session.rollback()
+            if len(batch) == 1:
+                logger.error(f"Failed to save inspection: {e}")
+                batch[0].error = str(e)
+                batch[0].done.set()
+                with self._lock:
+                    self.errors += 1
+                return
+            # One bad record must not lose the rest of the batch
+            logger.warning(f"Inspection batch of {len(batch)} failed, retrying one by one: {e}")
+            with self._lock:
+                self.retried_batches += 1
+            for pending in batch:
+                self._commit_batch([pending])
+            return
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.commit_ms += elapsed_ms
+        for pending in batch:
+            pending.done.set()
+        for event in events:
+            inspection_events.publish_event(event)
+
+    def flush(self):
+        """Tunggu semua record di antrean selesai di-commit"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'batch_size': self.batch_size,
+                'max_delay_ms': self.max_delay_ms,
+                'durable': self.durable,
+                'alive': self._thread is not None and self._thread.is_alive(),
+                'queue_size': self.queue_size,
+                'queued': self._queue.qsize(),
+                'written': self.written,
+                'batches': self.batches,
+                'average_batch': self.written / self.batches if self.batches else 0,
+                'largest_batch': self.largest_batch,
+                'average_commit_ms': self.commit_ms / self.batches if self.batches else 0,
+                'retried_batches': self.retried_batches,
+                'errors': self.errors
+            }
+
+
+inspection_writer = InspectionWriter()
+# Records still queued when the server stops are committed before exit
+atexit.register(inspection_writer.flush)
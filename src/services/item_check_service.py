@@ -7,14 +7,18 @@ class ItemCheckService:
     def __init__(self):
         pass
     
-    def execute_item_checks(self, image, part_number, active_checks_only=True):
-        """Eksekusi semua item check yang aktif"""
+    def load_item_checks(self, active_checks_only=True):
+        """Ambil item check dari database, bisa dipakai ulang untuk banyak gambar"""
+        if active_checks_only:
+            return ItemCheck.query.filter_by(is_active=True).all()
+        return ItemCheck.query.all()
+    
+    def execute_item_checks(self, image, part_number, active_checks_only=True, item_checks=None):
+        """Eksekusi semua item check yang aktif (atau item_checks yang sudah diambil)"""
         try:
             # Get item checks from database
-            if active_checks_only:
-                item_checks = ItemCheck.query.filter_by(is_active=True).all()
-            else:
-                item_checks = ItemCheck.query.all()
+            if item_checks is None:
+                item_checks = self.load_item_checks(active_checks_only)
             
             results = []
             overall_pass = True
@@ -0,0 +1,189 @@
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Rough per-entry bookkeeping overhead (key, OrderedDict node, entry dict)
+ENTRY_OVERHEAD_BYTES = 256
+
+
+class OCRResultCache:
+    """Cache hasil OCR berbasis hash konten crop biner, LRU dengan batas byte
+
+    Key mencakup versi preprocessing, engine, dan mode OCR (full, fast,
+    mosaic) selain config, sehingga crop yang sama dari jalur berbeda tidak
+    saling memakai hasil. Pencocokan near-duplicate memakai index band dHash:
+    hash dalam jarak d pasti sama persis di salah satu dari d+1 band, jadi
+    hanya entry yang berbagi band yang dibandingkan.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, near_duplicate_distance=0, version=1):
+        self.max_bytes = max_bytes
+        # Max Hamming distance between 64-bit dHashes to count as a near
+        # duplicate; 0 disables perceptual matching (exact hits only)
+        self.near_duplicate_distance = near_duplicate_distance
+        # Bumped whenever preprocessing changes what a crop's OCR result is
+        self.version = version
+        self._bands = self._band_layout(near_duplicate_distance)
+        self._band_index = [{} for _ in self._bands]
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._near_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def make_key(binary, config):
+        """Hash cepat dari crop biner yang sudah dipreproses plus config OCR"""
+        binary = np.ascontiguousarray(binary)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{binary.shape}|{binary.dtype}|{config}".encode('utf-8'))
+        digest.update(binary.data)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _band_layout(distance):
+        """(shift, mask) untuk d+1 band yang membagi dHash 64-bit"""
+        if distance <= 0:
+            return []
+        count = min(distance + 1, 64)
+        bands = []
+        start = 0
+        for index in range(count):
+            width = 64 // count + (1 if index < 64 % count else 0)
+            bands.append((start, (1 << width) - 1))
+            start += width
+        return bands
+
+    def _band_keys(self, phash):
+        return [(phash >> shift) & mask for shift, mask in self._bands]
+
+    def _index_add(self, key, phash):
+        for band, value in zip(self._band_index, self._band_keys(phash)):
+            band.setdefault(value, set()).add(key)
+
+    def _index_remove(self, key, phash):
+        for band, value in zip(self._band_index, self._band_keys(phash)):
+            keys = band.get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del band[value]
+
+    @staticmethod
+    def perceptual_hash(binary):
+        """dHash 64-bit untuk pencocokan crop yang hampir sama"""
+        small = cv2.resize(binary, (9, 8), interpolation=cv2.INTER_AREA)
+        bits = (small[:, 1:] > small[:, :-1]).flatten()
+        return int(np.packbits(bits).view('>u8')[0])
+
+    def lookup(self, binary, config, mode='full', engine='tesseract'):
+        """Cari hasil OCR di cache, kembalikan (result atau None, token untuk store)"""
+        config = f"v{self.version}|{engine}|{mode}|{config}"
+        key = self.make_key(binary, config)
+        phash = self.perceptual_hash(binary) if self.near_duplicate_distance > 0 else None
+        token = (key, phash, config, binary.shape[:2])
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return copy.deepcopy(entry['result']), token
+
+            if phash is not None:
+                near_key = self._find_near_duplicate(phash, config, binary.shape[:2])
+                if near_key is not None:
+                    self._entries.move_to_end(near_key)
+                    self._near_hits += 1
+                    return copy.deepcopy(self._entries[near_key]['result']), token
+
+            self._misses += 1
+            return None, token
+
+    def _find_near_duplicate(self, phash, config, shape):
+        """Cari entry dengan dHash terdekat (harus dipanggil dengan lock)"""
+        candidates = set()
+        for band, value in zip(self._band_index, self._band_keys(phash)):
+            candidates.update(band.get(value, ()))
+
+        best_key = None
+        best_distance = self.near_duplicate_distance + 1
+        for key in candidates:
+            entry = self._entries[key]
+            if entry['config'] != config:
+                continue
+            # Only compare crops of roughly the same size
+            entry_shape = entry['shape']
+            if abs(entry_shape[0] - shape[0]) > shape[0] * 0.1 or abs(entry_shape[1] - shape[1]) > shape[1] * 0.1:
+                continue
+            distance = (entry['phash'] ^ phash).bit_count()
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+    def store(self, token, result):
+        """Simpan hasil OCR untuk token dari lookup, evict entry LRU jika melebihi batas"""
+        if result.get('error'):
+            return
+
+        key, phash, config, shape = token
+        size = len(json.dumps(result)) + len(config) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous['size']
+                if previous['phash'] is not None:
+                    self._index_remove(key, previous['phash'])
+
+            self._entries[key] = {
+                'result': copy.deepcopy(result),
+                'phash': phash,
+                'config': config,
+                'shape': shape,
+                'size': size
+            }
+            self._bytes += size
+            if phash is not None:
+                self._index_add(key, phash)
+
+            while self._bytes > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted['size']
+                if evicted['phash'] is not None:
+                    self._index_remove(evicted_key, evicted['phash'])
+                self._evictions += 1
+
+    def clear(self):
+        """Kosongkan cache dan reset counter"""
+        with self._lock:
+            self._entries.clear()
+            for band in self._band_index:
+                band.clear()
+            self._bytes = 0
+            self._hits = self._near_hits = self._misses = self._evictions = 0
+
+    def stats(self):
+        """Statistik cache (hit/miss/eviction, ukuran)"""
+        with self._lock:
+            lookups = self._hits + self._near_hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'near_hits': self._near_hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': ((self._hits + self._near_hits) / lookups * 100) if lookups > 0 else 0,
+                'near_duplicate_distance': self.near_duplicate_distance
+            }
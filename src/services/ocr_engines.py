@@ -0,0 +1,256 @@
+import os
+import logging
+import threading
+from abc import ABC, abstractmethod
+
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from src.services.tesseract_engine import TesseractEnginePool
+
+logger = logging.getLogger(__name__)
+
+# Folder names that cannot hold the glyph itself on every filesystem
+GLYPH_LABEL_ALIASES = {'dash': '-', 'underscore': '_'}
+# Engine names OCRService registers; products and cameras may only select these
+OCR_ENGINES = ('tesseract', 'template')
+
+
+class OCREngine(ABC):
+    """Interface engine OCR di belakang OCRService
+
+    image_to_data menerima crop biner uint8 (latar putih, teks gelap) dan
+    mengembalikan data per kata dengan format pytesseract Output.DICT
+    (text, conf, left, top, width, height).
+    """
+
+    name = None
+
+    def is_available(self):
+        return True
+
+    @abstractmethod
+    def image_to_data(self, image, config=None):
+        """Data per kata (format pytesseract Output.DICT) untuk crop biner"""
+
+    def info(self):
+        return {'engine': self.name, 'available': self.is_available()}
+
+
+class TesseractOCREngine(OCREngine):
+    """Tesseract lewat engine in-process (C API), fallback ke pytesseract"""
+
+    name = 'tesseract'
+
+    def __init__(self, backend=None, lang=None):
+        # 'capi' keeps initialized engines in-process, 'pytesseract' spawns the
+        # tesseract CLI per call, 'auto' prefers capi and falls back to pytesseract
+        self.backend = backend or os.environ.get('OCR_BACKEND', 'auto')
+        self.engine_pool = None
+        if self.backend in ('auto', 'capi'):
+            self.engine_pool = TesseractEnginePool(lang=lang or os.environ.get('OCR_LANG', 'eng'))
+
+    def image_to_data(self, image, config=None):
+        """Jalankan Tesseract lewat engine in-process, fallback ke pytesseract"""
+        if self.engine_pool is not None:
+            try:
+                return self.engine_pool.image_to_data(image, config)
+            except Exception as e:
+                if self.backend == 'capi':
+                    raise
+                logger.warning(f"Tesseract C API backend unavailable, falling back to pytesseract: {e}")
+                self.engine_pool = None
+
+        pil_image = Image.fromarray(image)
+        return pytesseract.image_to_data(pil_image, config=config or '', output_type=pytesseract.Output.DICT)
+
+    def info(self):
+        """Informasi backend Tesseract yang sedang dipakai"""
+        if self.engine_pool is not None and self.engine_pool.is_available():
+            info = {'engine': self.name, 'backend': 'capi', 'version': self.engine_pool.version}
+            info.update(self.engine_pool.stats())
+            return info
+        try:
+            version = str(pytesseract.get_tesseract_version())
+        except Exception as e:
+            version = f"error: {str(e)}"
+        return {'engine': self.name, 'backend': 'pytesseract', 'version': version}
+
+
+class TemplateOCREngine(OCREngine):
+    """Engine ringan untuk font label industri: segmentasi connected components + kNN
+
+    Dilatih dari folder glyph berlabel dengan struktur <glyph_dir>/<karakter>/*.png
+    (folder 'dash' dan 'underscore' untuk '-' dan '_').
+    """
+
+    name = 'template'
+
+    def __init__(self, glyph_dir=None, k=3, glyph_size=20, min_component_area=12):
+        self.glyph_dir = glyph_dir or os.environ.get(
+            'OCR_TEMPLATE_GLYPHS_DIR',
+            os.path.join(os.path.dirname(os.path.dirname(__file__)), 'ocr_glyphs')
+        )
+        self.k = k
+        self.glyph_size = glyph_size
+        self.min_component_area = min_component_area
+        self._knn = None
+        self._labels = []
+        self._sample_count = 0
+        self._load_error = None
+        self._lock = threading.Lock()
+
+    def is_available(self):
+        return self._get_model() is not None
+
+    def train(self, samples):
+        """Latih kNN dari list (label, gambar glyph)"""
+        features = []
+        responses = []
+        labels = []
+        for label, image in samples:
+            binary = self._binarize(image)
+            points = cv2.findNonZero(binary)
+            if points is None:
+                continue
+            x, y, w, h = cv2.boundingRect(points)
+            if label not in labels:
+                labels.append(label)
+            features.append(self._glyph_feature(binary[y:y+h, x:x+w]))
+            responses.append(labels.index(label))
+
+        if not features:
+            raise Exception("No glyph samples to train the template engine")
+
+        knn = cv2.ml.KNearest_create()
+        knn.train(np.array(features, dtype=np.float32), cv2.ml.ROW_SAMPLE,
+                  np.array(responses, dtype=np.float32).reshape(-1, 1))
+
+        with self._lock:
+            self._knn = knn
+            self._labels = labels
+            self._sample_count = len(features)
+            self._load_error = None
+
+    def load_glyphs(self, glyph_dir=None):
+        """Latih kNN dari folder glyph berlabel"""
+        glyph_dir = glyph_dir or self.glyph_dir
+        samples = []
+        for folder in sorted(os.listdir(glyph_dir)):
+            folder_path = os.path.join(glyph_dir, folder)
+            if not os.path.isdir(folder_path):
+                continue
+            label = GLYPH_LABEL_ALIASES.get(folder, folder)
+            for filename in sorted(os.listdir(folder_path)):
+                image = cv2.imread(os.path.join(folder_path, filename), cv2.IMREAD_GRAYSCALE)
+                if image is not None:
+                    samples.append((label, image))
+        self.train(samples)
+        self.glyph_dir = glyph_dir
+
+    def _get_model(self):
+        """Model kNN, dilatih dari folder glyph saat pertama dipakai"""
+        if self._knn is None and self._load_error is None:
+            try:
+                self.load_glyphs()
+            except Exception as e:
+                self._load_error = str(e)
+        return self._knn
+
+    def _binarize(self, image):
+        """Binarisasi dengan teks sebagai foreground putih"""
+        if len(image.shape) == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        _, binary = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        border = np.concatenate([binary[0, :], binary[-1, :], binary[:, 0], binary[:, -1]])
+        if border.mean() > 127:
+            binary = cv2.bitwise_not(binary)
+        return binary
+
+    def _glyph_feature(self, glyph):
+        """Glyph dipusatkan di kanvas persegi (rasio aspek dipertahankan), diubah ke vektor ternormalisasi"""
+        h, w = glyph.shape
+        side = max(h, w)
+        canvas = np.zeros((side, side), dtype=np.uint8)
+        top = (side - h) // 2
+        left = (side - w) // 2
+        canvas[top:top+h, left:left+w] = glyph
+        resized = cv2.resize(canvas, (self.glyph_size, self.glyph_size), interpolation=cv2.INTER_AREA)
+        feature = resized.astype(np.float32).flatten()
+        norm = np.linalg.norm(feature)
+        return feature / norm if norm > 0 else feature
+
+    def _segment(self, binary):
+        """Segmentasi karakter dengan connected components, urut dari kiri ke kanan"""
+        count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        components = [tuple(stats[i][:4]) for i in range(1, count) if stats[i][4] >= self.min_component_area]
+        if not components:
+            return []
+
+        line_height = max(h for _, _, _, h in components)
+        glyphs = []
+        for x, y, w, h in components:
+            # Keep full-height glyphs and short wide ones (the dash)
+            if h >= line_height * 0.4 or w >= h * 1.5:
+                glyphs.append((x, y, w, h))
+        glyphs.sort(key=lambda box: box[0])
+        return glyphs
+
+    def image_to_data(self, image, config=None):
+        """Kenali karakter dengan kNN dan kelompokkan menjadi kata berdasarkan jarak antar glyph"""
+        knn = self._get_model()
+        if knn is None:
+            raise Exception(f"Template OCR engine unavailable: {self._load_error}")
+
+        data = {'text': [], 'conf': [], 'left': [], 'top': [], 'width': [], 'height': []}
+        binary = self._binarize(image)
+        glyphs = self._segment(binary)
+        if not glyphs:
+            return data
+
+        features = np.array([self._glyph_feature(binary[y:y+h, x:x+w]) for x, y, w, h in glyphs], dtype=np.float32)
+        k = min(self.k, self._sample_count)
+        _, results, neighbours, distances = knn.findNearest(features, k)
+
+        # Squared distance between unit vectors lies in [0, 4]; combine how
+        # close the nearest sample is with how many neighbours agree
+        chars = []
+        for i, (x, y, w, h) in enumerate(glyphs):
+            label = self._labels[int(results[i][0])]
+            votes = int(np.sum(neighbours[i] == results[i][0]))
+            confidence = 100.0 * (votes / k) * max(0.0, 1.0 - float(distances[i][0]))
+            chars.append((label, confidence, x, y, w, h))
+
+        # Split words where the gap is wider than the typical glyph width
+        widths = sorted(w for _, _, _, _, w, _ in chars)
+        word_gap = widths[len(widths) // 2] * 0.8
+        words = [[chars[0]]]
+        for previous, current in zip(chars, chars[1:]):
+            if current[2] - (previous[2] + previous[4]) > word_gap:
+                words.append([])
+            words[-1].append(current)
+
+        for word in words:
+            left = min(c[2] for c in word)
+            top = min(c[3] for c in word)
+            right = max(c[2] + c[4] for c in word)
+            bottom = max(c[3] + c[5] for c in word)
+            data['text'].append(''.join(c[0] for c in word))
+            data['conf'].append(float(np.mean([c[1] for c in word])))
+            data['left'].append(int(left))
+            data['top'].append(int(top))
+            data['width'].append(int(right - left))
+            data['height'].append(int(bottom - top))
+        return data
+
+    def info(self):
+        return {
+            'engine': self.name,
+            'available': self.is_available(),
+            'glyph_dir': self.glyph_dir,
+            'labels': ''.join(self._labels),
+            'samples': self._sample_count,
+            'error': self._load_error
+        }
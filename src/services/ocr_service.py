@@ -1,64 +1,138 @@
-import pytesseract
 import cv2
 import numpy as np
 import re
-from PIL import Image
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 import json
+from src.services.ocr_engines import TesseractOCREngine, TemplateOCREngine
+from src.services.ocr_cache import OCRResultCache
+
+logger = logging.getLogger(__name__)
+
+# Part of every OCR cache key; bump when _preprocess_for_ocr/_preprocess_fast change
+OCR_PREPROCESS_VERSION = 1
+
+# OCRService instance owned by each batch worker process
+_batch_worker_service = None
+
+def _init_batch_worker(backend, tesseract_config):
+    """Initializer proses worker batch: buat OCRService sekali per proses"""
+    global _batch_worker_service
+    _batch_worker_service = OCRService(backend=backend)
+    _batch_worker_service.tesseract_config = tesseract_config
+
+def _run_batch_chunk(items):
+    """Proses satu potongan item batch di dalam proses worker"""
+    return [_batch_worker_service._run_local_batch_item(item) for item in items]
 
 class OCRService:
-    def __init__(self):
+    def __init__(self, backend=None):
         # Configure Tesseract
         self.tesseract_config = '--oem 3 --psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_'
         
-    def extract_text_from_image(self, image, region=None):
+        # OCR engines selectable per call; Tesseract is always the fallback
+        self.backend = backend or os.environ.get('OCR_BACKEND', 'auto')
+        self.engines = {}
+        self.register_engine(TesseractOCREngine(backend=self.backend))
+        self.register_engine(TemplateOCREngine())
+        self.default_engine = os.environ.get('OCR_ENGINE', 'tesseract')
+        
+        # Batch OCR process pool (created lazily on first batch)
+        self.batch_workers = int(os.environ.get('OCR_BATCH_WORKERS', os.cpu_count() or 1))
+        self.batch_chunksize = int(os.environ.get('OCR_BATCH_CHUNKSIZE', 4))
+        self._batch_executor = None
+        self._batch_lock = threading.Lock()
+        
+        # Cascade: a cheap single-line pass first, the full pipeline only when
+        # its confidence or part-number pattern match falls short
+        self.cascade_enabled = os.environ.get('OCR_CASCADE', '1') == '1'
+        self.fast_config = '--oem 3 --psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-'
+        self.fast_line_height = 48
+        self.cascade_min_confidence = float(os.environ.get('OCR_CASCADE_MIN_CONFIDENCE', 75))
+        self.cascade_patterns = [
+            r'^[A-Z0-9]{2,}-[A-Z0-9]{2,}$',
+            r'^[A-Z]{2,}[0-9]{2,}$',
+            r'^[0-9]{2,}[A-Z]{2,}$',
+        ]
+        self._stage_stats = {}
+        self._stage_lock = threading.Lock()
+        
+        # Multi-region OCR: 'mosaic' packs all regions into one image and OCRs
+        # it once, 'per_region' runs one Tesseract call per region
+        self.multi_region_mode = os.environ.get('OCR_MULTI_REGION_MODE', 'mosaic')
+        self.mosaic_padding = 24
+        self._region_detector = None
+        
+        # Result cache keyed by the preprocessed crop; OCR_CACHE_MAX_BYTES=0 disables it
+        cache_max_bytes = int(os.environ.get('OCR_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+        self.result_cache = None
+        if cache_max_bytes > 0:
+            self.result_cache = OCRResultCache(
+                max_bytes=cache_max_bytes,
+                near_duplicate_distance=int(os.environ.get('OCR_CACHE_NEAR_DUPLICATE_DISTANCE', 0)),
+                version=OCR_PREPROCESS_VERSION
+            )
+        
+    def register_engine(self, engine):
+        """Daftarkan engine OCR (turunan OCREngine) dengan nama engine.name"""
+        self.engines[engine.name] = engine
+
+    def get_engines_info(self):
+        """Informasi semua engine OCR yang terdaftar"""
+        return {name: engine.info() for name, engine in self.engines.items()}
+
+    def extract_text_from_image(self, image, region=None, config=None, cascade=None, engine=None):
         """Ekstrak teks dari gambar menggunakan Tesseract OCR"""
+        start_time = time.perf_counter()
         try:
             # Crop image if region is specified
             if region:
                 x, y, w, h = region['x'], region['y'], region['width'], region['height']
                 image = image[y:y+h, x:x+w]
             
+            # A non-Tesseract engine answers only when it is confident enough,
+            # otherwise the Tesseract pipeline below runs as fallback
+            engine = engine or self.default_engine
+            if engine != 'tesseract':
+                engine_result = self._extract_with_engine(engine, image)
+                if engine_result is not None and self._is_confident_result(engine_result):
+                    return self._finish_result(engine_result, start_time)
+            
+            # A caller-supplied config bypasses the cascade
+            if cascade is None:
+                cascade = self.cascade_enabled and config is None
+            
+            fast_result = None
+            if cascade:
+                fast_result = self._extract_fast(image)
+                if self._is_confident_result(fast_result):
+                    return self._finish_result(fast_result, start_time)
+            
             # Preprocess image for better OCR
             processed_image = self._preprocess_for_ocr(image)
+            config = config or self.tesseract_config
             
-            # Convert to PIL Image
-            pil_image = Image.fromarray(processed_image)
+            # A repeated crop skips Tesseract entirely
+            cached_result, cache_token = self._cache_lookup(processed_image, config, 'full')
+            if cached_result is not None:
+                cached_result['stage'] = 'cache'
+                return self._finish_result(cached_result, start_time)
             
             # Extract text with confidence scores
-            data = pytesseract.image_to_data(pil_image, config=self.tesseract_config, output_type=pytesseract.Output.DICT)
+            data = self._image_to_data(processed_image, config)
             
-            # Filter and combine text with confidence > threshold
-            confidence_threshold = 30
-            extracted_texts = []
+            result = self._build_ocr_result(data)
+            result['stage'] = 'full'
+            self._cache_store(cache_token, result)
             
-            for i in range(len(data['text'])):
-                if int(data['conf'][i]) > confidence_threshold:
-                    text = data['text'][i].strip()
-                    if text:
-                        extracted_texts.append({
-                            'text': text,
-                            'confidence': int(data['conf'][i]),
-                            'bbox': {
-                                'x': data['left'][i],
-                                'y': data['top'][i],
-                                'width': data['width'][i],
-                                'height': data['height'][i]
-                            }
-                        })
-            
-            # Combine texts and find the most likely part number
-            combined_text = ' '.join([item['text'] for item in extracted_texts])
-            part_number = self._extract_part_number(combined_text)
-            
-            # Calculate average confidence
-            avg_confidence = np.mean([item['confidence'] for item in extracted_texts]) if extracted_texts else 0
-            
-            return {
-                'part_number': part_number,
-                'raw_text': combined_text,
-                'confidence': float(avg_confidence),
-                'details': extracted_texts
-            }
+            # Keep the fast read if the full pass found nothing better
+            if not result['part_number'] and fast_result and fast_result['part_number']:
+                result = fast_result
+            return self._finish_result(result, start_time)
             
         except Exception as e:
             return {
@@ -69,6 +143,218 @@ class OCRService:
                 'details': []
             }
 
+    def _extract_fast(self, image):
+        """Pass cepat: crop dinormalisasi tingginya lalu OCR sebagai satu baris (--psm 7)"""
+        processed_image = self._preprocess_fast(image)
+        cached_result, cache_token = self._cache_lookup(processed_image, self.fast_config, 'fast')
+        if cached_result is not None:
+            cached_result['stage'] = 'cache'
+            return cached_result
+        
+        result = self._build_ocr_result(self._image_to_data(processed_image, self.fast_config))
+        result['stage'] = 'fast'
+        self._cache_store(cache_token, result)
+        return result
+
+    def _preprocess_fast(self, image):
+        """Pra-pemrosesan ringan untuk pass cepat: grayscale, normalisasi tinggi, Otsu"""
+        if len(image.shape) == 3:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = image
+        
+        height, width = gray.shape
+        scale = self.fast_line_height / float(height)
+        if scale != 1.0:
+            interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+            gray = cv2.resize(gray, (max(1, int(round(width * scale))), self.fast_line_height), interpolation=interpolation)
+        
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return binary
+
+    def _extract_with_engine(self, engine_name, image):
+        """OCR crop dengan engine non-Tesseract, None jika engine tidak tersedia atau gagal"""
+        engine = self.engines.get(engine_name)
+        if engine is None or not engine.is_available():
+            return None
+        
+        try:
+            processed_image = self._preprocess_fast(image)
+            cached_result, cache_token = self._cache_lookup(processed_image, None, 'fast', engine_name)
+            if cached_result is not None:
+                cached_result['stage'] = 'cache'
+                return cached_result
+            
+            result = self._build_ocr_result(engine.image_to_data(processed_image))
+            result['stage'] = engine_name
+            self._cache_store(cache_token, result)
+            return result
+        except Exception as e:
+            logger.warning(f"OCR engine {engine_name} failed, falling back to Tesseract: {e}")
+            return None
+
+    def _is_confident_result(self, result):
+        """Cek apakah hasil pass cepat/engine ringan cukup yakin sehingga pass penuh bisa dilewati"""
+        part_number = result['part_number']
+        if not part_number or result['confidence'] < self.cascade_min_confidence:
+            return False
+        return any(re.match(pattern, part_number) for pattern in self.cascade_patterns)
+
+    def _finish_result(self, result, start_time):
+        """Catat waktu OCR dan statistik per stage"""
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        result['ocr_time_ms'] = elapsed_ms
+        self._record_stage(result.get('stage', 'full'), elapsed_ms)
+        return result
+
+    def _record_stage(self, stage, elapsed_ms):
+        """Akumulasi jumlah dan waktu OCR per stage"""
+        with self._stage_lock:
+            stats = self._stage_stats.setdefault(stage, {'count': 0, 'total_time_ms': 0.0})
+            stats['count'] += 1
+            stats['total_time_ms'] += elapsed_ms
+
+    def get_stage_stats(self):
+        """Statistik jumlah dan rata-rata waktu OCR per stage cascade"""
+        with self._stage_lock:
+            return {
+                stage: {
+                    'count': stats['count'],
+                    'avg_time_ms': stats['total_time_ms'] / stats['count'] if stats['count'] else 0
+                }
+                for stage, stats in self._stage_stats.items()
+            }
+
+    def _build_ocr_result(self, data):
+        """Bangun hasil OCR (part number, teks, confidence) dari data per kata Tesseract"""
+        # Filter and combine text with confidence > threshold
+        confidence_threshold = 30
+        extracted_texts = []
+        
+        for i in range(len(data['text'])):
+            if int(data['conf'][i]) > confidence_threshold:
+                text = data['text'][i].strip()
+                if text:
+                    extracted_texts.append({
+                        'text': text,
+                        'confidence': int(data['conf'][i]),
+                        'bbox': {
+                            'x': data['left'][i],
+                            'y': data['top'][i],
+                            'width': data['width'][i],
+                            'height': data['height'][i]
+                        }
+                    })
+        
+        # Combine texts and find the most likely part number
+        combined_text = ' '.join([item['text'] for item in extracted_texts])
+        part_number = self._extract_part_number(combined_text)
+        
+        # Calculate average confidence
+        avg_confidence = np.mean([item['confidence'] for item in extracted_texts]) if extracted_texts else 0
+        
+        return {
+            'part_number': part_number,
+            'raw_text': combined_text,
+            'confidence': float(avg_confidence),
+            'details': extracted_texts
+        }
+
+    def extract_text_batch(self, items, max_workers=None, chunksize=None):
+        """Ekstrak teks dari banyak gambar/region sekaligus memakai pool proses
+        
+        Setiap item berupa array gambar atau dict berisi 'image' (array) atau
+        'image_path', serta 'region' dan 'config' opsional. Hasil dikembalikan
+        sesuai urutan input. Pool berukuran batch_workers dibuat sekali dan
+        dipakai bersama; max_workers hanya membatasi berapa potongan
+        (chunksize item) milik pemanggil ini yang diproses bersamaan.
+        """
+        batch = [self._prepare_batch_item(item) for item in items]
+        if not batch:
+            return []
+        
+        max_workers = min(max(1, int(max_workers or self.batch_workers)), max(1, self.batch_workers))
+        chunksize = max(1, int(chunksize or self.batch_chunksize))
+        
+        # Not worth the inter-process round trip for a single item or worker
+        if len(batch) == 1 or max_workers == 1:
+            return [self._run_local_batch_item(item) for item in batch]
+        
+        executor = self._get_batch_executor()
+        chunks = [batch[start:start + chunksize] for start in range(0, len(batch), chunksize)]
+        results = [None] * len(chunks)
+        pending = {}
+        next_chunk = 0
+        while next_chunk < len(chunks) or pending:
+            while next_chunk < len(chunks) and len(pending) < max_workers:
+                pending[executor.submit(_run_batch_chunk, chunks[next_chunk])] = next_chunk
+                next_chunk += 1
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+        return [result for chunk_results in results for result in chunk_results]
+
+    def _prepare_batch_item(self, item):
+        """Normalisasi item batch dan crop region di proses induk"""
+        if isinstance(item, np.ndarray):
+            item = {'image': item}
+        else:
+            item = dict(item)
+        
+        if item.get('image') is None and not item.get('image_path'):
+            raise ValueError("Batch item requires 'image' or 'image_path'")
+        
+        # Only the crop is pickled to the worker instead of the whole frame
+        region = item.get('region')
+        if region and item.get('image') is not None:
+            x, y, w, h = int(region['x']), int(region['y']), int(region['width']), int(region['height'])
+            item['image'] = np.ascontiguousarray(item['image'][y:y+h, x:x+w])
+            item['region'] = None
+        return item
+
+    def _run_local_batch_item(self, item):
+        """Proses item batch di proses ini (tanpa pool)"""
+        image = item.get('image')
+        if image is None:
+            image = cv2.imread(item['image_path'], cv2.IMREAD_COLOR)
+            if image is None:
+                return {
+                    'part_number': '',
+                    'raw_text': '',
+                    'confidence': 0.0,
+                    'error': f"Cannot read image: {item['image_path']}",
+                    'details': []
+                }
+        return self.extract_text_from_image(image, item.get('region'), config=item.get('config'), engine=item.get('engine'))
+
+    def _get_batch_executor(self):
+        """Ambil pool proses batch (batch_workers proses), dibuat saat batch pertama"""
+        with self._batch_lock:
+            if self._batch_executor is None:
+                # spawn: forking a threaded Flask server is unsafe
+                self._batch_executor = ProcessPoolExecutor(
+                    max_workers=self.batch_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_batch_worker,
+                    initargs=(self.backend, self.tesseract_config)
+                )
+            return self._batch_executor
+
+    def shutdown_batch_pool(self):
+        """Hentikan pool proses batch"""
+        with self._batch_lock:
+            if self._batch_executor is not None:
+                self._batch_executor.shutdown(wait=True)
+                self._batch_executor = None
+
+    def _image_to_data(self, processed_image, config):
+        """Jalankan Tesseract pada gambar yang sudah dipreproses"""
+        return self.engines['tesseract'].image_to_data(processed_image, config)
+
+    def get_backend_info(self):
+        """Informasi backend Tesseract yang sedang dipakai"""
+        return self.engines['tesseract'].info()
+
     def _preprocess_for_ocr(self, image):
         """Pra-pemrosesan khusus untuk OCR"""
         # Convert to grayscale if needed
@@ -153,16 +439,24 @@ class OCRService:
         
         return True, "Valid part number"
 
-    def detect_and_extract_multiple_regions(self, image, max_regions=5):
+    def detect_and_extract_multiple_regions(self, image, max_regions=5, mode=None, engine=None):
         """Deteksi dan ekstrak teks dari multiple regions dalam gambar"""
-        from src.services.camera_service import CameraService
+        text_regions = self._get_region_detector().detect_text_regions(image)[:max_regions]
         
-        camera_service = CameraService()
-        text_regions = camera_service.detect_text_regions(image)
+        mode = mode or self.multi_region_mode
+        engine = engine or self.default_engine
+        if engine != 'tesseract':
+            # Lightweight engines are fast enough per region
+            ocr_results = [self.extract_text_from_image(image, region, engine=engine) for region in text_regions]
+        elif mode == 'mosaic' and len(text_regions) > 1:
+            start_time = time.perf_counter()
+            ocr_results = self._extract_regions_mosaic(image, text_regions)
+            self._record_stage('mosaic', (time.perf_counter() - start_time) * 1000)
+        else:
+            ocr_results = [self.extract_text_from_image(image, region) for region in text_regions]
         
         results = []
-        for i, region in enumerate(text_regions[:max_regions]):
-            ocr_result = self.extract_text_from_image(image, region)
+        for i, (region, ocr_result) in enumerate(zip(text_regions, ocr_results)):
             if ocr_result['part_number']:
                 results.append({
                     'region': region,
@@ -174,7 +468,111 @@ class OCRService:
         results.sort(key=lambda x: x['ocr_result']['confidence'], reverse=True)
         return results
 
-    def extract_text_from_coordinates(self, image, x, y, width, height):
+    def _get_region_detector(self):
+        """CameraService dipakai hanya untuk deteksi area teks (tanpa membuka kamera)"""
+        if self._region_detector is None:
+            from src.services.camera_service import CameraService
+            self._region_detector = CameraService()
+        return self._region_detector
+
+    def _extract_regions_mosaic(self, image, regions, config=None):
+        """OCR banyak region dengan satu panggilan Tesseract pada gambar mosaik"""
+        try:
+            config = config or self.tesseract_config
+            results = [None] * len(regions)
+            cache_tokens = [None] * len(regions)
+            crops = []
+            crop_indices = []
+            for index, region in enumerate(regions):
+                x, y, w, h = region['x'], region['y'], region['width'], region['height']
+                processed = self._preprocess_for_ocr(image[y:y+h, x:x+w])
+                results[index], cache_tokens[index] = self._cache_lookup(processed, config, 'mosaic')
+                if results[index] is not None:
+                    results[index]['stage'] = 'cache'
+                else:
+                    crops.append(self._normalize_polarity(processed))
+                    crop_indices.append(index)
+            
+            # Only regions missing from the cache go into the mosaic
+            if not crops:
+                return results
+            
+            # Stack the crops vertically on a white canvas, padded so Tesseract
+            # never merges words from neighbouring crops into one line
+            pad = self.mosaic_padding
+            canvas_width = max(crop.shape[1] for crop in crops) + 2 * pad
+            canvas_height = sum(crop.shape[0] for crop in crops) + pad * (len(crops) + 1)
+            canvas = np.full((canvas_height, canvas_width), 255, dtype=np.uint8)
+            
+            offsets = []
+            top = pad
+            for crop in crops:
+                crop_height, crop_width = crop.shape
+                canvas[top:top+crop_height, pad:pad+crop_width] = crop
+                offsets.append((top, crop_height))
+                top += crop_height + pad
+            
+            data = self._image_to_data(canvas, config)
+            
+            # Map every word back to the crop whose band contains its center,
+            # translating the bbox into that crop's coordinates
+            keys = ('text', 'conf', 'left', 'top', 'width', 'height')
+            region_data = [{key: [] for key in keys} for _ in crops]
+            for i in range(len(data['text'])):
+                center_y = data['top'][i] + data['height'][i] / 2
+                for index, (crop_top, crop_height) in enumerate(offsets):
+                    if crop_top - pad / 2 <= center_y < crop_top + crop_height + pad / 2:
+                        words = region_data[index]
+                        words['text'].append(data['text'][i])
+                        words['conf'].append(data['conf'][i])
+                        words['left'].append(data['left'][i] - pad)
+                        words['top'].append(data['top'][i] - crop_top)
+                        words['width'].append(data['width'][i])
+                        words['height'].append(data['height'][i])
+                        break
+            
+            for index, words in zip(crop_indices, region_data):
+                results[index] = self._build_ocr_result(words)
+                results[index]['stage'] = 'mosaic'
+                self._cache_store(cache_tokens[index], results[index])
+            return results
+            
+        except Exception:
+            # Fall back to one call per region
+            return [self.extract_text_from_image(image, region, config=config) for region in regions]
+
+    def _cache_lookup(self, processed_image, config, mode, engine='tesseract'):
+        """Cari hasil OCR di cache untuk crop yang sudah dipreproses dengan mode dan engine tertentu"""
+        if self.result_cache is None:
+            return None, None
+        return self.result_cache.lookup(processed_image, config, mode, engine)
+
+    def _cache_store(self, cache_token, result):
+        """Simpan hasil OCR ke cache"""
+        if self.result_cache is not None and cache_token is not None:
+            self.result_cache.store(cache_token, result)
+
+    def get_cache_stats(self):
+        """Statistik cache hasil OCR"""
+        if self.result_cache is None:
+            return {'enabled': False}
+        stats = self.result_cache.stats()
+        stats['enabled'] = True
+        return stats
+
+    def clear_cache(self):
+        """Kosongkan cache hasil OCR"""
+        if self.result_cache is not None:
+            self.result_cache.clear()
+
+    def _normalize_polarity(self, binary):
+        """Pastikan gambar biner berlatar putih (teks gelap) agar konsisten dengan padding mosaik"""
+        border = np.concatenate([binary[0, :], binary[-1, :], binary[:, 0], binary[:, -1]])
+        if border.mean() < 128:
+            return cv2.bitwise_not(binary)
+        return binary
+
+    def extract_text_from_coordinates(self, image, x, y, width, height, engine=None):
         """Ekstrak teks dari koordinat yang ditentukan secara manual"""
         region = {
             'x': int(x),
@@ -182,5 +580,5 @@ class OCRService:
             'width': int(width),
             'height': int(height)
         }
-        return self.extract_text_from_image(image, region)
+        return self.extract_text_from_image(image, region, engine=engine)
 
@@ -0,0 +1,236 @@
+import os
+import threading
+import time
+
+# Characters Tesseract commonly mistakes for one another on part-number labels
+CONFUSABLE_GROUPS = ['0ODQ', '1IL', '2Z', '5S', '6G', '8B']
+
+
+class PartNumberIndex:
+    """Index edit-distance in-memory atas semua part number di katalog produk
+
+    Kandidat dicari dengan symmetric-delete (SymSpell) pada "skeleton" part
+    number, yaitu string dengan karakter yang mirip (0/O, 8/B, ...) disamakan.
+    Kandidat kemudian diurutkan dengan Levenshtein berbobot, di mana substitusi
+    karakter yang mirip lebih murah daripada substitusi biasa. Hanya kandidat
+    dengan jarak <= autocorrect_distance (default: hanya substitusi karakter
+    mirip) yang boleh dipakai sebagai koreksi otomatis; kandidat lain hanya
+    saran.
+    """
+
+    def __init__(self, max_distance=1, confusable_cost=0.25, refresh_interval=60, autocorrect_distance=0.75):
+        self.max_distance = max_distance
+        self.confusable_cost = confusable_cost
+        # Any insertion, deletion or plain substitution costs 1.0, so a limit
+        # below 1.0 only accepts confusable substitutions (0/O, 8/B, ...)
+        self.autocorrect_distance = autocorrect_distance
+        self.refresh_interval = refresh_interval
+
+        self._canonical = {}
+        for group in CONFUSABLE_GROUPS:
+            for char in group:
+                self._canonical[char] = group[0]
+
+        self._parts = set()
+        self._by_skeleton = {}
+        self._deletes = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._signature = None
+        self._last_sync = 0.0
+
+    def skeleton(self, part_number):
+        """Normalisasi part number: uppercase dan karakter mirip disamakan"""
+        return ''.join(self._canonical.get(char, char) for char in part_number.upper())
+
+    def _delete_variants(self, text):
+        """Semua string hasil menghapus hingga max_distance karakter"""
+        variants = {text}
+        frontier = {text}
+        for _ in range(self.max_distance):
+            frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+            variants |= frontier
+        return variants
+
+    def add(self, part_number):
+        """Tambahkan satu part number ke index"""
+        if not part_number:
+            return
+        with self._lock:
+            if part_number in self._parts:
+                return
+            self._parts.add(part_number)
+
+            skeleton = self.skeleton(part_number)
+            parts = self._by_skeleton.get(skeleton)
+            if parts is None:
+                self._by_skeleton[skeleton] = {part_number}
+                # Most delete variants map to a single skeleton, so the value is
+                # the skeleton string itself and only becomes a set on collision
+                for variant in self._delete_variants(skeleton):
+                    existing = self._deletes.get(variant)
+                    if existing is None:
+                        self._deletes[variant] = skeleton
+                    elif isinstance(existing, str):
+                        if existing != skeleton:
+                            self._deletes[variant] = {existing, skeleton}
+                    else:
+                        existing.add(skeleton)
+            else:
+                parts.add(part_number)
+
+    def remove(self, part_number):
+        """Hapus satu part number dari index"""
+        if not part_number:
+            return
+        with self._lock:
+            if part_number not in self._parts:
+                return
+            self._parts.discard(part_number)
+
+            skeleton = self.skeleton(part_number)
+            parts = self._by_skeleton.get(skeleton)
+            if parts is None:
+                return
+            parts.discard(part_number)
+            if not parts:
+                del self._by_skeleton[skeleton]
+                for variant in self._delete_variants(skeleton):
+                    existing = self._deletes.get(variant)
+                    if existing is None:
+                        continue
+                    if isinstance(existing, str):
+                        if existing == skeleton:
+                            del self._deletes[variant]
+                    else:
+                        existing.discard(skeleton)
+                        if len(existing) == 1:
+                            self._deletes[variant] = existing.pop()
+
+    def rename(self, old_part_number, new_part_number):
+        """Update index saat part number produk diubah"""
+        with self._lock:
+            self.remove(old_part_number)
+            self.add(new_part_number)
+
+    def load(self, part_numbers):
+        """Bangun ulang index dari daftar part number"""
+        with self._lock:
+            self._parts = set()
+            self._by_skeleton = {}
+            self._deletes = {}
+            for part_number in part_numbers:
+                self.add(part_number)
+            self._loaded = True
+
+    def weighted_distance(self, source, target):
+        """Levenshtein berbobot: substitusi karakter mirip memakai confusable_cost"""
+        source = source.upper()
+        target = target.upper()
+        previous = [float(j) for j in range(len(target) + 1)]
+        for i, source_char in enumerate(source, 1):
+            current = [float(i)] + [0.0] * len(target)
+            source_canonical = self._canonical.get(source_char, source_char)
+            for j, target_char in enumerate(target, 1):
+                if source_char == target_char:
+                    substitution = 0.0
+                elif source_canonical == self._canonical.get(target_char, target_char):
+                    substitution = self.confusable_cost
+                else:
+                    substitution = 1.0
+                current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + substitution)
+            previous = current
+        return previous[-1]
+
+    def lookup(self, text, max_distance=None):
+        """Cari part number katalog terdekat, kembalikan (part_number, distance) atau (None, None)
+
+        Hasil dengan distance > autocorrect_distance bukan part yang sama,
+        lihat is_autocorrect.
+        """
+        if not text:
+            return None, None
+        max_distance = self.max_distance if max_distance is None else max_distance
+
+        with self._lock:
+            if text in self._parts:
+                return text, 0.0
+
+            skeletons = set()
+            for variant in self._delete_variants(self.skeleton(text)):
+                existing = self._deletes.get(variant)
+                if existing is None:
+                    continue
+                if isinstance(existing, str):
+                    skeletons.add(existing)
+                else:
+                    skeletons.update(existing)
+
+            best_part = None
+            best_distance = None
+            for skeleton in skeletons:
+                for part_number in self._by_skeleton[skeleton]:
+                    distance = self.weighted_distance(text, part_number)
+                    if distance > max_distance:
+                        continue
+                    if best_distance is None or (distance, part_number) < (best_distance, best_part):
+                        best_part, best_distance = part_number, distance
+
+            return best_part, best_distance
+
+    def is_autocorrect(self, distance):
+        """True jika kandidat sejauh distance boleh menggantikan hasil OCR secara otomatis"""
+        return distance is not None and distance <= self.autocorrect_distance
+
+    def _catalog_signature(self):
+        """Signature murah katalog di database: (jumlah produk, updated_at terbaru)"""
+        from sqlalchemy import func
+        from src.models.product import Product, db
+
+        return tuple(db.session.query(func.count(Product.id), func.max(Product.updated_at)).one())
+
+    def ensure_loaded(self):
+        """Load index dari database saat pertama dipakai atau saat katalog berubah di proses lain"""
+        from src.models.product import Product, db
+
+        now = time.monotonic()
+        if self._loaded and now - self._last_sync < self.refresh_interval:
+            return
+
+        with self._lock:
+            if self._loaded and now - self._last_sync < self.refresh_interval:
+                return
+            # The catalog is only reloaded when another worker process has
+            # changed it; changes made here are applied incrementally
+            signature = self._catalog_signature()
+            if not self._loaded or signature != self._signature:
+                part_numbers = [row[0] for row in db.session.query(Product.part_number).all()]
+                self.load(part_numbers)
+            self._signature = signature
+            self._last_sync = now
+
+    def refresh_signature(self):
+        """Catat signature katalog setelah perubahan lokal agar tidak memicu reload penuh"""
+        with self._lock:
+            if self._loaded:
+                self._signature = self._catalog_signature()
+
+    def stats(self):
+        """Statistik index"""
+        with self._lock:
+            return {
+                'parts': len(self._parts),
+                'skeletons': len(self._by_skeleton),
+                'delete_keys': len(self._deletes),
+                'max_distance': self.max_distance,
+                'autocorrect_distance': self.autocorrect_distance,
+                'loaded': self._loaded
+            }
+
+
+# Shared by the product CRUD routes (incremental updates) and the inspection
+# routes (lookups)
+part_number_index = PartNumberIndex(
+    max_distance=int(os.environ.get('PART_NUMBER_MAX_DISTANCE', 1)),
+    autocorrect_distance=float(os.environ.get('PART_NUMBER_AUTOCORRECT_DISTANCE', 0.75))
+)
@@ -0,0 +1,97 @@
+from src.models.product import RoiHint, Inspection, db
+
+class RoiHintService:
+    """ROI label yang dipelajari per kamera (dan per produk) dari inspeksi yang berhasil"""
+
+    def __init__(self, margin_ratio=0.25, smoothing=0.3):
+        # Margin added around the learned box before cropping, relative to its size
+        self.margin_ratio = margin_ratio
+        # Weight of a new sample in the exponential moving average of the box
+        self.smoothing = smoothing
+
+    def get_hint(self, camera_id, product_id=None):
+        """Ambil hint ROI: produk yang diminta, produk terakhir yang OK di kamera ini, lalu hint kamera"""
+        if product_id is None:
+            latest_ok = Inspection.query.filter_by(camera_id=camera_id, is_ok=True).order_by(
+                Inspection.inspected_at.desc()
+            ).first()
+            product_id = latest_ok.product_id if latest_ok else None
+        
+        if product_id is not None:
+            hint = RoiHint.query.filter_by(camera_id=camera_id, product_id=product_id).first()
+            if hint is not None:
+                return hint
+        
+        return RoiHint.query.filter_by(camera_id=camera_id, product_id=None).first()
+
+    def hint_region(self, hint, frame_shape):
+        """Region crop dari hint, diperlebar dengan margin dan dibatasi ukuran frame"""
+        frame_height, frame_width = frame_shape[:2]
+        margin_x = int(hint.width * self.margin_ratio)
+        margin_y = int(hint.height * self.margin_ratio)
+        x0 = max(0, hint.x - margin_x)
+        y0 = max(0, hint.y - margin_y)
+        x1 = min(frame_width, hint.x + hint.width + margin_x)
+        y1 = min(frame_height, hint.y + hint.height + margin_y)
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return {
+            'x': x0,
+            'y': y0,
+            'width': x1 - x0,
+            'height': y1 - y0,
+            'area': (x1 - x0) * (y1 - y0)
+        }
+
+    def record_result(self, hint, hit):
+        """Catat hit/miss hint (disimpan bersama commit inspeksi)"""
+        if hit:
+            hint.hits = (hint.hits or 0) + 1
+        else:
+            hint.misses = (hint.misses or 0) + 1
+
+    def learn(self, camera_id, product_id, detection_area):
+        """Perbarui hint kamera dan hint produk dari detection_area inspeksi yang berhasil"""
+        product_ids = [None] if product_id is None else [None, product_id]
+        for hint_product_id in product_ids:
+            hint = RoiHint.query.filter_by(camera_id=camera_id, product_id=hint_product_id).first()
+            if hint is None:
+                hint = RoiHint(
+                    camera_id=camera_id,
+                    product_id=hint_product_id,
+                    x=int(detection_area['x']),
+                    y=int(detection_area['y']),
+                    width=int(detection_area['width']),
+                    height=int(detection_area['height']),
+                    samples=1,
+                    hits=0,
+                    misses=0
+                )
+                db.session.add(hint)
+                continue
+            
+            # Track the label with an exponential moving average of the box
+            alpha = self.smoothing
+            hint.x = int(round((1 - alpha) * hint.x + alpha * detection_area['x']))
+            hint.y = int(round((1 - alpha) * hint.y + alpha * detection_area['y']))
+            hint.width = int(round((1 - alpha) * hint.width + alpha * detection_area['width']))
+            hint.height = int(round((1 - alpha) * hint.height + alpha * detection_area['height']))
+            hint.samples = (hint.samples or 0) + 1
+
+    def get_stats(self, camera_id):
+        """Statistik hint ROI per kamera"""
+        hints = RoiHint.query.filter_by(camera_id=camera_id).order_by(RoiHint.updated_at.desc()).all()
+        hits = sum(hint.hits or 0 for hint in hints)
+        misses = sum(hint.misses or 0 for hint in hints)
+        return {
+            'camera_id': camera_id,
+            'hints': [hint.to_dict() for hint in hints],
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': (hits / (hits + misses) * 100) if (hits + misses) > 0 else 0
+        }
+
+    def reset(self, camera_id):
+        """Hapus semua hint ROI untuk kamera"""
+        RoiHint.query.filter_by(camera_id=camera_id).delete()
+        db.session.commit()
@@ -0,0 +1,211 @@
+import threading
+import uuid
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Per-slot header; sequence 0 means the slot holds no published frame
+SLOT_HEADER_DTYPE = np.dtype([
+    ('sequence', '<i8'),
+    ('refcount', '<i8'),
+    ('timestamp', '<f8'),
+    ('height', '<i4'),
+    ('width', '<i4'),
+    ('channels', '<i4'),
+    ('padding', '<i4')
+])
+RING_HEADER_DTYPE = np.dtype([('slots', '<i8'), ('slot_bytes', '<i8')])
+DATA_ALIGNMENT = 64
+
+# Serialises segment creation with the temporary resource_tracker patch in
+# _attach_untracked, so a ring created meanwhile is still registered
+_tracker_lock = threading.Lock()
+
+
+def _attach_untracked(name):
+    """Buka segment tanpa mendaftarkannya ke resource_tracker
+
+    Consumer tidak memiliki segment; jika terdaftar, resource_tracker akan
+    meng-unlink-nya saat proses consumer keluar.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track flag; unregistering afterwards would also
+        # drop the owner's registration when both share a tracker (fork)
+        from multiprocessing import resource_tracker
+        with _tracker_lock:
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None if rtype == 'shared_memory' else register(name, rtype)
+            try:
+                return shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+
+
+class SharedFrameRing:
+    """Ring buffer frame uint8 di multiprocessing.shared_memory
+
+    Setiap slot berukuran tetap dan punya header berisi sequence frame,
+    reference count pembaca, timestamp, dan shape. Producer menulis langsung ke
+    slot bebas (refcount 0) lalu mempublikasikan sequence-nya; consumer
+    mendapat view NumPy read-only tanpa copy selama memegang reference.
+
+    Reference count hanya diubah di bawah `lock`: threading.Lock jika hanya
+    satu proses yang mengubahnya (broker kamera), atau multiprocessing.Lock
+    yang diwariskan ke proses lain.
+    """
+
+    def __init__(self, shm, lock=None, owner=False):
+        self.shm = shm
+        self.name = shm.name
+        self.lock = lock or threading.Lock()
+        self.owner = owner
+
+        ring_header = np.ndarray((), dtype=RING_HEADER_DTYPE, buffer=shm.buf)
+        self.slots = int(ring_header['slots'])
+        self.slot_bytes = int(ring_header['slot_bytes'])
+        self._headers = np.ndarray((self.slots,), dtype=SLOT_HEADER_DTYPE, buffer=shm.buf,
+                                   offset=RING_HEADER_DTYPE.itemsize)
+        self._data_offset = self._align(RING_HEADER_DTYPE.itemsize + SLOT_HEADER_DTYPE.itemsize * self.slots)
+        self._next_slot = 0
+
+    @staticmethod
+    def _align(offset):
+        return (offset + DATA_ALIGNMENT - 1) // DATA_ALIGNMENT * DATA_ALIGNMENT
+
+    @classmethod
+    def create(cls, slots, slot_bytes, lock=None, name=None):
+        """Buat segment shared memory baru (proses producer)"""
+        data_offset = cls._align(RING_HEADER_DTYPE.itemsize + SLOT_HEADER_DTYPE.itemsize * slots)
+        with _tracker_lock:
+            shm = shared_memory.SharedMemory(
+                name=name or f"frames_{uuid.uuid4().hex[:16]}",
+                create=True,
+                size=data_offset + slots * slot_bytes
+            )
+        ring_header = np.ndarray((), dtype=RING_HEADER_DTYPE, buffer=shm.buf)
+        ring_header['slots'] = slots
+        ring_header['slot_bytes'] = slot_bytes
+        headers = np.ndarray((slots,), dtype=SLOT_HEADER_DTYPE, buffer=shm.buf, offset=RING_HEADER_DTYPE.itemsize)
+        headers[:] = 0
+        del ring_header, headers
+        return cls(shm, lock=lock, owner=True)
+
+    @classmethod
+    def attach(cls, name, lock=None):
+        """Buka segment yang sudah ada (proses consumer)"""
+        return cls(_attach_untracked(name), lock=lock)
+
+    def _view(self, slot, shape):
+        """View NumPy atas data slot dengan shape frame"""
+        if int(np.prod(shape)) > self.slot_bytes:
+            raise Exception(f"Frame of shape {tuple(shape)} does not fit a {self.slot_bytes}-byte slot")
+        return np.ndarray(tuple(shape), dtype=np.uint8, buffer=self.shm.buf,
+                          offset=self._data_offset + slot * self.slot_bytes)
+
+    def begin_write(self, shape):
+        """Ambil slot bebas untuk ditulis, kembalikan (slot, view) atau (None, None) jika semua slot dipakai
+
+        Slot dikembalikan dengan satu reference milik penulis; setelah commit,
+        reference itu tetap milik pemanggil dan harus di-release (atau
+        diserahkan ke consumer yang akan me-release-nya).
+        """
+        if int(np.prod(shape)) > self.slot_bytes:
+            return None, None
+        with self.lock:
+            for i in range(self.slots):
+                slot = (self._next_slot + i) % self.slots
+                header = self._headers[slot]
+                if header['refcount'] == 0:
+                    header['sequence'] = 0
+                    header['refcount'] = 1
+                    self._next_slot = (slot + 1) % self.slots
+                    break
+            else:
+                return None, None
+        return slot, self._view(slot, shape)
+
+    def commit(self, slot, shape, sequence, timestamp):
+        """Publikasikan frame yang sudah ditulis ke slot"""
+        shape = tuple(shape)
+        with self.lock:
+            header = self._headers[slot]
+            header['height'] = shape[0]
+            header['width'] = shape[1]
+            header['channels'] = shape[2] if len(shape) > 2 else 0
+            header['timestamp'] = timestamp
+            header['sequence'] = sequence
+
+    def write(self, frame, sequence, timestamp):
+        """Copy frame ke slot bebas dan publikasikan, kembalikan slot atau None jika ring penuh"""
+        slot, view = self.begin_write(frame.shape)
+        if slot is None:
+            return None
+        np.copyto(view, frame)
+        self.commit(slot, frame.shape, sequence, timestamp)
+        return slot
+
+    def _slot_shape(self, header):
+        if header['channels']:
+            return (int(header['height']), int(header['width']), int(header['channels']))
+        return (int(header['height']), int(header['width']))
+
+    def acquire(self, slot, sequence):
+        """Tambah reference ke slot jika masih berisi frame `sequence`, kembalikan view read-only atau None"""
+        with self.lock:
+            header = self._headers[slot]
+            if header['sequence'] != sequence:
+                return None
+            header['refcount'] += 1
+            shape = self._slot_shape(header)
+        view = self._view(slot, shape)
+        view.flags.writeable = False
+        return view
+
+    def frame_view(self, slot, shape):
+        """View read-only atas slot yang reference-nya sudah dipegang (misalnya lewat RPC broker)"""
+        view = self._view(slot, shape)
+        view.flags.writeable = False
+        return view
+
+    def add_ref(self, slot, sequence):
+        """Tambah reference tanpa membuat view, kembalikan False jika slot sudah ditimpa"""
+        with self.lock:
+            header = self._headers[slot]
+            if header['sequence'] != sequence:
+                return False
+            header['refcount'] += 1
+            return True
+
+    def release(self, slot):
+        """Lepas satu reference slot"""
+        with self.lock:
+            header = self._headers[slot]
+            if header['refcount'] > 0:
+                header['refcount'] -= 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'name': self.name,
+                'slots': self.slots,
+                'slot_bytes': self.slot_bytes,
+                'slots_in_use': int(np.count_nonzero(self._headers['refcount'])),
+                'latest_sequence': int(self._headers['sequence'].max())
+            }
+
+    def close(self):
+        """Tutup mapping; owner juga meng-unlink segment"""
+        self._headers = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # Frame views handed out earlier still reference the mapping; it
+            # is unmapped when the last of them is garbage collected
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
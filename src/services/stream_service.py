@@ -0,0 +1,192 @@
+import os
+import math
+import threading
+import time
+
+# Stream settings are snapped to these steps so viewers asking for slightly
+# different values still share one encoder (and the number of encoders per
+# camera stays bounded)
+FPS_STEPS = (1, 2, 5, 10, 15, 20, 25, 30)
+WIDTH_STEPS = (160, 320, 480, 640, 800, 960, 1280, 1920)
+QUALITY_STEP = 10
+
+
+class FrameBroadcaster:
+    """Satu encoder MJPEG per (kamera, fps, lebar, quality) yang dibagi ke semua viewer
+
+    Thread encoder mengambil frame terbaru dari CameraService, men-downscale
+    dan meng-encode JPEG sekali, lalu semua viewer membaca bytes yang sama.
+    Thread berhenti sendiri jika tidak ada viewer selama idle_timeout detik.
+    """
+
+    def __init__(self, camera_service, camera_id, fps, width, quality, idle_timeout=5.0):
+        self.camera_service = camera_service
+        self.camera_id = camera_id
+        self.fps = fps
+        self.width = width
+        self.quality = quality
+        self.idle_timeout = idle_timeout
+        self._condition = threading.Condition()
+        self._jpeg = None
+        self._sequence = 0
+        self._timestamp = None
+        self._viewers = 0
+        self._running = False
+        self._thread = None
+        self._frames_encoded = 0
+        self.error = None
+
+    def add_viewer(self):
+        """Daftarkan viewer dan pastikan thread encoder berjalan"""
+        with self._condition:
+            self._viewers += 1
+            if not self._running:
+                self._running = True
+                self._thread = threading.Thread(target=self._run, name=f'mjpeg-{self.camera_id}', daemon=True)
+                self._thread.start()
+
+    def remove_viewer(self):
+        with self._condition:
+            self._viewers -= 1
+
+    def is_running(self):
+        with self._condition:
+            return self._running
+
+    def _run(self):
+        interval = 1.0 / self.fps if self.fps > 0 else 0
+        last_timestamp = None
+        idle_since = None
+
+        while True:
+            with self._condition:
+                if self._viewers <= 0:
+                    idle_since = idle_since or time.monotonic()
+                    if time.monotonic() - idle_since >= self.idle_timeout:
+                        self._running = False
+                        self._condition.notify_all()
+                        return
+                else:
+                    idle_since = None
+
+            started = time.monotonic()
+            try:
+                frame, timestamp, sequence = self.camera_service.get_frame(self.camera_id, newer_than=last_timestamp)
+                # Downscaled JPEG from the shared encoded-frame cache
+                jpeg = self.camera_service.encode_frame(self.camera_id, sequence, frame, self.quality, self.width)
+            except Exception as e:
+                with self._condition:
+                    self.error = str(e)
+                    self._condition.notify_all()
+                time.sleep(0.5)
+                continue
+
+            last_timestamp = timestamp
+            with self._condition:
+                self._jpeg = jpeg
+                self._timestamp = timestamp
+                self._sequence += 1
+                self._frames_encoded += 1
+                self.error = None
+                self._condition.notify_all()
+
+            # FPS cap: never publish faster than the configured rate
+            elapsed = time.monotonic() - started
+            if interval > elapsed:
+                time.sleep(interval - elapsed)
+
+    def wait_for_jpeg(self, last_sequence, timeout=5.0):
+        """Tunggu JPEG yang lebih baru dari last_sequence, kembalikan (sequence, jpeg)"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._sequence > last_sequence or not self._running,
+                timeout
+            )
+            if self._sequence > last_sequence:
+                return self._sequence, self._jpeg
+            if self.error:
+                raise Exception(self.error)
+            raise Exception(f"No frame from camera {self.camera_id}")
+
+    def stats(self):
+        with self._condition:
+            return {
+                'camera_id': self.camera_id,
+                'fps': self.fps,
+                'width': self.width,
+                'quality': self.quality,
+                'viewers': self._viewers,
+                'running': self._running,
+                'frames_encoded': self._frames_encoded,
+                'last_frame_bytes': len(self._jpeg) if self._jpeg else 0,
+                'last_timestamp': self._timestamp,
+                'error': self.error
+            }
+
+
+class StreamService:
+    """Streaming MJPEG (multipart/x-mixed-replace) per kamera"""
+
+    boundary = 'frame'
+
+    def __init__(self, camera_service):
+        self.camera_service = camera_service
+        self.default_fps = float(os.environ.get('STREAM_MAX_FPS', 15))
+        self.default_width = int(os.environ.get('STREAM_MAX_WIDTH', 640))
+        self.default_quality = int(os.environ.get('STREAM_JPEG_QUALITY', 70))
+        self._broadcasters = {}
+        self._lock = threading.Lock()
+
+    def _get_broadcaster(self, camera_id, fps, width, quality):
+        """Broadcaster bersama untuk kombinasi setting yang sama"""
+        key = (camera_id, fps, width, quality)
+        with self._lock:
+            broadcaster = self._broadcasters.get(key)
+            if broadcaster is None:
+                broadcaster = FrameBroadcaster(self.camera_service, camera_id, fps, width, quality)
+                self._broadcasters[key] = broadcaster
+            broadcaster.add_viewer()
+            return broadcaster
+
+    @staticmethod
+    def _snap(value, steps, maximum):
+        """Step terbesar <= value (minimal step terkecil), dibatasi maximum; value tidak valid = maximum"""
+        if value is None or not math.isfinite(value) or value <= 0 or value >= maximum:
+            return maximum
+        allowed = [step for step in steps if step < maximum] + [maximum]
+        return max([step for step in allowed if step <= value] or [allowed[0]])
+
+    def normalize_settings(self, fps=None, width=None, quality=None):
+        """Clamp dan snap setting stream ke rentang positif dan step tetap"""
+        fps = self._snap(fps, FPS_STEPS, self.default_fps)
+        width = self._snap(width, WIDTH_STEPS, self.default_width)
+        if quality is None or quality <= 0:
+            quality = self.default_quality
+        quality = max(QUALITY_STEP, min(100, int(round(quality / QUALITY_STEP)) * QUALITY_STEP))
+        return fps, width, quality
+
+    def stream(self, camera_id, fps=None, width=None, quality=None):
+        """Generator body multipart MJPEG untuk satu viewer"""
+        fps, width, quality = self.normalize_settings(fps, width, quality)
+
+        broadcaster = self._get_broadcaster(camera_id, fps, width, quality)
+        try:
+            sequence = 0
+            while True:
+                sequence, jpeg = broadcaster.wait_for_jpeg(sequence)
+                yield (
+                    f"--{self.boundary}\r\n"
+                    f"Content-Type: image/jpeg\r\n"
+                    f"Content-Length: {len(jpeg)}\r\n\r\n"
+                ).encode('ascii') + jpeg + b"\r\n"
+        finally:
+            # Runs when the client disconnects and the server closes the generator
+            broadcaster.remove_viewer()
+
+    def get_stats(self):
+        """Statistik semua stream yang aktif"""
+        with self._lock:
+            # Drop broadcasters whose encoder thread has shut down
+            for key in [key for key, broadcaster in self._broadcasters.items() if not broadcaster.is_running()]:
+                del self._broadcasters[key]
+            return [broadcaster.stats() for broadcaster in self._broadcasters.values()]
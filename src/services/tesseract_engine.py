@@ -0,0 +1,310 @@
+import ctypes
+import ctypes.util
+import os
+import queue
+import shlex
+import threading
+
+import numpy as np
+
+# Every engine runs single threaded; parallelism comes from checking out one
+# engine per concurrent call, so keep Tesseract's OpenMP from oversubscribing
+# the CPU.
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+RIL_WORD = 3
+DEFAULT_OEM = 3
+DEFAULT_PSM = 6
+
+
+class _TesseractCAPI:
+    """Binding ctypes minimal ke C API libtesseract"""
+
+    _instance = None
+    _instance_error = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, library_path):
+        lib = ctypes.CDLL(library_path)
+
+        lib.TessVersion.restype = ctypes.c_char_p
+        lib.TessVersion.argtypes = []
+
+        lib.TessBaseAPICreate.restype = ctypes.c_void_p
+        lib.TessBaseAPICreate.argtypes = []
+        lib.TessBaseAPIDelete.restype = None
+        lib.TessBaseAPIDelete.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIEnd.restype = None
+        lib.TessBaseAPIEnd.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIClear.restype = None
+        lib.TessBaseAPIClear.argtypes = [ctypes.c_void_p]
+
+        lib.TessBaseAPIInit2.restype = ctypes.c_int
+        lib.TessBaseAPIInit2.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+        lib.TessBaseAPISetVariable.restype = ctypes.c_int
+        lib.TessBaseAPISetVariable.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+        lib.TessBaseAPISetPageSegMode.restype = None
+        lib.TessBaseAPISetPageSegMode.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessBaseAPISetImage.restype = None
+        lib.TessBaseAPISetImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int,
+                                            ctypes.c_int, ctypes.c_int, ctypes.c_int]
+        lib.TessBaseAPISetSourceResolution.restype = None
+        lib.TessBaseAPISetSourceResolution.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessBaseAPIRecognize.restype = ctypes.c_int
+        lib.TessBaseAPIRecognize.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        lib.TessBaseAPIGetIterator.restype = ctypes.c_void_p
+        lib.TessBaseAPIGetIterator.argtypes = [ctypes.c_void_p]
+
+        lib.TessResultIteratorDelete.restype = None
+        lib.TessResultIteratorDelete.argtypes = [ctypes.c_void_p]
+        lib.TessResultIteratorNext.restype = ctypes.c_int
+        lib.TessResultIteratorNext.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessResultIteratorGetUTF8Text.restype = ctypes.c_void_p
+        lib.TessResultIteratorGetUTF8Text.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessResultIteratorConfidence.restype = ctypes.c_float
+        lib.TessResultIteratorConfidence.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessResultIteratorGetPageIterator.restype = ctypes.c_void_p
+        lib.TessResultIteratorGetPageIterator.argtypes = [ctypes.c_void_p]
+        lib.TessPageIteratorBoundingBox.restype = ctypes.c_int
+        lib.TessPageIteratorBoundingBox.argtypes = [ctypes.c_void_p, ctypes.c_int,
+                                                    ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int),
+                                                    ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int)]
+        lib.TessDeleteText.restype = None
+        lib.TessDeleteText.argtypes = [ctypes.c_void_p]
+
+        self.lib = lib
+        self.library_path = library_path
+        self.version = lib.TessVersion().decode('utf-8')
+
+    @classmethod
+    def load(cls):
+        """Load libtesseract sekali per proses, raise Exception jika tidak tersedia"""
+        with cls._instance_lock:
+            if cls._instance is None and cls._instance_error is None:
+                library_path = os.environ.get('TESSERACT_LIB') or ctypes.util.find_library('tesseract')
+                try:
+                    if not library_path:
+                        raise Exception("libtesseract not found")
+                    cls._instance = cls(library_path)
+                except Exception as e:
+                    cls._instance_error = str(e)
+            if cls._instance is None:
+                raise Exception(f"Tesseract C API unavailable: {cls._instance_error}")
+            return cls._instance
+
+
+def parse_tesseract_config(config):
+    """Parse string config gaya CLI tesseract menjadi (oem, psm, variables)"""
+    oem = DEFAULT_OEM
+    psm = DEFAULT_PSM
+    variables = {}
+
+    tokens = shlex.split(config or '')
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in ('--oem', '--psm', '-c') and i + 1 < len(tokens):
+            value = tokens[i + 1]
+            if token == '--oem':
+                oem = int(value)
+            elif token == '--psm':
+                psm = int(value)
+            elif '=' in value:
+                name, var_value = value.split('=', 1)
+                variables[name] = var_value
+            i += 2
+        else:
+            i += 1
+
+    return oem, psm, variables
+
+
+class TesseractEngine:
+    """Satu instance TessBaseAPI yang sudah terinisialisasi (tidak thread-safe)"""
+
+    def __init__(self, capi, lang='eng', oem=DEFAULT_OEM, datapath=None):
+        self.capi = capi
+        self.lang = lang
+        self.oem = oem
+        self.handle = capi.lib.TessBaseAPICreate()
+        self._psm = None
+
+        datapath = datapath or os.environ.get('TESSDATA_PREFIX')
+        status = capi.lib.TessBaseAPIInit2(
+            self.handle,
+            datapath.encode('utf-8') if datapath else None,
+            lang.encode('utf-8'),
+            oem
+        )
+        if status != 0:
+            capi.lib.TessBaseAPIDelete(self.handle)
+            self.handle = None
+            raise Exception(f"Failed to initialize Tesseract (lang={lang}, oem={oem})")
+
+    def configure(self, psm, variables):
+        """Set page segmentation mode dan variabel engine"""
+        lib = self.capi.lib
+        for name, value in variables.items():
+            if not lib.TessBaseAPISetVariable(self.handle, name.encode('utf-8'), value.encode('utf-8')):
+                raise Exception(f"Unknown Tesseract variable: {name}")
+        self.set_psm(psm)
+
+    def set_psm(self, psm):
+        """Set page segmentation mode, hanya jika berubah"""
+        if psm != self._psm:
+            self.capi.lib.TessBaseAPISetPageSegMode(self.handle, psm)
+            self._psm = psm
+
+    def image_to_data(self, image):
+        """Jalankan OCR pada gambar uint8 dan kembalikan data per kata (format pytesseract DICT)"""
+        lib = self.capi.lib
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = image.shape[:2]
+        bytes_per_pixel = 1 if image.ndim == 2 else image.shape[2]
+
+        data = {'text': [], 'conf': [], 'left': [], 'top': [], 'width': [], 'height': []}
+
+        lib.TessBaseAPISetImage(self.handle, image.ctypes.data, width, height,
+                                bytes_per_pixel, image.strides[0])
+        lib.TessBaseAPISetSourceResolution(self.handle, 300)
+        try:
+            if lib.TessBaseAPIRecognize(self.handle, None) != 0:
+                raise Exception("Tesseract recognition failed")
+
+            iterator = lib.TessBaseAPIGetIterator(self.handle)
+            if not iterator:
+                return data
+
+            try:
+                page_iterator = lib.TessResultIteratorGetPageIterator(iterator)
+                left, top, right, bottom = (ctypes.c_int() for _ in range(4))
+                while True:
+                    text_ptr = lib.TessResultIteratorGetUTF8Text(iterator, RIL_WORD)
+                    if text_ptr:
+                        text = ctypes.string_at(text_ptr).decode('utf-8', errors='replace')
+                        lib.TessDeleteText(text_ptr)
+                        lib.TessPageIteratorBoundingBox(page_iterator, RIL_WORD,
+                                                        ctypes.byref(left), ctypes.byref(top),
+                                                        ctypes.byref(right), ctypes.byref(bottom))
+                        data['text'].append(text)
+                        data['conf'].append(float(lib.TessResultIteratorConfidence(iterator, RIL_WORD)))
+                        data['left'].append(left.value)
+                        data['top'].append(top.value)
+                        data['width'].append(right.value - left.value)
+                        data['height'].append(bottom.value - top.value)
+
+                    if not lib.TessResultIteratorNext(iterator, RIL_WORD):
+                        break
+            finally:
+                lib.TessResultIteratorDelete(iterator)
+        finally:
+            lib.TessBaseAPIClear(self.handle)
+
+        return data
+
+    def close(self):
+        """Bebaskan resource engine"""
+        if self.handle:
+            self.capi.lib.TessBaseAPIEnd(self.handle)
+            self.capi.lib.TessBaseAPIDelete(self.handle)
+            self.handle = None
+
+
+class TesseractEnginePool:
+    """Pool engine Tesseract in-process yang dibatasi, per konfigurasi (oem, variables)
+
+    Engine dipinjam untuk satu panggilan lalu dikembalikan, sehingga server
+    yang membuat thread baru per request tetap memakai ulang engine yang sudah
+    memuat traineddata. Jumlah engine per konfigurasi dibatasi max_engines
+    (TESSERACT_POOL_SIZE); jika semua sedang dipakai, pemanggil menunggu.
+    """
+
+    def __init__(self, lang='eng', datapath=None, max_engines=None):
+        self.lang = lang
+        self.datapath = datapath
+        self.max_engines = max_engines or int(os.environ.get('TESSERACT_POOL_SIZE', os.cpu_count() or 4))
+        # (oem, variables) -> queue of idle engines
+        self._idle = {}
+        self._created = {}
+        self._engines = []
+        self._waits = 0
+        self._lock = threading.Lock()
+
+    def is_available(self):
+        """Cek apakah libtesseract bisa di-load"""
+        try:
+            _TesseractCAPI.load()
+            return True
+        except Exception:
+            return False
+
+    @property
+    def version(self):
+        return _TesseractCAPI.load().version
+
+    def _checkout(self, oem, variables):
+        """Pinjam engine untuk konfigurasi, kembalikan (key, engine)"""
+        # Variables such as the whitelist cannot be reset once set, so every
+        # distinct config gets its own engines instead of being reconfigured.
+        key = (oem, tuple(sorted(variables.items())))
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle is None:
+                idle = self._idle[key] = queue.Queue()
+                self._created[key] = 0
+            try:
+                return key, idle.get_nowait()
+            except queue.Empty:
+                pass
+            create = self._created[key] < self.max_engines
+            if create:
+                self._created[key] += 1
+            else:
+                self._waits += 1
+
+        if not create:
+            # Every engine for this config is busy
+            return key, idle.get()
+
+        try:
+            engine = TesseractEngine(_TesseractCAPI.load(), lang=self.lang, oem=oem, datapath=self.datapath)
+            engine.configure(DEFAULT_PSM, variables)
+        except Exception:
+            with self._lock:
+                self._created[key] -= 1
+            raise
+        with self._lock:
+            self._engines.append(engine)
+        return key, engine
+
+    def image_to_data(self, image, config=''):
+        """OCR gambar dengan engine yang dipinjam dari pool"""
+        oem, psm, variables = parse_tesseract_config(config)
+        key, engine = self._checkout(oem, variables)
+        try:
+            engine.set_psm(psm)
+            return engine.image_to_data(image)
+        finally:
+            self._idle[key].put(engine)
+
+    def stats(self):
+        """Statistik pool engine"""
+        with self._lock:
+            idle = sum(engines.qsize() for engines in self._idle.values())
+            return {
+                'engines': len(self._engines),
+                'in_use': len(self._engines) - idle,
+                'max_engines_per_config': self.max_engines,
+                'configs': len(self._idle),
+                'waits': self._waits,
+                'lang': self.lang
+            }
+
+    def close(self):
+        """Tutup semua engine (tidak boleh ada OCR yang sedang berjalan)"""
+        with self._lock:
+            engines, self._engines = self._engines, []
+            self._idle = {}
+            self._created = {}
+        for engine in engines:
+            engine.close()
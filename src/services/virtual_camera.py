@@ -0,0 +1,241 @@
+import os
+import random
+import string
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import cv2
+import numpy as np
+
+SOURCE_TYPES = ('device', 'video', 'images', 'synthetic')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+
+class VirtualCamera(ABC):
+    """Sumber frame dengan interface cv2.VideoCapture (isOpened, read, set, get, release)
+
+    fps > 0 membatasi kecepatan frame seperti kamera asli. fps 0 mengikuti
+    kecepatan konsumen tanpa kehilangan frame: read() baru menghasilkan frame
+    berikutnya setelah frame sebelumnya diambil (frame_consumed), sehingga
+    replay berjalan secepat inspeksi memprosesnya.
+    """
+
+    def __init__(self, fps=0):
+        self.fps = fps or 0
+        self.properties = {}
+        self.frames_read = 0
+        self._next_frame_at = None
+        self._opened = True
+        self._consumed = threading.Event()
+
+    def isOpened(self):
+        return self._opened
+
+    def set(self, prop, value):
+        self.properties[prop] = value
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frames_read)
+        return float(self.properties.get(prop, 0))
+
+    def frame_consumed(self):
+        """Dipanggil saat frame terakhir sudah diambil konsumen; membuka read() berikutnya pada fps 0"""
+        self._consumed.set()
+
+    def _pace(self):
+        """Tunggu hingga jadwal frame berikutnya sesuai fps, atau hingga frame sebelumnya diambil pada fps 0"""
+        if self.fps <= 0:
+            if self.frames_read:
+                self._consumed.wait()
+                self._consumed.clear()
+            return
+        now = time.monotonic()
+        if self._next_frame_at is None or now - self._next_frame_at > 1.0:
+            # First frame, or the consumer stalled: restart the schedule
+            self._next_frame_at = now
+        elif self._next_frame_at > now:
+            time.sleep(self._next_frame_at - now)
+        self._next_frame_at += 1.0 / self.fps
+
+    @abstractmethod
+    def _next_frame(self):
+        """Frame berikutnya dari sumber, atau None jika sumber habis"""
+
+    def read(self, image=None):
+        """Frame berikutnya; ditulis ke `image` jika shape-nya cocok (seperti VideoCapture.read)"""
+        if not self._opened:
+            return False, None
+        self._pace()
+        frame = self._next_frame()
+        if frame is None:
+            return False, None
+        self.frames_read += 1
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def release(self):
+        self._opened = False
+        self._consumed.set()
+
+
+class VideoFileCamera(VirtualCamera):
+    """Replay file video, diulang dari awal saat selesai jika loop=True"""
+
+    def __init__(self, path, fps=None, loop=True):
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise Exception(f"Cannot open video file {path}")
+        # Default to the recorded frame rate; 0 replays at the consumer's pace
+        super().__init__(self.capture.get(cv2.CAP_PROP_FPS) if fps is None else fps)
+        self.path = path
+        self.loop = loop
+
+    def _next_frame(self):
+        ret, frame = self.capture.read()
+        if not ret and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read()
+        return frame if ret else None
+
+    def get(self, prop):
+        if prop in (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT, cv2.CAP_PROP_FRAME_COUNT):
+            return self.capture.get(prop)
+        return super().get(prop)
+
+    def release(self):
+        super().release()
+        self.capture.release()
+
+
+class ImageFolderCamera(VirtualCamera):
+    """Memutar gambar di folder (urut nama file) sebagai frame kamera"""
+
+    def __init__(self, path, fps=5, loop=True):
+        super().__init__(fps)
+        if not os.path.isdir(path):
+            raise Exception(f"Image folder {path} does not exist")
+        self.path = path
+        self.loop = loop
+        self.files = sorted(
+            os.path.join(path, filename) for filename in os.listdir(path)
+            if filename.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not self.files:
+            raise Exception(f"No images found in {path}")
+        self._position = 0
+
+    def _next_frame(self):
+        while True:
+            if self._position >= len(self.files):
+                if not self.loop:
+                    return None
+                self._position = 0
+            filename = self.files[self._position]
+            self._position += 1
+            frame = cv2.imread(filename, cv2.IMREAD_COLOR)
+            if frame is not None:
+                return frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.files))
+        return super().get(prop)
+
+
+class SyntheticLabelCamera(VirtualCamera):
+    """Generator frame label sintetis berisi part number, untuk benchmark tanpa kamera
+
+    Part number diambil bergiliran dari daftar yang diberikan, atau dibuat
+    acak dengan format ABC-1234 jika daftar kosong. Setiap label diam di
+    posisi yang sama selama label_frames frame (hanya noise sensor yang
+    berubah), seperti part yang berhenti di depan kamera, lalu diganti label
+    berikutnya di posisi baru.
+    """
+
+    def __init__(self, part_numbers=None, fps=10, width=640, height=480, seed=0, label_frames=None):
+        super().__init__(fps)
+        self.part_numbers = [part.strip() for part in (part_numbers or []) if part.strip()]
+        self.width = width
+        self.height = height
+        self.label_frames = max(1, label_frames or int(os.environ.get('SYNTHETIC_LABEL_FRAMES', 20)))
+        self._random = random.Random(seed)
+        self._noise = np.random.default_rng(seed)
+        self._scene = None
+        self._labels_shown = 0
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            self.width = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            self.height = int(value)
+        return super().set(prop, value)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        return super().get(prop)
+
+    def _part_number(self):
+        if self.part_numbers:
+            return self.part_numbers[self._labels_shown % len(self.part_numbers)]
+        letters = ''.join(self._random.choice(string.ascii_uppercase) for _ in range(3))
+        digits = ''.join(self._random.choice(string.digits) for _ in range(4))
+        return f"{letters}-{digits}"
+
+    def _next_frame(self):
+        if self._scene is None or self._scene.shape[:2] != (self.height, self.width) \
+                or self.frames_read % self.label_frames == 0:
+            self._scene = self._render_label()
+            self._labels_shown += 1
+        noise = self._noise.normal(0, 4, self._scene.shape)
+        return np.clip(self._scene + noise, 0, 255).astype(np.uint8)
+
+    def _render_label(self):
+        """Scene tanpa noise: label putih berisi part number di posisi acak"""
+        frame = np.full((self.height, self.width, 3), 90, dtype=np.uint8)
+        text = self._part_number()
+
+        # White label with dark text, placed anew for every label
+        scale = self.width / 640
+        font_scale = 1.2 * scale
+        thickness = max(1, int(round(2 * scale)))
+        (text_width, text_height), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+        label_width = text_width + int(40 * scale)
+        label_height = text_height + baseline + int(30 * scale)
+        x = self._random.randint(0, max(0, self.width - label_width))
+        y = self._random.randint(0, max(0, self.height - label_height))
+        cv2.rectangle(frame, (x, y), (x + label_width, y + label_height), (245, 245, 245), -1)
+        cv2.putText(frame, text, (x + int(20 * scale), y + int(15 * scale) + text_height),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, (20, 20, 20), thickness)
+        return frame
+
+
+def open_capture(camera_config):
+    """Buka sumber frame sesuai source_type kamera: device OpenCV atau kamera virtual"""
+    source_type = camera_config.get('source_type') or 'device'
+    source_path = camera_config.get('source_path')
+    source_fps = camera_config.get('source_fps')
+
+    if source_type == 'device':
+        return cv2.VideoCapture(camera_config['index'])
+    if source_type == 'video':
+        return VideoFileCamera(source_path, fps=source_fps)
+    if source_type == 'images':
+        return ImageFolderCamera(source_path, fps=5 if source_fps is None else source_fps)
+    if source_type == 'synthetic':
+        return SyntheticLabelCamera(
+            part_numbers=(source_path or '').split(','),
+            fps=10 if source_fps is None else source_fps,
+            width=camera_config.get('resolution_width') or 640,
+            height=camera_config.get('resolution_height') or 480
+        )
+    raise Exception(f"Unknown camera source type: {source_type}")
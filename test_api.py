@@ -3,6 +3,8 @@
 Script untuk testing API endpoints sistem Part Number OCR
 """
 
+import os
+import time
 import requests
 import json
 import base64
@@ -78,6 +80,30 @@ def test_cameras():
     # Test camera detection
     test_endpoint('GET', '/cameras/detect')
 
+def test_virtual_camera_idle():
+    """Kamera virtual fps 0 (dipacu konsumen) tetap menghasilkan frame setelah idle lebih lama dari CAMERA_MAX_FRAME_AGE"""
+    print("\n⏸️ Testing Virtual Camera After Idle...")
+    
+    response = requests.post(f"{BASE_URL}/cameras", json={
+        "name": f"Idle Test {datetime.now().strftime('%H%M%S')}",
+        "source_type": "synthetic",
+        "source_path": "IDLE-123",
+        "source_fps": 0
+    })
+    if response.status_code != 201:
+        print(f"❌ POST /cameras - Got: {response.status_code}")
+        return False
+    camera_id = response.json()['camera']['id']
+    
+    try:
+        test_endpoint('POST', f'/cameras/{camera_id}/initialize')
+        test_endpoint('POST', f'/cameras/{camera_id}/capture')
+        # Let the newest frame go stale
+        time.sleep(float(os.environ.get('CAMERA_MAX_FRAME_AGE', 5.0)) + 1)
+        return test_endpoint('POST', f'/cameras/{camera_id}/capture')
+    finally:
+        test_endpoint('DELETE', f'/cameras/{camera_id}')
+
 def test_products():
     """Test product endpoints"""
     print("\n📦 Testing Product Endpoints...")
@@ -147,6 +173,7 @@ def main():
     # Test all endpoints
     test_health()
     test_cameras()
+    test_virtual_camera_idle()
     test_products()
     test_item_checks()
     test_inspections()
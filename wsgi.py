@@ -0,0 +1,8 @@
+"""
+Entry point WSGI untuk server produksi (gunicorn wsgi:app): app Flask
+plus thread latar belakang server seperti retensi gambar
+"""
+
+from src.main import app, start_background_services
+
+start_background_services()